@@ -0,0 +1,68 @@
+"""
+Resolver execution for ``AsyncGraphQLView``.
+
+Queries run on the event loop. graphql-core awaits every resolver that returns
+an awaitable and gathers sibling fields, so independent fields wait on the
+database at the same time and a worker keeps serving other requests while a
+query is in flight. ``AsyncExecutionMiddleware`` decides how each field runs:
+
+- an ``aresolve_<field>`` coroutine function on the object type replaces the
+  sync ``resolve_<field>``; these use the async ORM (``aget()``, ``async for``);
+- scalar fields read with the default resolver run inline, as they only read
+  an attribute of a row that is already loaded;
+- everything else (custom sync resolvers, related objects and lists) runs on
+  the request's sync thread through ``sync_to_async``, because the sync ORM
+  refuses to run on the event loop.
+
+The schema stays synchronous for ``CachingGraphQLView`` and the tests; the
+``aresolve_`` twins are only used here.
+"""
+from asgiref.sync import sync_to_async
+from graphql import get_named_type, is_leaf_type
+
+from .optimizer import has_custom_resolver, python_field_names
+
+ASYNC, INLINE, THREAD = 'async', 'inline', 'thread'
+
+
+def plan_field(parent_type, field_name):
+    """``(how, async resolver)`` for one field of a GraphQL object type"""
+    graphene_type = getattr(parent_type, 'graphene_type', None)
+    if graphene_type is None or not hasattr(graphene_type, '_meta'):
+        return THREAD, None
+    name = python_field_names(graphene_type).get(field_name)
+    if name is None:
+        return THREAD, None
+
+    twin = getattr(graphene_type, f'aresolve_{name}', None)
+    if twin is not None:
+        return ASYNC, twin
+    field_type = get_named_type(parent_type.fields[field_name].type)
+    if is_leaf_type(field_type) and not has_custom_resolver(graphene_type, name):
+        return INLINE, None
+    return THREAD, None
+
+
+class AsyncExecutionMiddleware:
+    """Runs each resolver on the event loop or on Django's sync thread (see module docstring)"""
+
+    # (GraphQLObjectType, field name) -> plan_field() result; the schema is fixed per process
+    _plans = {}
+
+    def resolve(self, next_, root, info, **kwargs):
+        error = getattr(info.context, 'jwt_error', None)
+        if error is not None and info.path.prev is None:
+            # What JSONWebTokenMiddleware reports for a bad token on a root field
+            raise error
+
+        key = (info.parent_type, info.field_name)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = plan_field(info.parent_type, info.field_name)
+
+        how, twin = plan
+        if how == ASYNC:
+            return twin(root, info, **kwargs)
+        if how == INLINE:
+            return next_(root, info, **kwargs)
+        return sync_to_async(next_)(root, info, **kwargs)
@@ -0,0 +1,163 @@
+"""
+Publish/subscribe brokers for GraphQL subscriptions.
+
+Mutations publish small JSON-safe messages to a named channel; subscription
+resolvers iterate over a channel. Nothing runs for a channel without
+subscribers, so idle boards cost nothing.
+
+The broker class comes from ``settings.GRAPHQL_SUBSCRIPTION_BROKER``:
+
+- ``api.broker.InProcessBroker`` (default) fans out within one process. Use it
+  when a single ASGI process handles both mutations and subscriptions;
+  ``api.checks`` refuses to start several gunicorn workers with it.
+- ``api.broker.RedisBroker`` fans out across worker processes through Redis
+  pub/sub (needs the ``redis`` package and ``GRAPHQL_SUBSCRIPTION_BROKER_URL``).
+
+An in-process subscriber holds at most ``GRAPHQL_SUBSCRIPTION_QUEUE_SIZE``
+undelivered messages. A subscriber that falls further behind is dropped, and
+its iteration raises ``SubscriberTooSlow``.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SubscriberTooSlow(Exception):
+    """A subscriber did not keep up with its channel and was dropped"""
+
+
+# Queued in place of the messages of a dropped subscriber
+_OVERFLOW = object()
+
+
+class InProcessBroker:
+    # Publishers and subscribers must share the process
+    spans_processes = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        """Deliver ``message`` to every subscriber of ``channel``. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    async def subscribe(self, channel):
+        subscription = _InProcessSubscription(self, channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+class _InProcessSubscription:
+    def __init__(self, broker, channel, loop):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=getattr(settings, 'GRAPHQL_SUBSCRIPTION_QUEUE_SIZE', 100))
+        self.overflowed = False
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's event loop is gone
+            self.broker._unsubscribe(self)
+
+    def _put(self, message):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Stop buffering for a client that cannot keep up and end its iteration
+            self.overflowed = True
+            self.broker._unsubscribe(self)
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_OVERFLOW)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.queue.get()
+        if message is _OVERFLOW:
+            raise SubscriberTooSlow(self.channel)
+        return message
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class RedisBroker:
+    # Redis bounds each subscriber with its client-output-buffer-limit for pubsub
+    spans_processes = True
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.GRAPHQL_SUBSCRIPTION_BROKER_URL
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self._client.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        return _RedisSubscription(client, pubsub)
+
+
+class _RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            item = await self.pubsub.get_message(timeout=None)
+            if item is not None and item['type'] == 'message':
+                return json.loads(item['data'])
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured in settings"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(
+                    getattr(settings, 'GRAPHQL_SUBSCRIPTION_BROKER', 'api.broker.InProcessBroker')
+                )
+                _broker = broker_class()
+    return _broker
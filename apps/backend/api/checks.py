@@ -0,0 +1,40 @@
+"""
+Startup checks for serving with several worker processes.
+
+Some defaults only work inside one process: the in-process subscription
+broker and the local-memory cache. ``config/gunicorn.conf.py`` calls
+``check_worker_processes()`` before forking its workers, and refuses to start
+instead of silently serving each worker its own view of that state.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+
+def worker_process_problems(workers):
+    """Messages for the settings that break with ``workers`` processes"""
+    if workers <= 1:
+        return []
+    problems = []
+    broker_class = import_string(settings.GRAPHQL_SUBSCRIPTION_BROKER)
+    if not getattr(broker_class, 'spans_processes', True):
+        problems.append(
+            f"GRAPHQL_SUBSCRIPTION_BROKER={settings.GRAPHQL_SUBSCRIPTION_BROKER} only reaches subscribers "
+            "connected to the worker that published; use api.broker.RedisBroker"
+        )
+    if isinstance(caches['default'], LocMemCache):
+        # Response cache versions and ETags (api.response_cache), role versions
+        # (organizations.authz) and replica pins (api.routing) live there
+        problems.append(
+            "CACHE_BACKEND is local to each process, so a change seen by one worker would not invalidate "
+            "the others' cached roles and responses; use a shared cache such as "
+            "django.core.cache.backends.redis.RedisCache with CACHE_LOCATION"
+        )
+    return problems
+
+
+def check_worker_processes(workers):
+    problems = worker_process_problems(workers)
+    if problems:
+        raise Exception(f"Cannot run {workers} worker processes:\n" + "\n".join(f"- {p}" for p in problems))
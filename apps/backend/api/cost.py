@@ -0,0 +1,190 @@
+"""
+Query cost and depth analysis.
+
+Before an operation runs, ``query_cost_rule()`` estimates how many objects it
+can return: every object or list field costs the number of parent objects it
+is resolved for, and a list multiplies the count below it by its expected
+size. The size comes from a ``first`` or ``limit`` argument when the field (or
+the connection/wrapper field above it) has one, and from
+``GRAPHQL_DEFAULT_LIST_SIZE`` otherwise. Sizes are read the way the resolvers
+read them: a null or negative size serves the default page and ``first`` is
+capped at ``MAX_PAGE_SIZE``. So::
+
+    allProjects { tasks { comments { content } } }
+
+costs ``20 + 20*20 + 20*20*20`` with the default list size of 20. Operations
+over ``GRAPHQL_MAX_QUERY_COST`` or nested deeper than
+``GRAPHQL_MAX_QUERY_DEPTH`` fields are rejected before any resolver runs.
+Introspection fields are not counted.
+"""
+from django.conf import settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+    is_leaf_type,
+)
+from graphql.language.visitor import SKIP
+from graphql.validation import ValidationRule
+
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+SIZE_ARGUMENTS = ('first', 'limit')
+
+
+class CostEstimate:
+    """The estimated cost and depth of one operation"""
+
+    def __init__(self, cost=0, depth=0):
+        self.cost = cost
+        self.depth = depth
+
+    def as_extension(self, max_cost):
+        return {'estimated': self.cost, 'depth': self.depth, 'limit': max_cost}
+
+
+def _size_argument(node, field_def, variables):
+    """How many items the field's ``first``/``limit`` argument makes it return, or None"""
+    for name in SIZE_ARGUMENTS:
+        if name not in field_def.args:
+            continue
+        default = field_def.args[name].default_value
+        value = default
+        for argument in node.arguments:
+            if argument.name.value != name:
+                continue
+            if isinstance(argument.value, IntValueNode):
+                value = int(argument.value.value)
+            elif isinstance(argument.value, VariableNode):
+                value = (variables or {}).get(argument.value.name.value, value)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = None
+        if value is None or value < 0:
+            # Resolvers serve their default page rather than nothing
+            value = default if isinstance(default, int) and default >= 0 else DEFAULT_PAGE_SIZE
+        if name == 'first':
+            value = min(value, MAX_PAGE_SIZE)
+        return value
+    return None
+
+
+def _list_depth(graphql_type):
+    """How many list wrappers a field type has (``[[T]]`` is 2)"""
+    lists = 0
+    graphql_type = get_nullable_type(graphql_type)
+    while is_list_type(graphql_type):
+        lists += 1
+        graphql_type = get_nullable_type(graphql_type.of_type)
+    return lists
+
+
+def estimate_selection(context, parent_type, selection_set, variables, default_size,
+                       multiplier=1, size_hint=None, depth=0, visited=()):
+    """Return ``(cost, depth)`` of a selection set resolved ``multiplier`` times"""
+    cost, max_depth = 0, depth
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            fields = getattr(parent_type, 'fields', {})
+            if name.startswith('__') or name not in fields:
+                continue
+            field_def = fields[name]
+            if is_leaf_type(get_named_type(field_def.type)):
+                max_depth = max(max_depth, depth + 1)
+                continue
+
+            size = _size_argument(selection, field_def, variables)
+            count = multiplier
+            child_hint = None
+            lists = _list_depth(field_def.type)
+            if lists:
+                # The page size of the wrapper above applies to the first list below it
+                per_list = size if size is not None else (size_hint if size_hint is not None else default_size)
+                count *= per_list * default_size ** (lists - 1)
+            else:
+                child_hint = size if size is not None else size_hint
+            cost += count
+
+            if selection.selection_set is not None:
+                child_cost, child_depth = estimate_selection(
+                    context, get_named_type(field_def.type), selection.selection_set, variables,
+                    default_size, count, child_hint, depth + 1, visited,
+                )
+                cost += child_cost
+                max_depth = max(max_depth, child_depth)
+            else:
+                max_depth = max(max_depth, depth + 1)
+
+        elif isinstance(selection, InlineFragmentNode):
+            fragment_type = parent_type
+            if selection.type_condition is not None:
+                fragment_type = context.schema.get_type(selection.type_condition.name.value) or parent_type
+            child_cost, child_depth = estimate_selection(
+                context, fragment_type, selection.selection_set, variables,
+                default_size, multiplier, size_hint, depth, visited,
+            )
+            cost += child_cost
+            max_depth = max(max_depth, child_depth)
+
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = context.get_fragment(name)
+            # Fragment cycles are reported by the standard NoFragmentCycles rule
+            if fragment is None or name in visited:
+                continue
+            fragment_type = context.schema.get_type(fragment.type_condition.name.value) or parent_type
+            child_cost, child_depth = estimate_selection(
+                context, fragment_type, fragment.selection_set, variables,
+                default_size, multiplier, size_hint, depth, visited + (name,),
+            )
+            cost += child_cost
+            max_depth = max(max_depth, child_depth)
+    return cost, max_depth
+
+
+def query_cost_rule(estimate, variables=None, operation_name=None, max_cost=None, max_depth=None,
+                    default_size=None):
+    """
+    Build a validation rule that estimates the cost of the executed operation.
+
+    The estimate is written to ``estimate`` (a ``CostEstimate``) so callers can
+    report it; operations over the budget get a ``QUERY_TOO_COMPLEX`` error.
+    """
+    max_cost = max_cost if max_cost is not None else settings.GRAPHQL_MAX_QUERY_COST
+    max_depth = max_depth if max_depth is not None else settings.GRAPHQL_MAX_QUERY_DEPTH
+    default_size = default_size if default_size is not None else settings.GRAPHQL_DEFAULT_LIST_SIZE
+
+    class QueryCostRule(ValidationRule):
+        def enter_operation_definition(self, node, *_args):
+            name = node.name.value if node.name else None
+            if operation_name is not None and name != operation_name:
+                return SKIP
+            root_type = self.context.schema.get_root_type(node.operation)
+            if root_type is None:
+                return SKIP
+
+            estimate.cost, estimate.depth = estimate_selection(
+                self.context, root_type, node.selection_set, variables, default_size,
+            )
+            extensions = {'code': 'QUERY_TOO_COMPLEX', 'cost': estimate.as_extension(max_cost)}
+            if max_depth and estimate.depth > max_depth:
+                self.report_error(GraphQLError(
+                    f"Query depth {estimate.depth} exceeds the maximum of {max_depth}",
+                    node, extensions=extensions,
+                ))
+            elif max_cost and estimate.cost > max_cost:
+                self.report_error(GraphQLError(
+                    f"Query cost {estimate.cost} exceeds the maximum of {max_cost}",
+                    node, extensions=extensions,
+                ))
+            return SKIP
+
+    return QueryCostRule
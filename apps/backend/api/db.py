@@ -0,0 +1,76 @@
+"""
+Database helpers shared by the sync and async entry points.
+"""
+import functools
+import logging
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def database_sync_to_async(func):
+    """
+    Run ORM code from async code on Django's sync thread.
+
+    Stale connections are closed around the call, as Django does around each
+    HTTP request, because long-lived WebSocket connections never finish a request.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=True)
+
+
+# PostgreSQL errors worth retrying the transaction for: serialization
+# failure, deadlock detected, lock not available
+RETRYABLE_SQLSTATES = frozenset({'40001', '40P01', '55P03'})
+
+
+def is_lock_error(error):
+    """Whether ``error`` is the database giving up on a lock another connection holds"""
+    if not isinstance(error, OperationalError):
+        return False
+    if getattr(error.__cause__, 'sqlstate', None) in RETRYABLE_SQLSTATES:
+        return True
+    return 'locked' in str(error)
+
+
+def retry_on_lock(mutate):
+    """
+    Run a mutation body in one transaction and retry it when the database is locked.
+
+    A lock error (on PostgreSQL also a deadlock or serialization failure)
+    rolls the whole attempt back, so the body runs again from the start:
+    ``on_commit`` hooks of failed attempts are discarded. After
+    ``settings.DB_LOCK_RETRIES`` extra attempts, with jittered exponential
+    backoff, the error reaches the client. Inside an outer
+    transaction the body runs once, as only the outer block could be retried.
+    """
+    @functools.wraps(mutate)
+    def wrapper(*args, **kwargs):
+        if transaction.get_connection().in_atomic_block:
+            return mutate(*args, **kwargs)
+
+        retries = settings.DB_LOCK_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic():
+                    return mutate(*args, **kwargs)
+            except OperationalError as error:
+                if not is_lock_error(error) or attempt == retries:
+                    raise
+                delay = settings.DB_LOCK_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning("%s: %s; retrying in %.3fs", mutate.__qualname__, error, delay)
+                time.sleep(delay)
+
+    return wrapper
@@ -0,0 +1,73 @@
+"""
+Cache of parsed and validated GraphQL documents.
+
+The frontend sends the same handful of operations over and over; parsing and
+validating them again on every request is a large part of the CPU time of a
+small query. ``DocumentCache`` keeps the outcome of both steps for the most
+recently used query texts, keyed by the SHA-256 of the text.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from graphql import GraphQLError, parse, validate
+
+
+def query_hash(query):
+    """Hex SHA-256 of a query text, as used by Apollo persisted queries"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class CachedDocument:
+    """A parsed document and its validation errors (or its syntax error)"""
+
+    def __init__(self, document=None, errors=None):
+        self.document = document
+        self.errors = errors or []
+
+
+class DocumentCache:
+    """Bounded, thread-safe LRU of ``CachedDocument`` by query hash"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, schema, query, validation_rules=None, max_errors=None):
+        """Parse and validate ``query`` against ``schema``, or return the cached outcome"""
+        key = query_hash(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self._build(schema, query, validation_rules, max_errors)
+        if self.maxsize:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _build(self, schema, query, validation_rules, max_errors):
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return CachedDocument(errors=[error])
+        return CachedDocument(document, validate(schema, document, validation_rules, max_errors))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
@@ -0,0 +1,142 @@
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = ('runserver', 'gunicorn-wsgi', 'gunicorn-asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        "Start each server on a local port, send it concurrent GraphQL requests and "
+        "compare throughput and latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server',
+            action='append',
+            dest='servers',
+            choices=SERVERS,
+            help="Server to benchmark (can be repeated; default: all)",
+        )
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per server (default: 2000)")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (default: 16)")
+        parser.add_argument('--query', default='{ __typename }', help="GraphQL query to send")
+        parser.add_argument('--token', help="JWT sent as 'Authorization: JWT <token>'")
+        parser.add_argument('--port', type=int, default=8765, help="Port the servers listen on (default: 8765)")
+        parser.add_argument('--workers', type=int, default=4, help="gunicorn workers (default: 4)")
+        parser.add_argument('--threads', type=int, default=4, help="Threads per gunicorn WSGI worker (default: 4)")
+
+    def handle(self, *args, servers=None, port=8765, **options):
+        results = []
+        for server in servers or SERVERS:
+            missing = self.missing_packages(server)
+            if missing:
+                self.stderr.write(f"Skipping {server}: {', '.join(missing)} not installed")
+                continue
+            process = self.start(server, port, options)
+            try:
+                self.wait_until_ready(process, port)
+                results.append((server, self.run_load(port, options)))
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+        if not results:
+            raise CommandError("No server could be benchmarked")
+
+        self.stdout.write(
+            f"{'server':<15} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for server, stats in results:
+            self.stdout.write(
+                f"{server:<15} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>8.1f} "
+                f"{stats['p50']:>8.1f} {stats['p95']:>8.1f} {stats['p99']:>8.1f}"
+            )
+
+    @staticmethod
+    def missing_packages(server):
+        packages = {'runserver': (), 'gunicorn-wsgi': ('gunicorn',), 'gunicorn-asgi': ('gunicorn', 'uvicorn_worker')}
+        return [name for name in packages[server] if importlib.util.find_spec(name) is None]
+
+    def start(self, server, port, options):
+        env = dict(os.environ)
+        if server == 'runserver':
+            command = [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}']
+        else:
+            command = [sys.executable, '-m', 'gunicorn', '-c', 'config/gunicorn.conf.py']
+            env.update({
+                'DEBUG': '0',
+                'SERVER_INTERFACE': server.split('-')[1],
+                'GUNICORN_BIND': f'127.0.0.1:{port}',
+                'WEB_CONCURRENCY': str(options['workers']),
+                'GUNICORN_THREADS': str(options['threads']),
+                'GUNICORN_ACCESS_LOG': '',
+                'GUNICORN_MAX_REQUESTS': '0',
+                # Only queries are sent, so per-process brokers and caches are fine
+                'GUNICORN_CHECK_WORKERS': 'false',
+            })
+        self.stdout.write(f"Starting {server}: {' '.join(command)}")
+        return subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    @staticmethod
+    def wait_until_ready(process, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"The server exited with status {process.returncode}")
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/graphql?query=%7B__typename%7D', timeout=1)
+                return
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.2)
+        raise CommandError(f"The server did not answer within {timeout} seconds")
+
+    @staticmethod
+    def run_load(port, options):
+        url = f'http://127.0.0.1:{port}/graphql'
+        body = json.dumps({'query': options['query']}).encode()
+        headers = {'Content-Type': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f"JWT {options['token']}"
+
+        def send(_):
+            request = urllib.request.Request(url, data=body, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    ok = response.status == 200 and 'errors' not in json.loads(response.read())
+            except (urllib.error.URLError, ConnectionError, TimeoutError, ValueError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            samples = list(pool.map(send, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        percentiles = statistics.quantiles(latencies, n=100)
+        return {
+            'requests': len(samples),
+            'errors': sum(not ok for _, ok in samples),
+            'rps': len(samples) / elapsed,
+            'p50': percentiles[49],
+            'p95': percentiles[94],
+            'p99': percentiles[98],
+        }
@@ -0,0 +1,168 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+MODES = {
+    # Django's SQLite defaults: rollback journal, deferred transactions, no retries
+    'default': {'SQLITE_TUNED': '0', 'DB_LOCK_RETRIES': '0'},
+    # config/settings.py: WAL, synchronous=NORMAL, BEGIN IMMEDIATE, retry_on_lock
+    'tuned': {'SQLITE_TUNED': '1'},
+}
+
+WRITE_MUTATIONS = (
+    'mutation($id: Int!, $status: String) { updateTask(id: $id, status: $status) { task { id } } }',
+    'mutation($id: Int!, $content: String!) { createComment(taskId: $id, content: $content) { comment { id } } }',
+)
+READ_QUERY = '''query($projectId: Int!) {
+    project(id: $projectId) { name taskCount tasks { id title status } }
+    projectActivity(projectId: $projectId, limit: 20) { action description }
+}'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent updateTask/createComment writers and project readers against a "
+        "scratch SQLite file, with Django's default SQLite settings and with the tuned ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            action='append',
+            dest='modes',
+            choices=MODES,
+            help="SQLite configuration to benchmark (can be repeated; default: all)",
+        )
+        parser.add_argument('--writers', type=int, default=4, help="Writer threads (default: 4)")
+        parser.add_argument('--readers', type=int, default=4, help="Reader threads (default: 4)")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per mode (default: 5)")
+        parser.add_argument('--tasks', type=int, default=50, help="Tasks in the benchmark project (default: 50)")
+        # Internal: run one mode in this process, with the database settings from the environment
+        parser.add_argument('--worker', action='store_true', help="Run a single mode and print JSON stats")
+
+    def handle(self, *args, modes=None, worker=False, **options):
+        if worker:
+            self.stdout.write(json.dumps(self.run_workload(options)))
+            return
+
+        results = []
+        for mode in modes or MODES:
+            self.stdout.write(f"Running {mode} ...")
+            results.append((mode, self.run_mode(mode, options)))
+
+        self.stdout.write(
+            f"{'mode':<8} {'writes/s':>9} {'reads/s':>9} {'write errors':>12} {'read errors':>11} "
+            f"{'write p95 ms':>12} {'read p95 ms':>11}"
+        )
+        for mode, stats in results:
+            self.stdout.write(
+                f"{mode:<8} {stats['writes'] / stats['elapsed']:>9.1f} {stats['reads'] / stats['elapsed']:>9.1f} "
+                f"{stats['write_errors']:>12} {stats['read_errors']:>11} "
+                f"{stats['write_p95']:>12.1f} {stats['read_p95']:>11.1f}"
+            )
+
+    def run_mode(self, mode, options):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, ACTIVITY_WRITER='sync', SQLITE_PATH=os.path.join(directory, 'db.sqlite3'))
+            env.update(MODES[mode])
+            command = [
+                sys.executable, 'manage.py', 'benchmark_sqlite', '--worker',
+                '--writers', str(options['writers']),
+                '--readers', str(options['readers']),
+                '--duration', str(options['duration']),
+                '--tasks', str(options['tasks']),
+            ]
+            completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+            if completed.returncode:
+                raise CommandError(f"The {mode} run failed:\n{completed.stderr}")
+            return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_workload(self, options):
+        from api.schema import schema
+        from django.contrib.auth import get_user_model
+        from organizations.models import Organization, OrganizationMember
+        from projects.models import Project, Task
+
+        call_command('migrate', verbosity=0)
+        owner = get_user_model().objects.create_user('owner@bench.test', 'owner@bench.test', 'pass')
+        organization = Organization.objects.create(name='Bench', slug='bench', contact_email='owner@bench.test')
+        OrganizationMember.objects.create(user=owner, organization=organization, role='OWNER')
+        project = Project.objects.create(name='Bench', organization=organization)
+        task_ids = [
+            Task.objects.create(project=project, title=f'Task {number}').pk for number in range(options['tasks'])
+        ]
+        connection.close()
+
+        factory = RequestFactory()
+        deadline = time.monotonic() + options['duration']
+        samples = {'writes': [], 'reads': [], 'write_errors': 0, 'read_errors': 0}
+        lock = threading.Lock()
+
+        def execute(query, variables):
+            request = factory.post('/graphql')
+            request.user = owner
+            started = time.perf_counter()
+            result = schema.execute(query, variable_values=variables, context_value=request)
+            return time.perf_counter() - started, not result.errors
+
+        def writer(number):
+            count = 0
+            while time.monotonic() < deadline:
+                task_id = task_ids[(number * 7 + count) % len(task_ids)]
+                if count % 2:
+                    variables = {'id': task_id, 'content': f'Comment {count}'}
+                else:
+                    variables = {'id': task_id, 'status': ('TODO', 'IN_PROGRESS', 'DONE')[count % 3]}
+                latency, ok = execute(WRITE_MUTATIONS[count % 2], variables)
+                count += 1
+                with lock:
+                    if ok:
+                        samples['writes'].append(latency)
+                    else:
+                        samples['write_errors'] += 1
+            connection.close()
+
+        def reader(number):
+            while time.monotonic() < deadline:
+                latency, ok = execute(READ_QUERY, {'projectId': project.pk})
+                with lock:
+                    if ok:
+                        samples['reads'].append(latency)
+                    else:
+                        samples['read_errors'] += 1
+            connection.close()
+
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(options['writers'])]
+        threads += [threading.Thread(target=reader, args=(number,)) for number in range(options['readers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            'elapsed': time.monotonic() - started,
+            'writes': len(samples['writes']),
+            'reads': len(samples['reads']),
+            'write_errors': samples['write_errors'],
+            'read_errors': samples['read_errors'],
+            'write_p95': self.p95(samples['writes']),
+            'read_p95': self.p95(samples['reads']),
+        }
+
+    @staticmethod
+    def p95(latencies):
+        if len(latencies) < 2:
+            return sum(latencies) * 1000
+        return statistics.quantiles(latencies, n=20)[18] * 1000
@@ -0,0 +1,45 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary into the replica files from SQLITE_REPLICA_PATHS, standing in "
+        "for replication when trying read replicas locally"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help="Keep copying every INTERVAL seconds, which then is the replicas' lag (default: copy once)",
+        )
+
+    def handle(self, *args, interval=None, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError("Only SQLite replicas can be synced; PostgreSQL replicas use streaming replication")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured; set SQLITE_REPLICA_PATHS")
+
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                self.copy(connections['default'].settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+                self.stdout.write(f"Copied the primary to {alias}")
+            if interval is None:
+                return
+            time.sleep(interval)
+
+    @staticmethod
+    def copy(source_path, target_path):
+        # The backup API copies a consistent snapshot while the primary keeps taking writes
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,175 @@
+"""
+Query planning from the GraphQL selection set.
+
+``optimize(queryset, info)`` walks the fields the client selected below the
+current field and adds the matching ``select_related``, ``prefetch_related``
+and ``only()`` calls, so query count and row width follow the query instead of
+the model. Wide columns such as ``description`` are only loaded when asked for.
+
+Fields with a custom resolver (or that are not model fields) can declare what
+they read from the row in an ``optimizer_hints`` dict on the object type::
+
+    class ActivityType(DjangoObjectType):
+        optimizer_hints = {'user_name': ('user__first_name', 'user__last_name', 'user__email')}
+
+A custom-resolved field without a hint makes the optimizer load full rows for
+that type, so an unknown resolver never causes per-row deferred loads.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, get_named_type
+
+
+class QueryPlan:
+    """The select_related/prefetch_related/only() calls for one queryset"""
+
+    def __init__(self, model):
+        self.model = model
+        self.only = {model._meta.pk.name}
+        self.select_related = set()
+        self.prefetch_related = {}
+
+    def load_all(self, prefix, model):
+        """Keep every column of ``model`` at ``prefix``, for fields we cannot predict"""
+        for field in model._meta.concrete_fields:
+            self.only.add(prefix + field.name)
+
+    def apply(self, queryset, only=()):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related.values())
+        return queryset.only(*sorted(self.only | set(only)))
+
+
+def optimize(queryset, info, only=(), field=None):
+    """
+    Plan ``queryset`` for the fields selected below the field being resolved.
+
+    ``only`` names extra columns the resolver itself reads (e.g. for permission checks).
+    ``field`` plans for a sub-field of the result instead, for wrapper types
+    such as ``{ cursor activities { ... } }``; a dotted path such as
+    ``edges.node`` walks several levels.
+    """
+    object_type = get_named_type(info.return_type)
+    field_nodes = info.field_nodes
+    for name in field.split('.') if field else ():
+        field_nodes = _collect_fields(field_nodes, info).get(name, [])
+        object_type = get_named_type(object_type.fields[name].type)
+    plan = QueryPlan(queryset.model)
+    _plan_selection(plan, '', queryset.model, object_type, field_nodes, info)
+    return plan.apply(queryset, only)
+
+
+def _collect_fields(field_nodes, info):
+    """Group the sub-selections of ``field_nodes`` by field name, expanding fragments"""
+    fields = {}
+
+    def visit(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.setdefault(selection.name.value, []).append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                visit(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = info.fragments.get(selection.name.value)
+                if fragment is not None:
+                    visit(fragment.selection_set)
+
+    for node in field_nodes:
+        visit(node.selection_set)
+    return fields
+
+
+def python_field_names(graphene_type):
+    """``{graphql field name: python attribute name}`` of a graphene type"""
+    names = {}
+    for name, field in graphene_type._meta.fields.items():
+        names[getattr(field, 'name', None) or to_camel_case(name)] = name
+    return names
+
+
+def has_custom_resolver(graphene_type, name):
+    """Whether a field runs its own resolver instead of reading an attribute"""
+    resolver = getattr(graphene_type, f'resolve_{name}', None)
+    # DjangoObjectType.resolve_id only reads the pk
+    if resolver is not None and resolver is not getattr(DjangoObjectType, f'resolve_{name}', None):
+        return True
+    return getattr(graphene_type._meta.fields[name], 'resolver', None) is not None
+
+
+def _plan_selection(plan, prefix, model, object_type, field_nodes, info):
+    graphene_type = getattr(object_type, 'graphene_type', None)
+    if graphene_type is None or not hasattr(graphene_type, '_meta'):
+        plan.load_all(prefix, model)
+        return
+    python_names = python_field_names(graphene_type)
+    hints = getattr(graphene_type, 'optimizer_hints', {})
+
+    for graphql_name, nodes in _collect_fields(field_nodes, info).items():
+        if graphql_name.startswith('__'):
+            continue
+        name = python_names.get(graphql_name)
+        if name is None:
+            continue
+
+        if name in hints:
+            lookups = hints[name]
+        elif has_custom_resolver(graphene_type, name):
+            plan.load_all(prefix, model)
+            continue
+        else:
+            lookups = (name,)
+
+        for lookup in lookups:
+            if lookup == name:
+                field_type = get_named_type(object_type.fields[graphql_name].type)
+                _plan_lookup(plan, prefix, model, lookup, field_type, nodes, info)
+            else:
+                _plan_lookup(plan, prefix, model, lookup, None, None, info)
+
+
+def _plan_lookup(plan, prefix, model, lookup, field_type, nodes, info):
+    """Add one ``a__b__c`` lookup to the plan, recursing into the selection if given"""
+    head, _, rest = lookup.partition('__')
+    try:
+        field = model._meta.get_field(head)
+    except FieldDoesNotExist:
+        # A property or method on the model: we cannot know what it reads
+        plan.load_all(prefix, model)
+        return
+
+    path = prefix + head
+    if not field.is_relation:
+        plan.only.add(path)
+        return
+
+    related_model = field.related_model
+    if field.many_to_one or (field.one_to_one and field.concrete):
+        # Forward FK/1:1: join it in and keep walking on the same plan
+        plan.only.add(path)
+        plan.select_related.add(path)
+        plan.only.add(f'{path}__{related_model._meta.pk.name}')
+        if rest:
+            _plan_lookup(plan, f'{path}__', related_model, rest, None, None, info)
+        elif nodes is not None:
+            _plan_selection(plan, f'{path}__', related_model, field_type, nodes, info)
+        return
+
+    # To-many relation: prefetch with its own planned queryset
+    child = QueryPlan(related_model)
+    if field.one_to_many or field.one_to_one:
+        # Reverse FK: the child rows need their FK back to us
+        child.only.add(field.field.name)
+    if rest:
+        _plan_lookup(child, '', related_model, rest, None, None, info)
+    elif nodes is not None:
+        _plan_selection(child, '', related_model, field_type, nodes, info)
+    else:
+        child.load_all('', related_model)
+    queryset = child.apply(related_model._default_manager.all())
+    plan.prefetch_related[path] = Prefetch(path, queryset=queryset)
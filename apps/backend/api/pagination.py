@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination for Relay-style connection fields.
+
+Pages are fetched with ``WHERE (created_at, id) > (cursor)`` and an index on
+the same columns, so every page costs the same however deep it is, instead of
+an ``OFFSET`` scan. Cursors are opaque base64 strings of ``created_at|id``.
+
+``id`` only breaks ties between rows with the same ``created_at``, so the
+order is total. Rows with equal timestamps page in a stable order. Nothing
+assumes ids grow in insertion order. PostgreSQL does not guarantee that:
+sequences are cached per session, and their values are taken before commit.
+
+A row committed after a page was read is still missed by the later pages if
+its key sorts before that page's cursor. That happens when its
+``created_at`` (set on insert) or its id is older than rows that committed
+first. Connections are for browsing. Clients that must see every new row
+use the ``projectActivity`` subscription.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+import graphene
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def connection_args(**kwargs):
+    """Forward pagination arguments shared by every connection field"""
+    return dict(
+        first=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String(),
+        **kwargs
+    )
+
+
+def encode_cursor(value, pk):
+    return base64.urlsafe_b64encode(f'{value.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(value), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Exception("Invalid cursor")
+
+
+def keyset_page(queryset, first=DEFAULT_PAGE_SIZE, after=None, order_field='created_at', descending=False):
+    """
+    Fetch one page of ``queryset`` ordered by ``(order_field, id)``.
+
+    Returns ``(rows, has_next_page)``; one extra row is read to detect the next page.
+    """
+    if first is None or first < 0:
+        first = DEFAULT_PAGE_SIZE
+    first = min(first, MAX_PAGE_SIZE)
+
+    if after:
+        value, pk = decode_cursor(after)
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{order_field}__{op}': value}) | Q(**{order_field: value, f'pk__{op}': pk})
+        )
+
+    if descending:
+        queryset = queryset.order_by(f'-{order_field}', '-pk')
+    else:
+        queryset = queryset.order_by(order_field, 'pk')
+
+    rows = list(queryset[:first + 1])
+    return rows[:first], len(rows) > first
+
+
+def build_connection(connection_type, rows, has_next_page, after=None, order_field='created_at'):
+    """Wrap a page of rows in ``connection_type`` with edges and page info"""
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(getattr(row, order_field), row.pk))
+        for row in rows
+    ]
+    page_info = graphene.relay.PageInfo(
+        has_next_page=has_next_page,
+        has_previous_page=bool(after),
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+    )
+    return connection_type(edges=edges, page_info=page_info)
+
+
+def paginate(connection_type, queryset, first=DEFAULT_PAGE_SIZE, after=None, order_field='created_at', descending=False):
+    rows, has_next_page = keyset_page(queryset, first, after, order_field, descending)
+    return build_connection(connection_type, rows, has_next_page, after, order_field)
@@ -0,0 +1,118 @@
+"""
+Automatic persisted queries (the Apollo APQ protocol).
+
+A client first sends only the SHA-256 of its query::
+
+    {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "<hash>"}}, "variables": {...}}
+
+If the server knows the hash it runs the stored query. Otherwise it answers
+``PersistedQueryNotFound`` and the client retries once with the query text
+and the hash, which registers the query for every later request.
+
+Registered queries live in Django's cache. With
+``GRAPHQL_PERSISTED_QUERIES_STRICT`` enabled the server only runs the
+operations listed in the ``GRAPHQL_PERSISTED_QUERIES_MANIFEST`` file (Apollo's
+``persisted-query-manifest`` JSON format), and clients cannot register new
+ones, so ad-hoc queries are rejected.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from graphql import GraphQLError
+
+from .documents import query_hash
+
+CACHE_PREFIX = 'apq:'
+
+
+def _error(message, code):
+    return GraphQLError(message, extensions={'code': code})
+
+
+def load_manifest(path):
+    """``{sha256: query}`` from an Apollo persisted query manifest"""
+    with open(path, encoding='utf-8') as manifest:
+        operations = json.load(manifest).get('operations', [])
+    queries = {}
+    for operation in operations:
+        body = operation['body']
+        digest = query_hash(body)
+        if operation.get('id', digest) != digest:
+            raise ValueError(f"Manifest operation {operation.get('name') or operation['id']} has a wrong hash")
+        queries[digest] = body
+    return queries
+
+
+class PersistedQueryRegistry:
+    """Query texts by SHA-256: the manifest allowlist first, then the cache"""
+
+    def __init__(self, strict=False, manifest=None, timeout=None):
+        self.strict = strict
+        self.manifest = manifest
+        self.timeout = timeout
+        self._allowlist = None
+
+    @property
+    def allowlist(self):
+        if self._allowlist is None:
+            self._allowlist = load_manifest(self.manifest) if self.manifest else {}
+        return self._allowlist
+
+    def get(self, sha256):
+        if sha256 in self.allowlist:
+            return self.allowlist[sha256]
+        if self.strict:
+            return None
+        return cache.get(CACHE_PREFIX + sha256)
+
+    def register(self, sha256, query):
+        if not self.strict and sha256 not in self.allowlist:
+            cache.set(CACHE_PREFIX + sha256, query, timeout=self.timeout)
+
+    def resolve(self, query, extensions):
+        """
+        Return the query text to run for a request.
+
+        ``extensions`` is the request's ``extensions`` object (or None). Raises
+        ``GraphQLError`` with an APQ error code when the request cannot run.
+        """
+        persisted = (extensions or {}).get('persistedQuery')
+        if not persisted:
+            if self.strict and query and query_hash(query) not in self.allowlist:
+                raise _error("PersistedQueryNotAllowed", 'PERSISTED_QUERY_NOT_ALLOWED')
+            return query
+
+        if persisted.get('version') != 1:
+            raise _error("Unsupported persisted query version", 'PERSISTED_QUERY_VERSION_NOT_SUPPORTED')
+        sha256 = persisted.get('sha256Hash')
+        if not isinstance(sha256, str):
+            raise _error("Persisted query is missing sha256Hash", 'BAD_PERSISTED_QUERY')
+
+        if not query:
+            query = self.get(sha256)
+            if query is None:
+                raise _error("PersistedQueryNotFound", 'PERSISTED_QUERY_NOT_FOUND')
+            return query
+
+        if query_hash(query) != sha256:
+            raise _error("provided sha does not match query", 'BAD_PERSISTED_QUERY')
+        if self.strict and sha256 not in self.allowlist:
+            raise _error("PersistedQueryNotAllowed", 'PERSISTED_QUERY_NOT_ALLOWED')
+        self.register(sha256, query)
+        return query
+
+
+_registries = {}
+
+
+def get_registry():
+    """The registry for the current settings, loading the manifest once"""
+    options = (
+        getattr(settings, 'GRAPHQL_PERSISTED_QUERIES_STRICT', False),
+        getattr(settings, 'GRAPHQL_PERSISTED_QUERIES_MANIFEST', None),
+        getattr(settings, 'GRAPHQL_PERSISTED_QUERIES_TIMEOUT', None),
+    )
+    if options not in _registries:
+        _registries[options] = PersistedQueryRegistry(*options)
+    return _registries[options]
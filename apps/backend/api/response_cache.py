@@ -0,0 +1,179 @@
+"""
+Versioned cache of GraphQL query responses.
+
+Most members of an organization load the same dashboard and the same boards,
+so a query's result is kept in Django's cache and the next request for it is
+answered without running a single resolver. The cache key covers:
+
+- the query text (its hash), the operation name and the variables;
+- the requesting user's role scope: their role in each organization or
+  project the operation reads, so members with the same role share entries
+  and nobody is served a response their role would not produce;
+- the version counter of each of those organizations and projects.
+
+Mutations in ``projects.schema`` bump the version counters of what they change
+once they commit (``bump_project_version()``), so every cached response that
+read the old data is never looked up again and expires on its own. Membership
+changes bump the organization and all of its projects (``organizations.signals``),
+as project responses can show the members, and so does a counter rebuild for
+the projects it corrects. Only
+operations whose root fields are all listed in ``CACHEABLE_FIELDS`` are
+cached; fields that depend on who the user is (``me``, ``myAssignedTasks``,
+``task`` for members) always execute. Responses with errors are not cached.
+
+A version is the time of its last bump, in nanoseconds. A counter evicted
+from the cache comes back with a new value, so it cannot bring back entries
+written under an old one. With read replicas (``api.routing``), a response
+read from a replica less than ``DATABASE_REPLICA_LAG`` seconds after a bump
+is not stored, as the replica may not have the change yet.
+
+The key also serves as the strong ETag of GET responses (see
+``CachingGraphQLView``): it changes whenever the response could.
+"""
+import hashlib
+import json
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from graphql import FieldNode
+from graphql.execution.values import get_argument_values
+
+from organizations.authz import request_authz
+
+from .documents import query_hash
+from .routing import current_routing
+
+PROJECT, ORGANIZATION, MEMBERSHIPS = 'project', 'organization', 'memberships'
+
+# Root query field -> (what it reads, argument holding the id)
+CACHEABLE_FIELDS = {
+    'project': (PROJECT, 'id'),
+    'filteredTasks': (PROJECT, 'project_id'),
+    'filteredTasksConnection': (PROJECT, 'project_id'),
+    'projectActivity': (PROJECT, 'project_id'),
+    'projectActivityDelta': (PROJECT, 'project_id'),
+    'projectActivityConnection': (PROJECT, 'project_id'),
+    'organizationProjects': (ORGANIZATION, 'organization_id'),
+    'organizationProjectsConnection': (ORGANIZATION, 'organization_id'),
+    # Every organization the user belongs to
+    'allProjects': (MEMBERSHIPS, None),
+    'allProjectsConnection': (MEMBERSHIPS, None),
+    '__typename': (None, None),
+}
+
+
+def _version_key(kind, pk):
+    return f'graphql-response:version:{kind}:{pk}'
+
+
+def bump_versions(project_ids=(), organization_ids=()):
+    """Make every cached response that read these projects or organizations stale"""
+    keys = [_version_key(PROJECT, pk) for pk in project_ids]
+    keys += [_version_key(ORGANIZATION, pk) for pk in organization_ids]
+    if keys:
+        now = time.time_ns()
+        cache.set_many({key: now for key in keys}, timeout=None)
+
+
+def bump_project_version(project):
+    """Invalidate responses that read ``project`` (and its organization's project lists) after commit"""
+    transaction.on_commit(partial(bump_versions, [project.pk], [project.organization_id]))
+
+
+def bump_organization_version(organization_id):
+    """Invalidate responses that read the organization's project lists after commit"""
+    transaction.on_commit(partial(bump_versions, (), [organization_id]))
+
+
+def current_versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def read_scope(prepared, variables):
+    """``[(kind, id)]`` the operation reads, or None when it cannot be cached"""
+    query_type = prepared.schema.query_type
+    scope = []
+    for selection in prepared.operation_ast.selection_set.selections:
+        if not isinstance(selection, FieldNode) or selection.name.value not in CACHEABLE_FIELDS:
+            return None
+        kind, argument = CACHEABLE_FIELDS[selection.name.value]
+        if kind == MEMBERSHIPS:
+            scope.append((kind, None))
+        elif kind is not None:
+            field = query_type.fields[selection.name.value]
+            try:
+                pk = get_argument_values(field, selection, variables).get(argument)
+            except Exception:
+                # Invalid arguments: let execution report them
+                return None
+            scope.append((kind, pk))
+    return scope or None
+
+
+class CachedResponse:
+    """The response cache entry of one query operation"""
+
+    def __init__(self, digest, versions):
+        self.key = f'graphql-response:{digest}'
+        self.etag = f'"{digest}"'
+        self.versions = versions
+
+    def get(self):
+        """The cached ``data`` of the response, or None"""
+        if not settings.GRAPHQL_RESPONSE_CACHE:
+            return None
+        return cache.get(self.key)
+
+    def trusted(self, result):
+        """Whether ``result`` can stand for this key's versions"""
+        if result is None or result.errors or result.data is None:
+            return False
+        routing = current_routing()
+        if routing is not None and routing.replica is not None and not routing.wrote:
+            lag = settings.DATABASE_REPLICA_LAG * 1_000_000_000
+            if time.time_ns() - max(filter(None, self.versions), default=0) < lag:
+                return False
+        return True
+
+    def store(self, result):
+        if settings.GRAPHQL_RESPONSE_CACHE and self.trusted(result):
+            cache.set(self.key, result.data, timeout=settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT)
+
+
+def cached_response(request, prepared, variables, operation_name):
+    """The ``CachedResponse`` of a query operation, or None when it should not be cached"""
+    if not prepared.is_query or prepared.query is None:
+        return None
+    user = getattr(request, 'user', None)
+    if user is None or user.is_anonymous:
+        return None
+    scope = read_scope(prepared, variables or {})
+    if scope is None:
+        return None
+
+    authz = request_authz(request)
+    roles, version_keys = [], []
+    for kind, pk in sorted(set(scope), key=repr):
+        if kind == PROJECT:
+            roles.append((kind, pk, authz.project_role(pk)))
+            version_keys.append(_version_key(PROJECT, pk))
+        elif kind == ORGANIZATION:
+            roles.append((kind, pk, authz.role(pk)))
+            version_keys.append(_version_key(ORGANIZATION, pk))
+        else:
+            roles.append((kind, sorted(authz.roles.items())))
+            version_keys += [_version_key(ORGANIZATION, pk) for pk in sorted(authz.roles)]
+
+    versions = current_versions(version_keys)
+    parts = [query_hash(prepared.query), operation_name, variables, roles, versions]
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return CachedResponse(digest, versions)
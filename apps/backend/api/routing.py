@@ -0,0 +1,146 @@
+"""
+Read-replica routing for GraphQL requests.
+
+With aliases in ``settings.DATABASE_REPLICAS``, the reads of GraphQL query
+operations go to one of those replicas and everything else uses the
+primary (``default``):
+
+- ``RequestRoutingMiddleware`` (Django) gives each request a ``RoutingState``
+  and starts it on the primary;
+- ``OperationRoutingMiddleware`` (GraphQL) picks a replica when a query
+  operation starts, and the primary for mutations;
+- ``ReplicaRouter`` sends reads to the picked replica until the request
+  writes anything; from then on its reads stay on the primary.
+
+Replicas lag behind the primary, so a user whose request wrote is pinned to
+the primary for ``settings.DATABASE_REPLICA_LAG`` seconds and reads what
+they just wrote. The pin is kept in Django's cache, so their next request can
+land on any worker. That needs a cache shared by the workers, which
+``api.checks`` enforces. Code outside a request (management commands, the activity
+writer thread) always uses the primary.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from graphql import OperationType
+
+_state = ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+    """Where the current request reads from"""
+
+    def __init__(self):
+        # Alias reads go to; None for the primary
+        self.replica = None
+        self.wrote = False
+        self.operation = None
+
+
+def current_routing():
+    """The ``RoutingState`` of the current request, or None outside one"""
+    return _state.get()
+
+
+def pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def is_pinned(user):
+    """Whether ``user`` wrote recently enough that replicas may not have caught up"""
+    return user is not None and user.is_authenticated and bool(cache.get(pin_key(user.pk)))
+
+
+class ReplicaRouter:
+    """Routes reads to the request's replica and all writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote or state.replica is None:
+            # Explicit, so objects loaded from a replica do not drag related reads there
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class RequestRoutingMiddleware:
+    """Gives each request its own ``RoutingState`` and pins users whose request wrote"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        self.remember_write(request, state)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        self.remember_write(request, state)
+        return response
+
+    @staticmethod
+    def remember_write(request, state):
+        lag = settings.DATABASE_REPLICA_LAG
+        user = getattr(request, 'user', None)
+        if state.wrote and lag > 0 and user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), True, lag)
+
+
+class OperationRoutingMiddleware:
+    """
+    Chooses the database of each GraphQL operation when its first root field
+    resolves: a replica for queries, the primary for mutations. List it
+    before ``JSONWebTokenMiddleware`` so the user is known by then.
+    """
+
+    def resolve(self, next_, root, info, **kwargs):
+        if info.path.prev is None:
+            state = _state.get()
+            if state is not None and state.operation is not info.operation:
+                state.operation = info.operation
+                state.replica = None
+                if (
+                    info.operation.operation == OperationType.QUERY
+                    and settings.DATABASE_REPLICAS
+                    and not state.wrote
+                    and not is_pinned(getattr(info.context, 'user', None))
+                ):
+                    state.replica = random.choice(settings.DATABASE_REPLICAS)
+        return next_(root, info, **kwargs)
@@ -19,4 +19,10 @@ class Mutation(
 ):
     pass
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(
+    projects.schema.Subscription,
+    graphene.ObjectType
+):
+    pass
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -1,3 +1,1063 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import runpy
+import tempfile
+import time
+import unittest
+import unittest.mock
 
-# Create your tests here.
+import graphene
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import OperationalError, connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory, Client as HttpClient, RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, set_urlconf
+from graphene.test import Client
+from graphql import ExecutionResult
+from graphql_jwt.middleware import JSONWebTokenMiddleware
+from graphql_jwt.shortcuts import get_token
+
+from api.db import is_lock_error, retry_on_lock
+from api import response_cache
+from api.broker import get_broker
+from api.documents import DocumentCache, query_hash
+from api.routing import (
+    OperationRoutingMiddleware, RequestRoutingMiddleware, RoutingState, current_routing, is_pinned, pin_key,
+)
+from api.schema import schema
+from api.views import AsyncGraphQLView, CachingGraphQLView
+from api.websocket import GraphQLWebSocketApplication, PROTOCOL
+from organizations.models import Invitation, Organization, OrganizationMember
+from projects.activity import activity_channel, publish_activity
+from projects.counters import rebuild_task_counters
+from projects.models import Activity, Project, Task, TaskComment
+from projects.tests import MockContext
+
+User = get_user_model()
+
+
+class WebSocketClient:
+    """Drives the ASGI WebSocket application in-process"""
+    def __init__(self, app, subprotocols=(PROTOCOL,)):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': '/graphql', 'subprotocols': list(subprotocols)}
+        self.task = asyncio.ensure_future(app(scope, self.incoming.get, self.outgoing.put))
+    
+    async def connect(self):
+        await self.incoming.put({'type': 'websocket.connect'})
+        return await self.receive()
+    
+    async def send_json(self, data):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+    
+    async def receive(self):
+        return await asyncio.wait_for(self.outgoing.get(), timeout=5)
+    
+    async def receive_json(self):
+        message = await self.receive()
+        return json.loads(message['text'])
+    
+    async def disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+class ProjectFixture:
+    """An organization with an owner, a member and one project, over an empty cache"""
+    
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.member = User.objects.create_user('member@test.com', 'member@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        OrganizationMember.objects.create(user=self.member, organization=self.org, role='MEMBER')
+        self.project = Project.objects.create(name='Board', organization=self.org)
+
+
+class GraphQLWebSocketTests(ProjectFixture, TestCase):
+    """Tests for the graphql-transport-ws endpoint"""
+    
+    def setUp(self):
+        super().setUp()
+        self.token = get_token(self.owner)
+        self.app = GraphQLWebSocketApplication(schema)
+    
+    async def test_subscribe_and_receive_activity(self):
+        """An authenticated client should receive published activities"""
+        client = WebSocketClient(self.app)
+        accepted = await client.connect()
+        self.assertEqual(accepted['subprotocol'], PROTOCOL)
+        
+        await client.send_json({'type': 'connection_init', 'payload': {'Authorization': f'JWT {self.token}'}})
+        self.assertEqual((await client.receive_json())['type'], 'connection_ack')
+        
+        await client.send_json({'type': 'ping'})
+        self.assertEqual((await client.receive_json())['type'], 'pong')
+        
+        await client.send_json({
+            'id': '1',
+            'type': 'subscribe',
+            'payload': {'query': 'subscription { projectActivity(projectId: %d) { description } }' % self.project.id},
+        })
+        await asyncio.sleep(0.1)
+        activity = await sync_to_async(Activity.objects.create)(
+            project=self.project, user=self.owner, action='TASK_CREATED', payload={'title': 'WS'}
+        )
+        await sync_to_async(publish_activity)(activity)
+        
+        message = await client.receive_json()
+        self.assertEqual(message['type'], 'next')
+        self.assertEqual(message['id'], '1')
+        self.assertEqual(message['payload']['data']['projectActivity']['description'], 'created task "WS"')
+        await client.disconnect()
+    
+    @override_settings(GRAPHQL_SUBSCRIPTION_QUEUE_SIZE=2)
+    async def test_slow_subscriber_is_closed(self):
+        """A subscriber that falls behind its channel should be dropped with 4429, not buffered forever"""
+        client = WebSocketClient(self.app)
+        await client.connect()
+        await client.send_json({'type': 'connection_init', 'payload': {'Authorization': f'JWT {self.token}'}})
+        await client.receive_json()
+        await client.send_json({
+            'id': '1',
+            'type': 'subscribe',
+            'payload': {'query': 'subscription { projectActivity(projectId: %d) { description } }' % self.project.id},
+        })
+        await asyncio.sleep(0.1)
+        
+        # Published faster than the subscription can read them
+        for activity_id in range(5):
+            get_broker().publish(activity_channel(self.project.id), activity_id)
+        self.assertEqual(await client.receive(), {'type': 'websocket.close', 'code': 4429})
+        self.assertFalse(get_broker()._subscribers.get(activity_channel(self.project.id)))
+        await client.disconnect()
+    
+    @override_settings(GRAPHQL_MAX_QUERY_COST=100)
+    async def test_subscriptions_are_held_to_the_cost_budget(self):
+        """A subscription over the cost budget should be refused like an HTTP query"""
+        client = WebSocketClient(self.app)
+        await client.connect()
+        await client.send_json({'type': 'connection_init', 'payload': {'Authorization': f'JWT {self.token}'}})
+        await client.receive_json()
+        query = 'subscription { projectActivity(projectId: %d) { task { project { tasks { comments { content } } } } } }'
+        await client.send_json({'id': '1', 'type': 'subscribe', 'payload': {'query': query % self.project.id}})
+        
+        message = await client.receive_json()
+        self.assertEqual(message['type'], 'error')
+        self.assertEqual(message['payload'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+        await client.disconnect()
+    
+    async def test_invalid_token_is_rejected(self):
+        """A bad JWT should close the connection as unauthorized"""
+        client = WebSocketClient(self.app)
+        await client.connect()
+        await client.send_json({'type': 'connection_init', 'payload': {'Authorization': 'JWT not-a-token'}})
+        closed = await client.receive()
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4401})
+        await client.disconnect()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Plans are checked with SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTests(ProjectFixture, TestCase):
+    """Every query a resolver issues should use an index, not scan a whole table"""
+    
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(title='Fix login', project=self.project, description='Crashes')
+        self.task.assignees.add(self.member)
+        TaskComment.objects.create(task=self.task, content='On it', author=self.member)
+        Activity.objects.create(project=self.project, user=self.owner, action='TASK_CREATED', task=self.task)
+        
+        self.client = Client(schema)
+    
+    def full_scans(self, query, user, variables=None):
+        """Execute ``query`` and return the plan lines of its statements that scan a table"""
+        with CaptureQueriesContext(connection) as captured:
+            result = self.client.execute(query, variables=variables, context=MockContext(user))
+        self.assertIsNone(result.get('errors'), query)
+        
+        scans = []
+        with connection.cursor() as cursor:
+            for statement in captured.captured_queries:
+                sql = statement['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    # "SCAN t USING INDEX i" walks an index; a bare "SCAN t" reads the whole table
+                    if detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail:
+                        scans.append(f'{detail}  <-  {sql}')
+        return scans
+    
+    def assertNoFullScans(self, query, user=None, variables=None):
+        scans = self.full_scans(query, user or self.owner, variables)
+        self.assertEqual(scans, [], 'Full table scan in:\n' + '\n'.join(scans))
+    
+    def test_project_queries(self):
+        self.assertNoFullScans('{ allProjects { id name taskCount completionRate } }')
+        self.assertNoFullScans('{ organizationProjects(organizationId: %d) { id } }' % self.org.id)
+        self.assertNoFullScans('''
+            { project(id: %d) { name tasks { title assignees { email } comments { content author { email } } } } }
+        ''' % self.project.id)
+    
+    def test_task_queries(self):
+        project_id = self.project.id
+        self.assertNoFullScans('{ task(id: %d) { title assignees { email } } }' % self.task.id, self.member)
+        self.assertNoFullScans('{ myAssignedTasks(projectId: %d) { title } }' % project_id, self.member)
+        self.assertNoFullScans('{ filteredTasks(projectId: %d, status: "TODO") { title } }' % project_id)
+        self.assertNoFullScans('{ filteredTasks(projectId: %d, assigneeId: %d) { title } }' % (project_id, self.member.id))
+        self.assertNoFullScans('{ filteredTasks(projectId: %d, search: "log") { title } }' % project_id)
+    
+    def test_activity_queries(self):
+        project_id = self.project.id
+        self.assertNoFullScans('{ projectActivity(projectId: %d) { description userName } }' % project_id)
+        self.assertNoFullScans('{ projectActivityDelta(projectId: %d) { cursor activities { id } } }' % project_id)
+    
+    def test_connection_pages(self):
+        queries = [
+            '{ allProjectsConnection(first: 1) { edges { cursor node { id } } } }',
+            '{ filteredTasksConnection(projectId: %d, first: 1) { edges { cursor node { id } } } }' % self.project.id,
+            '{ projectActivityConnection(projectId: %d, first: 1) { edges { cursor node { id } } } }' % self.project.id,
+            '{ organizationMembersConnection(organizationId: %d, first: 1) { edges { cursor node { id } } } }' % self.org.id,
+        ]
+        for query in queries:
+            first_page = self.client.execute(query, context=MockContext(self.owner))['data']
+            cursor = list(first_page.values())[0]['edges'][0]['cursor']
+            self.assertNoFullScans(query.replace('first: 1', 'first: 1, after: "%s"' % cursor))
+    
+    def test_organization_queries(self):
+        org_id = self.org.id
+        self.assertNoFullScans('{ myOrganizations { id name } }')
+        self.assertNoFullScans('{ organization(id: %d) { name } }' % org_id)
+        self.assertNoFullScans('{ organizationMembers(organizationId: %d) { role user { email } } }' % org_id)
+        self.assertNoFullScans('{ myMembership(organizationId: %d) { role } }' % org_id)
+
+
+class DocumentCacheTests(TestCase):
+    """Tests for reusing parsed and validated documents in the /graphql view"""
+    
+    def setUp(self):
+        CachingGraphQLView.document_cache.clear()
+        self.http = HttpClient()
+    
+    def post(self, query):
+        return self.http.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+    
+    def test_repeated_query_is_parsed_once(self):
+        """The second identical request should be served from the cache"""
+        for _ in range(3):
+            response = self.post('query GetMe { me { id } }')
+            self.assertEqual(response.json()['data'], {'me': None})
+        stats = CachingGraphQLView.document_cache.stats()
+        self.assertEqual((stats['misses'], stats['hits'], stats['size']), (1, 2, 1))
+    
+    def test_invalid_documents_keep_their_errors(self):
+        """Syntax and validation errors should be reported on cache hits too"""
+        for _ in range(2):
+            self.assertEqual(self.post('{ me { id }').status_code, 400)
+            response = self.post('{ me { shoeSize } }')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('shoeSize', response.json()['errors'][0]['message'])
+        self.assertEqual(CachingGraphQLView.document_cache.stats()['hits'], 2)
+    
+    def test_mutations_over_get_are_still_rejected(self):
+        """A cached mutation document should not make GET mutations possible"""
+        self.post('mutation { verifyToken(token: "x") { payload } }')
+        response = self.http.get('/graphql', {'query': 'mutation { verifyToken(token: "x") { payload } }'},
+                                 HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 405)
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        """The cache should stay within its size, dropping the oldest entry"""
+        cache = DocumentCache(maxsize=2)
+        graphql_schema = schema.graphql_schema
+        for query in ['{ me { id } }', '{ me { email } }', '{ me { id } }', '{ me { username } }']:
+            cache.get(graphql_schema, query)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 3, 'size': 2, 'maxsize': 2})
+        cache.get(graphql_schema, '{ me { email } }')
+        self.assertEqual(cache.stats()['misses'], 4)
+
+
+class PersistedQueryTests(TestCase):
+    """Tests for automatic persisted queries and the strict allowlist"""
+    
+    query = 'query GetMe { me { id } }'
+    
+    def setUp(self):
+        cache.clear()
+        self.http = HttpClient()
+        self.sha256 = query_hash(self.query)
+    
+    def post(self, query=None, sha256=None):
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha256 or self.sha256}}}
+        if query:
+            body['query'] = query
+        return self.http.post('/graphql', json.dumps(body), content_type='application/json')
+    
+    def error_code(self, response):
+        return response.json()['errors'][0]['extensions']['code']
+    
+    def test_unknown_hash_then_register_then_hash_only(self):
+        """The APQ round trip: miss, register with the text, then run by hash"""
+        self.assertEqual(self.error_code(self.post()), 'PERSISTED_QUERY_NOT_FOUND')
+        self.assertEqual(self.post(self.query).json()['data'], {'me': None})
+        self.assertEqual(self.post().json()['data'], {'me': None})
+    
+    def test_hash_only_get_request(self):
+        """Polling clients can send just the hash in a GET query string"""
+        self.post(self.query)
+        response = self.http.get('/graphql', {
+            'extensions': json.dumps({'persistedQuery': {'version': 1, 'sha256Hash': self.sha256}}),
+        }, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['data'], {'me': None})
+    
+    def test_mismatched_hash_is_rejected(self):
+        """A query should not be registered under another query's hash"""
+        response = self.post('{ me { email } }')
+        self.assertEqual(self.error_code(response), 'BAD_PERSISTED_QUERY')
+        self.assertEqual(self.error_code(self.post()), 'PERSISTED_QUERY_NOT_FOUND')
+    
+    def test_strict_mode_only_runs_manifest_operations(self):
+        """With the allowlist enforced, ad-hoc and client-registered queries are refused"""
+        manifest = {
+            'format': 'apollo-persisted-query-manifest',
+            'version': 1,
+            'operations': [{'id': self.sha256, 'name': 'GetMe', 'type': 'query', 'body': self.query}],
+        }
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump(manifest, handle)
+        self.addCleanup(os.remove, handle.name)
+        
+        with override_settings(GRAPHQL_PERSISTED_QUERIES_STRICT=True, GRAPHQL_PERSISTED_QUERIES_MANIFEST=handle.name):
+            self.assertEqual(self.post().json()['data'], {'me': None})
+            
+            adhoc = '{ me { email } }'
+            response = self.http.post('/graphql', json.dumps({'query': adhoc}), content_type='application/json')
+            self.assertEqual(self.error_code(response), 'PERSISTED_QUERY_NOT_ALLOWED')
+            self.assertEqual(self.error_code(self.post(adhoc, query_hash(adhoc))), 'PERSISTED_QUERY_NOT_ALLOWED')
+            self.assertEqual(self.error_code(self.post(sha256=query_hash(adhoc))), 'PERSISTED_QUERY_NOT_FOUND')
+
+
+class QueryCostTests(TestCase):
+    """Tests for the query cost and depth budget"""
+    
+    def setUp(self):
+        self.http = HttpClient()
+    
+    def post(self, query, variables=None):
+        body = json.dumps({'query': query, 'variables': variables or {}})
+        return self.http.post('/graphql', body, content_type='application/json')
+    
+    def estimated(self, query, variables=None):
+        return self.post(query, variables).json()['extensions']['cost']['estimated']
+    
+    def test_cost_is_reported_in_extensions(self):
+        """Every response should carry its estimated cost and the budget"""
+        response = self.post('{ me { id email } }')
+        self.assertEqual(response.json()['extensions']['cost'], {'estimated': 1, 'depth': 2, 'limit': 5000})
+    
+    def test_size_arguments_multiply_the_selection(self):
+        """first/limit arguments, literal or variable, set the list sizes"""
+        self.assertEqual(self.estimated('{ projectActivity(projectId: 1, limit: 5) { id task { id } } }'), 10)
+        query = '''
+            query Page($first: Int) {
+                filteredTasksConnection(projectId: 1, first: $first) { edges { node { id project { id } } } }
+            }
+        '''
+        # connection + edges + nodes + their projects
+        self.assertEqual(self.estimated(query, {'first': 50}), 1 + 50 + 50 + 50)
+        self.assertEqual(self.estimated(query), 1 + 20 + 20 + 20)
+    
+    def test_sizes_are_read_like_the_resolvers_read_them(self):
+        """Negative and oversized page sizes should cost the page the resolver actually serves"""
+        query = 'query Page($first: Int) { allProjectsConnection(first: $first) { edges { node { tasks { id } } } } }'
+        default_page = self.estimated(query, {'first': 20})
+        self.assertEqual(self.estimated(query, {'first': -1}), default_page)
+        self.assertEqual(self.estimated(query, {'first': None}), default_page)
+        self.assertEqual(self.estimated(query, {'first': 1000}), self.estimated(query, {'first': 100}))
+        
+        fanout = 'allProjectsConnection(first: %d) { edges { node { tasks { comments { task { comments { content } } } } } } }'
+        for first in (-1, 20):
+            error = self.post('{ %s }' % (fanout % first)).json()['errors'][0]
+            self.assertEqual(error['extensions']['code'], 'QUERY_TOO_COMPLEX')
+    
+    def test_deep_fan_out_is_rejected_before_execution(self):
+        """A query over budget should fail without touching the database"""
+        query = '''
+            query Fanout {
+                allProjects { tasks { comments { task { project { tasks { id } } } } } }
+            }
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(query)
+        self.assertEqual(response.status_code, 400)
+        error = response.json()['errors'][0]
+        self.assertEqual(error['extensions']['code'], 'QUERY_TOO_COMPLEX')
+        self.assertIn('exceeds the maximum of 5000', error['message'])
+        self.assertNotIn('data', response.json())
+        self.assertEqual(len(queries), 0)
+    
+    @override_settings(GRAPHQL_MAX_QUERY_DEPTH=3)
+    def test_depth_limit(self):
+        """Nesting deeper than the limit should be rejected, through fragments too"""
+        query = '''
+            query { task(id: 1) { ...Deep } }
+            fragment Deep on TaskType { project { organization { name } } }
+        '''
+        error = self.post(query).json()['errors'][0]
+        self.assertEqual(error['message'], 'Query depth 4 exceeds the maximum of 3')
+
+
+class ServerProfileTests(unittest.TestCase):
+    """Tests for the environment-driven gunicorn settings"""
+    
+    def load(self, **env):
+        path = os.path.join(settings.BASE_DIR, 'config', 'gunicorn.conf.py')
+        with unittest.mock.patch.dict(os.environ, env):
+            return runpy.run_path(path)
+    
+    def test_wsgi_profile(self):
+        """The WSGI profile should use threaded workers sized from the environment"""
+        config = self.load(SERVER_INTERFACE='wsgi', WEB_CONCURRENCY='3', GUNICORN_THREADS='8', PORT='9000')
+        self.assertEqual(config['wsgi_app'], 'config.wsgi:application')
+        self.assertEqual((config['worker_class'], config['workers'], config['threads']), ('gthread', 3, 8))
+        self.assertEqual(config['bind'], '0.0.0.0:9000')
+        self.assertTrue(config['preload_app'])
+    
+    def test_several_workers_need_shared_state(self):
+        """gunicorn should refuse to fork several workers around the in-process broker or cache"""
+        config = self.load()
+        server = unittest.mock.Mock(cfg=unittest.mock.Mock(workers=4))
+        with tempfile.TemporaryDirectory() as directory:
+            shared_cache = {
+                'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            }
+            with override_settings(GRAPHQL_SUBSCRIPTION_BROKER='api.broker.InProcessBroker', CACHES=shared_cache):
+                with self.assertRaisesRegex(Exception, 'GRAPHQL_SUBSCRIPTION_BROKER'):
+                    config['on_starting'](server)
+            with override_settings(GRAPHQL_SUBSCRIPTION_BROKER='api.broker.RedisBroker'):
+                with self.assertRaisesRegex(Exception, 'CACHE_BACKEND'):
+                    config['on_starting'](server)
+                server.cfg.workers = 1
+                config['on_starting'](server)
+            with override_settings(GRAPHQL_SUBSCRIPTION_BROKER='api.broker.RedisBroker', CACHES=shared_cache):
+                server.cfg.workers = 4
+                config['on_starting'](server)
+    
+    def test_asgi_profile_is_the_default(self):
+        """Without SERVER_INTERFACE the ASGI app should run on uvicorn workers"""
+        config = self.load(GUNICORN_PRELOAD='false', GUNICORN_MAX_REQUESTS='0')
+        self.assertEqual(config['wsgi_app'], 'config.asgi:application')
+        self.assertEqual(config['worker_class'], 'uvicorn_worker.UvicornWorker')
+        self.assertFalse(config['preload_app'])
+        self.assertEqual(config['max_requests'], 0)
+
+
+class AsyncGraphQLViewTests(ProjectFixture, TestCase):
+    """Tests for query execution on the event loop"""
+    
+    def setUp(self):
+        super().setUp()
+        task = Task.objects.create(title='Fix login', project=self.project, status='DONE')
+        task.assignees.add(self.owner)
+        Task.objects.create(title='Write docs', project=self.project)
+        Activity.objects.create(project=self.project, user=self.owner, action='TASK_CREATED', task=task)
+        self.factory = AsyncRequestFactory()
+        self.view = AsyncGraphQLView.as_view()
+    
+    async def post(self, query, user=None, view=None, headers=None):
+        request = self.factory.post(
+            '/graphql', data=json.dumps({'query': query}), content_type='application/json', headers=headers
+        )
+        request.user = user or AnonymousUser()
+        response = await (view or self.view)(request)
+        return response.status_code, json.loads(response.content)
+    
+    async def test_queries_match_the_sync_view(self):
+        """Async twins, threaded resolvers and inline fields should give the sync view's data"""
+        query = '''{
+            project(id: %d) {
+                name taskCount completionRate
+                tasks { title status assignees { email } }
+            }
+            projectActivity(projectId: %d) { action description userName }
+            projectActivityDelta(projectId: %d) { cursor hasMore activities { description } }
+        }''' % ((self.project.id,) * 3)
+        status, body = await self.post(query, self.owner)
+        self.assertEqual(status, 200)
+        self.assertNotIn('errors', body)
+        
+        expected = await sync_to_async(schema.execute)(query, context_value=MockContext(self.owner))
+        self.assertIsNone(expected.errors)
+        self.assertEqual(body['data'], expected.data)
+        self.assertEqual(body['data']['project']['completionRate'], 50.0)
+    
+    async def test_sibling_fields_resolve_concurrently(self):
+        """Two slow async fields should take as long as one"""
+        class Query(graphene.ObjectType):
+            first = graphene.String()
+            second = graphene.String()
+            
+            async def aresolve_first(self, info):
+                await asyncio.sleep(0.2)
+                return 'first'
+            
+            async def aresolve_second(self, info):
+                await asyncio.sleep(0.2)
+                return 'second'
+        
+        view = AsyncGraphQLView.as_view(schema=graphene.Schema(query=Query))
+        started = time.monotonic()
+        status, body = await self.post('{ first second }', view=view)
+        self.assertEqual(body['data'], {'first': 'first', 'second': 'second'})
+        self.assertLess(time.monotonic() - started, 0.35)
+    
+    async def test_mutations_run_on_the_sync_path(self):
+        """Mutations should still write and log their activity"""
+        status, body = await self.post(
+            'mutation { createTask(projectId: %d, title: "Async") { task { title } } }' % self.project.id, self.owner
+        )
+        self.assertEqual(body['data']['createTask']['task']['title'], 'Async')
+        self.assertTrue(await Task.objects.filter(title='Async').aexists())
+        self.assertEqual(await Activity.objects.filter(action='TASK_CREATED').acount(), 2)
+    
+    async def test_jwt_header_is_authenticated_before_execution(self):
+        """A valid token should authenticate; a bad one should fail each root field"""
+        token = await sync_to_async(get_token)(self.owner)
+        query = '{ project(id: %d) { name } }' % self.project.id
+        _, body = await self.post(query, headers={'Authorization': f'JWT {token}'})
+        self.assertEqual(body['data']['project']['name'], 'Board')
+        
+        _, body = await self.post(query, headers={'Authorization': 'JWT not-a-token'})
+        self.assertEqual(body['errors'][0]['message'], 'Error decoding signature')
+        
+        _, body = await self.post(query)
+        self.assertEqual(body['errors'][0]['message'], 'Not authenticated')
+    
+    async def test_persisted_query_lookup_leaves_the_event_loop(self):
+        """prepare_operation reads and writes the registry cache, so it should run on the sync thread"""
+        loops = []
+        prepare_operation = AsyncGraphQLView.prepare_operation
+        
+        def record(view, *args, **kwargs):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return prepare_operation(view, *args, **kwargs)
+        
+        with unittest.mock.patch.object(AsyncGraphQLView, 'prepare_operation', record):
+            status, body = await self.post('{ me { email } }', self.owner)
+        self.assertEqual(body['data']['me']['email'], self.owner.email)
+        self.assertEqual(loops, [None])
+    
+    async def test_failed_mutations_roll_back_the_request(self):
+        """Like the sync view, a failed mutation should mark an ATOMIC_REQUESTS transaction for rollback"""
+        with unittest.mock.patch.dict(connection.settings_dict, ATOMIC_REQUESTS=True):
+            status, body = await self.post(
+                'mutation { createTask(projectId: 0, title: "Async") { task { title } } }', self.owner
+            )
+        self.assertIn('errors', body)
+        self.assertTrue(await sync_to_async(lambda: connection.needs_rollback)())
+        await sync_to_async(setattr)(connection, 'needs_rollback', False)
+    
+    async def test_asgi_application_serves_the_async_view(self):
+        """config.asgi should route /graphql to AsyncGraphQLView whatever ROOT_URLCONF says"""
+        from config.asgi import django_application
+        request = self.factory.post(
+            '/graphql', data=json.dumps({'query': '{ __typename }'}), content_type='application/json'
+        )
+        response = await django_application.get_response_async(request)
+        set_urlconf(None)
+        self.assertEqual(json.loads(response.content)['data'], {'__typename': 'Query'})
+        self.assertIs(request.resolver_match.func.view_class, AsyncGraphQLView)
+        self.assertIs(resolve('/graphql').func.view_class, CachingGraphQLView)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Checks the SQLite connection options")
+class SQLiteConcurrencyTests(TransactionTestCase):
+    """Tests for the tuned SQLite connection and the mutation retry wrapper"""
+    
+    def test_tuned_connections_use_wal_and_immediate_transactions(self):
+        """New connections to a database file should switch it to WAL and take write locks up front"""
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = SQLiteDatabaseWrapper(dict(connection.settings_dict, NAME=os.path.join(directory, 'db.sqlite3')))
+            try:
+                with wrapper.cursor() as cursor:
+                    self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+                    self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+                    self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+            finally:
+                wrapper.close()
+    
+    @override_settings(DB_LOCK_RETRY_BACKOFF=0)
+    def test_locked_attempts_are_rolled_back_and_retried(self):
+        """Only the attempt that commits should leave rows and run on_commit hooks"""
+        org = Organization.objects.create(name='Org', slug='org', contact_email='org@test.com')
+        attempts, committed = [], []
+        
+        @retry_on_lock
+        def mutate():
+            attempts.append(1)
+            Project.objects.create(name=f'Attempt {len(attempts)}', organization=org)
+            transaction.on_commit(lambda: committed.append(len(attempts)))
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+        
+        with self.assertLogs('api.db', 'WARNING'):
+            self.assertEqual(mutate(), 'done')
+        self.assertEqual(list(Project.objects.values_list('name', flat=True)), ['Attempt 3'])
+        self.assertEqual(committed, [3])
+    
+    @override_settings(DB_LOCK_RETRIES=2, DB_LOCK_RETRY_BACKOFF=0)
+    def test_retries_are_bounded_and_limited_to_lock_errors(self):
+        """Lock errors should give up after the configured retries; other errors should not be retried"""
+        calls = []
+        
+        @retry_on_lock
+        def locked():
+            calls.append(1)
+            raise OperationalError('database is locked')
+        
+        with self.assertLogs('api.db', 'WARNING'), self.assertRaises(OperationalError):
+            locked()
+        self.assertEqual(len(calls), 3)
+        
+        calls.clear()
+        
+        @retry_on_lock
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table: missing')
+        
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(len(calls), 1)
+        
+        # Inside an outer transaction only the outer block could be retried
+        calls.clear()
+        with self.assertRaises(OperationalError), transaction.atomic():
+            locked()
+        self.assertEqual(len(calls), 1)
+
+    
+    def test_postgresql_deadlocks_are_lock_errors(self):
+        """Deadlocks and serialization failures should be retried like SQLite lock errors"""
+        class DeadlockDetected(Exception):
+            sqlstate = '40P01'
+        
+        error = OperationalError('deadlock detected')
+        error.__cause__ = DeadlockDetected()
+        self.assertTrue(is_lock_error(error))
+        self.assertFalse(is_lock_error(OperationalError('connection refused')))
+
+
+class DatabaseSettingsTests(unittest.TestCase):
+    """Tests for the environment-driven DATABASES setting"""
+    
+    def load(self, **env):
+        path = os.path.join(settings.BASE_DIR, 'config', 'settings.py')
+        with unittest.mock.patch.dict(os.environ, env):
+            return runpy.run_path(path)['DATABASES']['default']
+    
+    def test_sqlite_is_the_default(self):
+        """SQLite should read its file from SQLITE_PATH"""
+        database = self.load(DATABASE_ENGINE='sqlite', SQLITE_PATH='/tmp/app.sqlite3')
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], '/tmp/app.sqlite3')
+    
+    def test_postgresql_uses_a_connection_pool(self):
+        """PostgreSQL should pool connections, which rules out persistent ones"""
+        database = self.load(
+            DATABASE_ENGINE='postgresql', POSTGRES_HOST='db', POSTGRES_DB='app', DB_POOL_MAX_SIZE='20'
+        )
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((database['HOST'], database['NAME']), ('db', 'app'))
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10.0})
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+    
+    def test_postgresql_without_pool_keeps_connections(self):
+        """With DB_POOL=0 connections should persist for DB_CONN_MAX_AGE seconds"""
+        database = self.load(DATABASE_ENGINE='postgresql', DB_POOL='0', DB_CONN_MAX_AGE='120')
+        self.assertNotIn('pool', database['OPTIONS'])
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'], DATABASE_ROUTERS=['api.routing.ReplicaRouter'], DATABASE_REPLICA_LAG=5
+)
+class ReplicaRoutingTests(ProjectFixture, TransactionTestCase):
+    """
+    Tests for sending GraphQL queries to a read replica.
+
+    'replica' is a test mirror of 'default', so these tests check which
+    connection ran the queries rather than whether stale rows were read.
+    """
+    databases = {'default', 'replica'}
+    
+    def setUp(self):
+        super().setUp()
+        graphql_middleware = [OperationRoutingMiddleware(), JSONWebTokenMiddleware()]
+        self.view = RequestRoutingMiddleware(CachingGraphQLView.as_view(middleware=graphql_middleware))
+        self.async_view = RequestRoutingMiddleware(AsyncGraphQLView.as_view(middleware=graphql_middleware))
+    
+    def request(self, factory, user, query):
+        return factory.post(
+            '/graphql', data=json.dumps({'query': query}), content_type='application/json',
+            headers={'Authorization': f'JWT {get_token(user)}'},
+        )
+    
+    def post(self, user, query):
+        request = self.request(RequestFactory(), user, query)
+        request.user = AnonymousUser()
+        return json.loads(self.view(request).content)
+    
+    def project_database(self, user):
+        """The alias that served ``user``'s project query"""
+        with CaptureQueriesContext(connections['replica']) as replica:
+            body = self.post(user, '{ project(id: %d) { name } }' % self.project.pk)
+        self.assertEqual(body['data']['project']['name'], 'Board')
+        return 'replica' if tables_queried(replica, 'projects_project') else 'default'
+    
+    def test_queries_read_from_the_replica(self):
+        """Query operations should read from the replica"""
+        self.assertEqual(self.project_database(self.owner), 'replica')
+        # Outside a request everything reads from the primary
+        self.assertEqual(Project.objects.get(pk=self.project.pk)._state.db, 'default')
+    
+    def test_mutations_use_the_primary_and_pin_the_writer(self):
+        """A mutation should read and write the primary; its author should then read the primary for a while"""
+        mutation = 'mutation { createTask(projectId: %d, title: "New") { task { title project { name } } } }'
+        with CaptureQueriesContext(connections['replica']) as replica:
+            body = self.post(self.owner, mutation % self.project.pk)
+        self.assertEqual(body['data']['createTask']['task']['project']['name'], 'Board')
+        self.assertEqual(len(replica), 0)
+        
+        self.assertEqual(self.project_database(self.owner), 'default')
+        self.assertEqual(self.project_database(self.member), 'replica')
+        
+        cache.clear()
+        self.assertEqual(self.project_database(self.owner), 'replica')
+    
+    def test_reads_after_a_write_use_the_primary(self):
+        """Once a request wrote, its reads should stay on the primary"""
+        def view(request):
+            current_routing().replica = 'replica'
+            before = Project.objects.get(pk=self.project.pk)._state.db
+            Task.objects.create(project=self.project, title='Written')
+            after = Project.objects.get(pk=self.project.pk)._state.db
+            return HttpResponse(f'{before}|{after}')
+        
+        request = RequestFactory().get('/')
+        request.user = self.owner
+        response = RequestRoutingMiddleware(view)(request)
+        self.assertEqual(response.content.decode(), 'replica|default')
+        self.assertTrue(cache.get(pin_key(self.owner.pk)))
+    
+    def test_pin_is_seen_by_other_workers(self):
+        """Through a shared cache, a write on one worker should pin the user on the others"""
+        with tempfile.TemporaryDirectory() as directory:
+            # Each worker process has its own client for the same storage
+            this_worker, other_worker = FileBasedCache(directory, {}), FileBasedCache(directory, {})
+            mutation = 'mutation { createTask(projectId: %d, title: "New") { task { id } } }' % self.project.pk
+            with unittest.mock.patch('api.routing.cache', other_worker):
+                self.post(self.owner, mutation)
+            with unittest.mock.patch('api.routing.cache', this_worker):
+                self.assertTrue(is_pinned(self.owner))
+                self.assertFalse(is_pinned(self.member))
+    
+    def test_async_view_reads_from_the_replica(self):
+        """Async resolvers and threaded resolvers should both use the replica"""
+        Task.objects.create(project_id=self.project.pk, title='Replicated')
+        
+        request = self.request(
+            AsyncRequestFactory(), self.owner, '{ project(id: %d) { name tasks { title } } }' % self.project.pk
+        )
+        request.user = AnonymousUser()
+        # Run from this thread, where thread-sensitive ORM calls of the view land
+        with CaptureQueriesContext(connections['replica']) as replica:
+            body = json.loads(async_to_sync(self.async_view)(request).content)
+        self.assertEqual(body['data']['project'], {'name': 'Board', 'tasks': [{'title': 'Replicated'}]})
+        self.assertTrue(tables_queried(replica, 'projects_project'))
+        self.assertTrue(tables_queried(replica, 'projects_task'))
+
+
+def tables_queried(queries, table):
+    """Whether any captured query read from ``table``"""
+    return any(f'"{table}"' in query['sql'] for query in queries)
+
+
+class ResponseCacheTests(ProjectFixture, TestCase):
+    """Tests for the versioned GraphQL response cache"""
+    
+    def setUp(self):
+        super().setUp()
+        self.other_member = User.objects.create_user('other@test.com', 'other@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.other_member, organization=self.org, role='MEMBER')
+        self.other_project = Project.objects.create(name='Other', organization=self.org)
+        self.task = Task.objects.create(project=self.project, title='Task', status='TODO')
+        self.board = '{ project(id: %d) { name tasks { title status } } }' % self.project.pk
+        self.http = HttpClient()
+    
+    def post(self, user, query):
+        """The response body and the SQL run for it"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.http.post(
+                '/graphql', data=json.dumps({'query': query}), content_type='application/json',
+                HTTP_AUTHORIZATION=f'JWT {get_token(user)}',
+            )
+        return json.loads(response.content), [query['sql'] for query in queries]
+    
+    def mutate(self, user, query):
+        with self.captureOnCommitCallbacks(execute=True):
+            body, _ = self.post(user, query)
+        self.assertNotIn('errors', body)
+    
+    def assertCached(self, sql):
+        self.assertFalse([statement for statement in sql if 'projects_' in statement], sql)
+    
+    def test_repeated_query_skips_resolvers(self):
+        """The same query should be answered from the cache without reading projects"""
+        first, sql = self.post(self.member, self.board)
+        self.assertTrue([statement for statement in sql if 'projects_' in statement])
+        second, sql = self.post(self.member, self.board)
+        self.assertEqual(second, first)
+        self.assertCached(sql)
+    
+    def test_entries_are_shared_per_role(self):
+        """Members with the same role should share entries; other roles should not"""
+        self.post(self.member, self.board)
+        _, sql = self.post(self.other_member, self.board)
+        self.assertCached(sql)
+        _, sql = self.post(self.owner, self.board)
+        self.assertTrue([statement for statement in sql if 'projects_' in statement])
+    
+    def test_mutations_invalidate_their_project(self):
+        """A mutation should invalidate its project's responses and the organization's lists only"""
+        self.post(self.member, self.board)
+        other_board = '{ project(id: %d) { name } }' % self.other_project.pk
+        self.post(self.member, other_board)
+        self.post(self.member, '{ allProjects { name } }')
+        
+        self.mutate(self.owner, 'mutation { updateTask(id: %d, status: "DONE") { task { id } } }' % self.task.pk)
+        
+        body, _ = self.post(self.member, self.board)
+        self.assertEqual(body['data']['project']['tasks'], [{'title': 'Task', 'status': 'DONE'}])
+        _, sql = self.post(self.member, other_board)
+        self.assertCached(sql)
+        _, sql = self.post(self.member, '{ allProjects { name } }')
+        self.assertTrue([statement for statement in sql if 'projects_' in statement])
+    
+    def test_membership_changes_invalidate_the_organization(self):
+        """Joining an organization should invalidate its lists and its projects, which show the members"""
+        members = '{ project(id: %d) { organization { members { user { email } role } } } }' % self.project.pk
+        projects = '{ organizationProjects(organizationId: %d) { name } }' % self.org.pk
+        self.post(self.member, members)
+        self.post(self.member, projects)
+        
+        Invitation.objects.create(email='new@test.com', organization=self.org, invited_by=self.owner, token='invite')
+        mutation = '''mutation {
+            acceptInvite(token: "invite", password: "pass", firstName: "New", lastName: "Member") { user { id } }
+        }'''
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.http.post('/graphql', json.dumps({'query': mutation}), content_type='application/json')
+        self.assertNotIn('errors', response.json())
+        
+        body, _ = self.post(self.member, members)
+        emails = [member['user']['email'] for member in body['data']['project']['organization']['members']]
+        self.assertIn('new@test.com', emails)
+        _, sql = self.post(self.member, projects)
+        self.assertTrue([statement for statement in sql if 'projects_' in statement])
+    
+    def test_counter_rebuild_invalidates_its_projects(self):
+        """Corrected counters should be served at once, not once the cached responses expire"""
+        query = '{ project(id: %d) { todoCount } }' % self.project.pk
+        self.post(self.member, query)
+        Project.objects.filter(pk=self.project.pk).update(todo_count=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_task_counters([self.project.pk])
+        body, sql = self.post(self.member, query)
+        self.assertEqual(body['data']['project']['todoCount'], 1)
+        self.assertTrue([statement for statement in sql if 'projects_' in statement])
+    
+    def test_user_specific_fields_are_not_cached(self):
+        """Operations with fields outside CACHEABLE_FIELDS should always execute"""
+        query = '{ myAssignedTasks(projectId: %d) { title } }' % self.project.pk
+        self.post(self.member, query)
+        _, sql = self.post(self.member, query)
+        self.assertTrue([statement for statement in sql if 'projects_' in statement])
+    
+    def test_versions_are_shared_between_workers(self):
+        """Through a shared cache, a mutation on another worker should invalidate this worker's entries"""
+        with tempfile.TemporaryDirectory() as directory:
+            shared_cache = {
+                'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            }
+            with override_settings(CACHES=shared_cache):
+                # Each worker process has its own client for the same storage
+                other_worker = FileBasedCache(directory, {})
+                key = response_cache._version_key(response_cache.PROJECT, self.project.pk)
+                before = response_cache.current_versions([key])
+                with unittest.mock.patch('api.response_cache.cache', other_worker):
+                    response_cache.bump_versions([self.project.pk])
+                self.assertNotEqual(response_cache.current_versions([key]), before)
+                
+                self.post(self.member, self.board)
+                mutation = 'mutation { updateTask(id: %d, status: "DONE") { task { id } } }' % self.task.pk
+                with unittest.mock.patch('api.response_cache.cache', other_worker):
+                    self.mutate(self.owner, mutation)
+                body, _ = self.post(self.member, self.board)
+                self.assertEqual(body['data']['project']['tasks'], [{'title': 'Task', 'status': 'DONE'}])
+    
+    def test_fresh_replica_reads_are_not_stored(self):
+        """A response read from a replica just after a bump should not be cached"""
+        cached = response_cache.CachedResponse('test', [time.time_ns()])
+        result = ExecutionResult(data={'project': None})
+        routing = RoutingState()
+        routing.replica = 'replica'
+        with unittest.mock.patch('api.response_cache.current_routing', return_value=routing):
+            cached.store(result)
+            self.assertIsNone(cached.get())
+            cached.versions = [time.time_ns() - settings.DATABASE_REPLICA_LAG * 2_000_000_000]
+            cached.store(result)
+        self.assertEqual(cached.get(), {'project': None})
+
+
+class ETagTests(ProjectFixture, TestCase):
+    """Tests for ETags and 304 responses on GraphQL GET queries"""
+    
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(project=self.project, title='Task', status='TODO')
+        self.query = 'query GetProject($id: Int!) { project(id: $id) { name tasks { title status } } }'
+        self.http = HttpClient()
+    
+    def get(self, user, etag=None):
+        headers = {'HTTP_AUTHORIZATION': f'JWT {get_token(user)}'}
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        with CaptureQueriesContext(connection) as queries:
+            response = self.http.get(
+                '/graphql', {'query': self.query, 'variables': json.dumps({'id': self.project.pk})}, **headers
+            )
+        response.sql = [query['sql'] for query in queries]
+        return response
+    
+    def test_get_queries_carry_an_etag(self):
+        """GET query responses should have a strong, per-user, always revalidated ETag"""
+        response = self.get(self.member)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data']['project']['name'], 'Board')
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{64}"$')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+        # Another role gets another representation
+        self.assertNotEqual(self.get(self.owner)['ETag'], response['ETag'])
+    
+    @override_settings(GRAPHQL_RESPONSE_CACHE=False)
+    def test_matching_etag_answers_304_without_executing(self):
+        """If-None-Match with the current ETag should get an empty 304 and read no project data"""
+        etag = self.get(self.member)['ETag']
+        response = self.get(self.member, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([statement for statement in response.sql if 'projects_' in statement], response.sql)
+        self.assertEqual(self.get(self.member, f'"other", W/{etag}').status_code, 304)
+    
+    def test_mutations_change_the_etag(self):
+        """After a mutation on the project the old ETag should no longer match"""
+        etag = self.get(self.member)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            mutation = 'mutation { updateTask(id: %d, status: "DONE") { task { id } } }' % self.task.pk
+            self.http.post(
+                '/graphql', data=json.dumps({'query': mutation}), content_type='application/json',
+                HTTP_AUTHORIZATION=f'JWT {get_token(self.owner)}',
+            )
+        response = self.get(self.member, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['data']['project']['tasks'][0]['status'], 'DONE')
+    
+    def test_membership_changes_change_the_etag(self):
+        """A new member of the organization should stop 304s for its projects"""
+        etag = self.get(self.member)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            OrganizationMember.objects.create(
+                user=User.objects.create_user('new@test.com', 'new@test.com', 'pass'),
+                organization=self.org, role='MEMBER',
+            )
+        response = self.get(self.member, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_mutation_on_another_worker_changes_the_etag(self):
+        """Through a shared cache, a mutation on another worker should stop this worker's 304s"""
+        with tempfile.TemporaryDirectory() as directory:
+            shared_cache = {
+                'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            }
+            with override_settings(CACHES=shared_cache):
+                etag = self.get(self.member)['ETag']
+                self.assertEqual(self.get(self.member, etag).status_code, 304)
+                
+                # Each worker process has its own client for the same storage
+                mutation = 'mutation { updateTask(id: %d, status: "DONE") { task { id } } }' % self.task.pk
+                with unittest.mock.patch('api.response_cache.cache', FileBasedCache(directory, {})):
+                    with self.captureOnCommitCallbacks(execute=True):
+                        self.http.post(
+                            '/graphql', data=json.dumps({'query': mutation}), content_type='application/json',
+                            HTTP_AUTHORIZATION=f'JWT {get_token(self.owner)}',
+                        )
+                
+                response = self.get(self.member, etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+    
+    def test_no_etag_on_errors_or_post(self):
+        """Responses with errors and POST responses should not carry an ETag"""
+        self.query = '{ project(id: 0) { name } }'
+        self.assertFalse(self.get(self.member).has_header('ETag'))
+        response = self.http.post(
+            '/graphql', data=json.dumps({'query': '{ project(id: %d) { name } }' % self.project.pk}),
+            content_type='application/json', HTTP_AUTHORIZATION=f'JWT {get_token(self.member)}',
+        )
+        self.assertFalse(response.has_header('ETag'))
+    
+    async def test_async_view_answers_304(self):
+        """AsyncGraphQLView should honor If-None-Match the same way"""
+        token = await sync_to_async(get_token)(self.member)
+        view = AsyncGraphQLView.as_view()
+        
+        async def get(etag=None):
+            headers = {'Authorization': f'JWT {token}'}
+            if etag:
+                headers['If-None-Match'] = etag
+            request = AsyncRequestFactory().get(
+                '/graphql', {'query': self.query, 'variables': json.dumps({'id': self.project.pk})}, headers=headers
+            )
+            request.user = AnonymousUser()
+            return await view(request)
+        
+        response = await get()
+        self.assertEqual(response.status_code, 200)
+        response = await get(response['ETag'])
+        self.assertEqual(response.status_code, 304)
@@ -1,3 +1,423 @@
-from django.shortcuts import render
+import json
+from inspect import isawaitable
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from graphene_django.settings import graphene_settings
+from graphene_django.views import MUTATION_ERRORS_FLAG, GraphQLView, HttpError
+from graphene_django.utils.utils import set_rollback
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.middleware import JSONWebTokenMiddleware
+from graphql_jwt.utils import get_http_authorization
+from graphql import (
+    ExecutionResult,
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    validate,
+    validate_schema,
+)
+
+from .async_execution import AsyncExecutionMiddleware
+from .cost import CostEstimate, query_cost_rule
+from .documents import DocumentCache
+from .persisted import get_registry
+from .response_cache import cached_response
+
+
+class PreparedOperation:
+    """A validated document ready to execute, and the extensions to report with its result"""
+
+    def __init__(self, schema, document, operation_ast, extensions, query=None):
+        self.schema = schema
+        self.document = document
+        self.operation_ast = operation_ast
+        self.extensions = extensions
+        self.query = query
+
+    @property
+    def is_query(self):
+        return self.operation_ast is not None and self.operation_ast.operation == OperationType.QUERY
+
+    def finish(self, result):
+        result.extensions = dict(result.extensions or {}, **self.extensions)
+        return result
+
+
+class NotModified(Exception):
+    """Ends a conditional GET whose ETag still matches, before anything executes"""
+
+    def __init__(self, etag):
+        super().__init__(etag)
+        self.etag = etag
+
+
+class CachingGraphQLView(GraphQLView):
+    """
+    GraphQLView that reuses parsed and validated documents across requests,
+    accepts automatic persisted queries (see ``api.persisted``) and rejects
+    operations over the cost budget (see ``api.cost``), reporting the estimate
+    in the response's ``extensions``.
+
+    Query responses are served from ``api.response_cache`` when possible. Over
+    GET they also carry a strong ``ETag`` made from the same key, so a poller
+    sending it back in ``If-None-Match`` gets a 304 without any resolver
+    running or any JSON being encoded. The key's versions live in the cache
+    shared by all workers, so every worker computes the same ETag and none
+    answers 304 after another one saw a change. Everything that can change a
+    cached response bumps a version, membership changes included, since an
+    ETag outlives the cache entry it was made for.
+
+    The cache is shared by every instance of the class; a subclass serving a
+    different schema or validation rules should set its own ``document_cache``.
+    """
+
+    document_cache = DocumentCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except NotModified as not_modified:
+            response = HttpResponseNotModified()
+            request.graphql_etag = not_modified.etag
+        return self.add_etag(request, response)
+
+    def uses_etag(self, request):
+        return settings.GRAPHQL_ETAGS and request.method == "GET" and not self.batch
+
+    def check_not_modified(self, request, cached):
+        """Raise ``NotModified`` when the client already has this response"""
+        if cached is None or not self.uses_etag(request):
+            return
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if "*" in etags or cached.etag in (etag.removeprefix("W/") for etag in etags):
+            raise NotModified(cached.etag)
+
+    def remember_etag(self, request, cached, result):
+        if cached is not None and self.uses_etag(request) and cached.trusted(result):
+            request.graphql_etag = cached.etag
+
+    @staticmethod
+    def add_etag(request, response):
+        etag = getattr(request, "graphql_etag", None)
+        if etag is not None and response.status_code in (200, 304):
+            response["ETag"] = etag
+            # Per user, and always revalidated
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def get_document(self, query):
+        """Return ``(document, errors)`` for a query text"""
+        entry = self.document_cache.get(
+            self.schema.graphql_schema,
+            query,
+            self.validation_rules,
+            graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        return entry.document, entry.errors
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        self.rollback_on_errors(request, execution_result)
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    @staticmethod
+    def rollback_on_errors(request, execution_result):
+        """Mark the request's transaction (``ATOMIC_REQUESTS``) for rollback if the operation failed"""
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+        if execution_result and execution_result.errors:
+            set_rollback()
+
+    def encode_result(self, request, execution_result, id=None, show_graphiql=False):
+        """Return ``(json, status code)`` for an execution result"""
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+            if execution_result.errors and any(not getattr(e, "path", None) for e in execution_result.errors):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            # The only difference from GraphQLView: report the result's extensions
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions if isinstance(extensions, dict) else None
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        prepared = self.prepare_operation(request, data, query, variables, operation_name, show_graphiql)
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+        cached = self.get_cached_response(request, prepared, variables, operation_name)
+        self.check_not_modified(request, cached)
+        data = cached.get() if cached else None
+        if data is not None:
+            result = ExecutionResult(data=data)
+        else:
+            result = self.execute_document(
+                request, prepared.schema, prepared.document, prepared.operation_ast, variables, operation_name
+            )
+            if cached:
+                cached.store(result)
+        self.remember_etag(request, cached, result)
+        return prepared.finish(result)
+
+    def get_cached_response(self, request, prepared, variables, operation_name):
+        """
+        The response cache entry of a query, or None (see ``api.response_cache``).
+
+        The key depends on the user's roles, so a JWT is authenticated here
+        rather than by ``JSONWebTokenMiddleware``; a bad token is left for the
+        middleware to report.
+        """
+        if not prepared.is_query or not (settings.GRAPHQL_RESPONSE_CACHE or self.uses_etag(request)):
+            return None
+        user = getattr(request, "user", None)
+        if user is not None and user.is_anonymous and get_http_authorization(request):
+            try:
+                user = authenticate(request=request)
+            except JSONWebTokenError:
+                user = None
+            if user is not None:
+                request.user = user
+        return cached_response(request, prepared, variables, operation_name)
+
+    def prepare_operation(self, request, data, query, variables, operation_name, show_graphiql=False):
+        """
+        Everything before execution: persisted query lookup, parsing and
+        validation (cached), and the cost check.
+
+        Returns a ``PreparedOperation``, or the ``ExecutionResult`` (None for
+        GraphiQL) to answer with instead.
+        """
+        try:
+            query = get_registry().resolve(query, self.get_extensions(request, data))
+        except GraphQLError as error:
+            return ExecutionResult(errors=[error])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = self.get_document(query)
+        if document is None:
+            return ExecutionResult(errors=errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(operation_ast.operation.value),
+                )
+            )
+
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        # Depends on the variables, so it runs on every request instead of being cached
+        estimate = CostEstimate()
+        errors = validate(schema, document, [query_cost_rule(estimate, variables, operation_name)])
+        extensions = {"cost": estimate.as_extension(settings.GRAPHQL_MAX_QUERY_COST)}
+        if errors:
+            return ExecutionResult(data=None, errors=errors, extensions=extensions)
+
+        return PreparedOperation(schema, document, operation_ast, extensions, query)
+
+    def execute_document(self, request, schema, document, operation_ast, variables, operation_name):
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class AsyncGraphQLView(CachingGraphQLView):
+    """
+    ``CachingGraphQLView`` for ASGI servers: queries execute on the event loop
+    (see ``api.async_execution``), so a slow query does not hold a worker
+    thread and sibling fields resolve concurrently.
+
+    Mutations keep the synchronous path, run on Django's sync thread, so
+    their transactions and ``on_commit`` hooks behave exactly as before.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(["GET", "POST"], "GraphQL only supports GET and POST requests.")
+                )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            await self.authenticate(request)
+            if self.batch:
+                responses = [await self.aget_response(request, entry) for entry in data]
+                result = "[{}]".format(",".join([response[0] for response in responses]))
+                status_code = responses and max(responses, key=lambda response: response[1])[1] or 200
+            else:
+                result, status_code = await self.aget_response(request, data)
+
+            response = HttpResponse(status=status_code, content=result, content_type="application/json")
+
+        except NotModified as not_modified:
+            response = HttpResponseNotModified()
+            request.graphql_etag = not_modified.etag
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+        return self.add_etag(request, response)
+
+    async def authenticate(self, request):
+        """
+        Load ``request.user`` up front: neither the session nor the JWT
+        backend can query the database from the event loop.
+        """
+        if hasattr(request, "auser"):
+            request.user = await request.auser()
+        elif not hasattr(request, "user"):
+            request.user = AnonymousUser()
+
+        if request.user.is_anonymous and get_http_authorization(request):
+            try:
+                user = await sync_to_async(authenticate)(request=request)
+            except JSONWebTokenError as error:
+                request.jwt_error = error
+            else:
+                if user is not None:
+                    request.user = user
+
+    async def aget_response(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        # Persisted query lookups and registration hit the cache
+        prepared = await sync_to_async(self.prepare_operation)(request, data, query, variables, operation_name)
+        if not isinstance(prepared, PreparedOperation):
+            return self.encode_result(request, prepared, id)
+
+        if prepared.is_query:
+            cached = await sync_to_async(self.get_cached_response)(request, prepared, variables, operation_name)
+            self.check_not_modified(request, cached)
+            data = await sync_to_async(cached.get)() if cached else None
+            if data is not None:
+                result = ExecutionResult(data=data)
+            else:
+                result = await self.aexecute_document(request, prepared, variables, operation_name)
+                if cached:
+                    await sync_to_async(cached.store)(result)
+            self.remember_etag(request, cached, result)
+        else:
+            result = await sync_to_async(self.execute_mutation)(request, prepared, variables, operation_name)
+        return self.encode_result(request, prepared.finish(result), id)
+
+    def execute_mutation(self, request, prepared, variables, operation_name):
+        """Run a mutation on the sync thread, rolling back on errors like ``get_response``"""
+        result = self.execute_document(
+            request, prepared.schema, prepared.document, prepared.operation_ast, variables, operation_name
+        )
+        self.rollback_on_errors(request, result)
+        return result
+
+    def get_async_middleware(self, request):
+        # Authentication already happened in authenticate()
+        middleware = [m for m in self.get_middleware(request) or () if not isinstance(m, JSONWebTokenMiddleware)]
+        return [AsyncExecutionMiddleware(), *middleware]
+
+    async def aexecute_document(self, request, prepared, variables, operation_name):
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_async_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            result = execute(prepared.schema, prepared.document, **execute_options)
+            if isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
@@ -0,0 +1,196 @@
+"""
+GraphQL subscriptions over WebSockets.
+
+A small ASGI application speaking the ``graphql-transport-ws`` protocol (the
+one implemented by the ``graphql-ws`` client library). Clients authenticate
+in the ``connection_init`` payload with the same JWT used for HTTP::
+
+    {"type": "connection_init", "payload": {"Authorization": "JWT <token>"}}
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from graphql import ExecutionResult, GraphQLError, parse, specified_rules, subscribe, validate
+
+from .broker import SubscriberTooSlow
+from .cost import CostEstimate, query_cost_rule
+from .db import database_sync_to_async
+
+PROTOCOL = 'graphql-transport-ws'
+
+# Close codes defined by the protocol
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_BAD_REQUEST = 4400
+CLOSE_INIT_TIMEOUT = 4408
+CLOSE_SUBSCRIBER_EXISTS = 4409
+CLOSE_TOO_MANY_INITS = 4429
+# A subscription fell too far behind its channel (see api.broker)
+CLOSE_TOO_SLOW = 4429
+
+
+class SubscriptionContext:
+    """The ``info.context`` of subscription resolvers"""
+
+    def __init__(self, scope, user):
+        self.scope = scope
+        self.user = user
+
+
+def get_user_from_payload(payload):
+    from graphql_jwt.exceptions import JSONWebTokenError
+    from graphql_jwt.shortcuts import get_user_by_token
+
+    header = payload.get('Authorization') or payload.get('authorization') or ''
+    token = header.split(' ', 1)[-1] if header else payload.get('token')
+    if not token:
+        return AnonymousUser()
+    try:
+        return get_user_by_token(token) or AnonymousUser()
+    except JSONWebTokenError:
+        return None
+
+
+class GraphQLWebSocketApplication:
+    def __init__(self, schema, path='/graphql', init_timeout=None):
+        self.schema = schema
+        self.path = path.rstrip('/')
+        self.init_timeout = init_timeout or getattr(settings, 'GRAPHQL_WS_INIT_TIMEOUT', 10)
+
+    async def __call__(self, scope, receive, send):
+        if scope['path'].rstrip('/') != self.path:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        await _Connection(self, scope, receive, send).run()
+
+
+class _Connection:
+    def __init__(self, app, scope, receive, send):
+        self.app = app
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.context = None
+        self.operations = {}
+        self.closed = False
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+        if PROTOCOL not in self.scope.get('subprotocols', []):
+            await self.close(CLOSE_BAD_REQUEST)
+            return
+        await self.send({'type': 'websocket.accept', 'subprotocol': PROTOCOL})
+
+        init_timer = asyncio.get_running_loop().call_later(
+            self.app.init_timeout, lambda: asyncio.ensure_future(self._init_timed_out())
+        )
+        try:
+            while not self.closed:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    await self.handle(message.get('text') or message.get('bytes'), init_timer)
+        finally:
+            init_timer.cancel()
+            self.closed = True
+            for task in self.operations.values():
+                task.cancel()
+
+    async def handle(self, raw, init_timer):
+        try:
+            message = json.loads(raw)
+            message_type = message['type']
+        except (TypeError, ValueError, KeyError):
+            await self.close(CLOSE_BAD_REQUEST)
+            return
+
+        if message_type == 'connection_init':
+            if self.context is not None:
+                await self.close(CLOSE_TOO_MANY_INITS)
+                return
+            init_timer.cancel()
+            user = await database_sync_to_async(get_user_from_payload)(message.get('payload') or {})
+            if user is None:
+                await self.close(CLOSE_UNAUTHORIZED)
+                return
+            self.context = SubscriptionContext(self.scope, user)
+            await self.send_json({'type': 'connection_ack'})
+        elif message_type == 'ping':
+            await self.send_json({'type': 'pong'})
+        elif message_type == 'pong':
+            pass
+        elif message_type == 'subscribe':
+            if self.context is None:
+                await self.close(CLOSE_UNAUTHORIZED)
+                return
+            operation_id = message.get('id')
+            if operation_id in self.operations:
+                await self.close(CLOSE_SUBSCRIBER_EXISTS)
+                return
+            task = asyncio.ensure_future(self.run_operation(operation_id, message.get('payload') or {}))
+            self.operations[operation_id] = task
+        elif message_type == 'complete':
+            task = self.operations.pop(message.get('id'), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(CLOSE_BAD_REQUEST)
+
+    async def run_operation(self, operation_id, payload):
+        try:
+            result = await self.subscribe(payload)
+            if isinstance(result, ExecutionResult):
+                await self.send_json({
+                    'type': 'error',
+                    'id': operation_id,
+                    'payload': [error.formatted for error in result.errors or []],
+                })
+                return
+            try:
+                async for item in result:
+                    await self.send_json({'type': 'next', 'id': operation_id, 'payload': item.formatted})
+            finally:
+                await result.aclose()
+            await self.send_json({'type': 'complete', 'id': operation_id})
+        except asyncio.CancelledError:
+            pass
+        except SubscriberTooSlow:
+            await self.close(CLOSE_TOO_SLOW)
+        finally:
+            self.operations.pop(operation_id, None)
+
+    async def subscribe(self, payload):
+        """Validate the operation, within the same cost budget as HTTP, and subscribe to it"""
+        schema = self.app.schema.graphql_schema
+        variables = payload.get('variables')
+        operation_name = payload.get('operationName')
+        try:
+            document = parse(payload.get('query') or '')
+        except GraphQLError as error:
+            return ExecutionResult(errors=[error])
+        rules = [*specified_rules, query_cost_rule(CostEstimate(), variables, operation_name)]
+        errors = validate(schema, document, rules)
+        if errors:
+            return ExecutionResult(errors=errors)
+        return await subscribe(
+            schema, document, variable_values=variables, operation_name=operation_name,
+            context_value=self.context,
+        )
+
+    async def _init_timed_out(self):
+        if self.context is None and not self.closed:
+            await self.close(CLOSE_INIT_TIMEOUT)
+
+    async def send_json(self, data):
+        if not self.closed:
+            await self.send({'type': 'websocket.send', 'text': json.dumps(data, separators=(',', ':'))})
+
+    async def close(self, code):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': code})
@@ -2,6 +2,10 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django with the ``config.asgi_urls`` URLconf, where
+``/graphql`` is served by the async view unless ``GRAPHQL_ASYNC_VIEW=false``
+(the setting may already be loaded, e.g. by a gunicorn master); WebSocket connections on ``/graphql``
+serve GraphQL subscriptions.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +13,34 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+
+class AsyncURLConfHandler(ASGIHandler):
+    """Resolve every request against ``config.asgi_urls``"""
+
+    async def get_response_async(self, request):
+        request.urlconf = 'config.asgi_urls'
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+django_application = AsyncURLConfHandler()
+
+# Import after Django is set up: the schema imports models. Importing the
+# URLconf here too builds everything once when the server preloads the app.
+import config.asgi_urls  # noqa: E402,F401
+from api.schema import schema  # noqa: E402
+from api.websocket import GraphQLWebSocketApplication  # noqa: E402
+
+websocket_application = GraphQLWebSocketApplication(schema, path='/graphql')
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
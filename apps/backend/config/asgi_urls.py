@@ -0,0 +1,12 @@
+"""
+URLconf of the ASGI application (config.asgi): the same routes as
+config.urls, with ``/graphql`` served by the async view unless
+``GRAPHQL_ASYNC_VIEW`` is turned off.
+"""
+from django.conf import settings
+
+from api.views import AsyncGraphQLView, CachingGraphQLView
+
+from .urls import build_urlpatterns
+
+urlpatterns = build_urlpatterns(AsyncGraphQLView if settings.GRAPHQL_ASYNC_VIEW else CachingGraphQLView)
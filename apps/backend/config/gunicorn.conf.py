@@ -0,0 +1,78 @@
+"""
+Gunicorn settings for production serving.
+
+    gunicorn -c config/gunicorn.conf.py
+
+Every setting comes from the environment:
+
+- ``SERVER_INTERFACE``: ``asgi`` (default) serves ``config.asgi`` with uvicorn
+  workers (the ``uvicorn-worker`` package), so GraphQL subscriptions work; ``wsgi`` serves ``config.wsgi`` with
+  threaded sync workers.
+- ``WEB_CONCURRENCY``: worker processes (default ``2 * CPUs + 1``).
+- ``GUNICORN_THREADS``: threads per WSGI worker (default 4).
+- ``PORT`` or ``GUNICORN_BIND``: where to listen (default ``0.0.0.0:8000``).
+- ``GUNICORN_TIMEOUT``, ``GUNICORN_GRACEFUL_TIMEOUT``, ``GUNICORN_KEEPALIVE``:
+  seconds (30, 30, 5).
+- ``GUNICORN_MAX_REQUESTS`` / ``GUNICORN_MAX_REQUESTS_JITTER``: recycle a worker
+  after that many requests (1000 +- 100; 0 disables).
+- ``GUNICORN_ACCESS_LOG``: access log file (default stdout; empty disables).
+- ``GUNICORN_PRELOAD``: import Django and build the GraphQL schema once in the
+  master before forking (default true). Without it, ``kill -HUP`` reloads code.
+
+With more than one worker, startup fails on settings that only work in one
+process, such as the in-process subscription broker (``api.checks``);
+``GUNICORN_CHECK_WORKERS=false`` skips the check.
+
+``SIGHUP`` starts new workers and lets the old ones finish their requests
+within the graceful timeout; ``SIGTERM`` shuts down the same way.
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+interface = os.environ.get('SERVER_INTERFACE', 'asgi').lower()
+if interface == 'wsgi':
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'gthread'
+    threads = _env_int('GUNICORN_THREADS', 4)
+else:
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = _env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+def on_starting(server):
+    # Refuse settings that only work in one process (see api.checks)
+    if os.environ.get('GUNICORN_CHECK_WORKERS', 'true').lower() != 'true':
+        return
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+    from api.checks import check_worker_processes
+
+    check_worker_processes(server.cfg.workers)
+
+
+def worker_exit(server, worker):
+    # Insert activities still buffered in this worker before it goes away
+    from projects.activity import close_activity_writer
+
+    close_activity_writer()
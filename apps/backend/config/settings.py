@@ -21,10 +21,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-@_wgfuq14dlsgvu#ih7&qfg9f&^%+n(gogtp1tkcq-0x4%r7s5'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY', 'django-insecure-@_wgfuq14dlsgvu#ih7&qfg9f&^%+n(gogtp1tkcq-0x4%r7s5'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# On for local development; the production image sets DEBUG=0.
+DEBUG = os.environ.get('DEBUG', 'true').lower() in ('1', 'true', 'yes')
 
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
 
@@ -81,18 +84,117 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# DATABASE_ENGINE selects the backend: 'sqlite' (the default, for local
+# development) or 'postgresql', configured from the POSTGRES_* variables.
+
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite').lower()
+
+if DATABASE_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'voiceap'),
+            'USER': os.environ.get('POSTGRES_USER', 'voiceap'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Check a reused connection before the request that picks it up
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    # Each process keeps a psycopg connection pool (DB_POOL=0 to disable)
+    # and requests borrow from it; Django's pool cannot be combined with
+    # persistent connections, which are used instead when it is disabled.
+    DB_POOL = os.environ.get('DB_POOL', 'true').lower() in ('1', 'true', 'yes')
+    if DB_POOL:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    # Comma-separated hosts of streaming replicas of the same database
+    REPLICA_SETTING, REPLICA_LOCATIONS = 'HOST', os.environ.get('POSTGRES_REPLICA_HOSTS', '')
+elif DATABASE_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
 
-DATABASES = {
+    # SQLite tuned for concurrent requests (SQLITE_TUNED=0 restores the defaults):
+    # WAL lets readers run while a write commits, synchronous=NORMAL syncs at
+    # checkpoints rather than on every commit, writers wait up to
+    # SQLITE_BUSY_TIMEOUT seconds for the lock, and transactions take the write
+    # lock when they begin instead of failing when a read upgrades to a write.
+    SQLITE_TUNED = os.environ.get('SQLITE_TUNED', 'true').lower() in ('1', 'true', 'yes')
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))
+    if SQLITE_TUNED:
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+        }
+    # Comma-separated database files standing in for replicas locally;
+    # python manage.py sync_sqlite_replicas copies the primary into them
+    REPLICA_SETTING, REPLICA_LOCATIONS = 'NAME', os.environ.get('SQLITE_REPLICA_PATHS', '')
+else:
+    raise Exception(f"Unknown DATABASE_ENGINE {DATABASE_ENGINE!r}; use 'sqlite' or 'postgresql'")
+
+# Read replicas (api.routing): GraphQL query operations read from one of
+# these aliases, mutations and everything else use 'default'. A user whose
+# request wrote keeps reading from the primary for DATABASE_REPLICA_LAG
+# seconds, so they see their own changes while the replicas catch up.
+DATABASE_REPLICAS = []
+for number, location in enumerate(filter(None, REPLICA_LOCATIONS.split(',')), 1):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'], **{REPLICA_SETTING: location.strip()}, TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['api.routing.ReplicaRouter'] if DATABASE_REPLICAS else []
+if DATABASE_REPLICAS:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'api.routing.RequestRoutingMiddleware',
+    )
+DATABASE_REPLICA_LAG = float(os.environ.get('DATABASE_REPLICA_LAG', 5))
+
+# Adds the test-only 'replica' alias used by api.tests.ReplicaRoutingTests
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
+# Extra attempts api.db.retry_on_lock gives a mutation that hit a locked
+# database, and the base of its exponential backoff in seconds
+DB_LOCK_RETRIES = int(os.environ.get('DB_LOCK_RETRIES', 3))
+DB_LOCK_RETRY_BACKOFF = float(os.environ.get('DB_LOCK_RETRY_BACKOFF', 0.05))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default, which only suits a single process: role versions,
+# response cache versions and replica pins must be seen by every worker, so
+# gunicorn refuses to start several workers on it (api.checks). Point
+# CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached to share them.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'voiceap-backend'),
     }
 }
 
+# Seconds a user's organization roles (and a project's organization) stay
+# cached between requests
+AUTHZ_ROLE_CACHE_TIMEOUT = int(os.environ.get('AUTHZ_ROLE_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +231,7 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'static'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -141,6 +244,68 @@ GRAPHENE = {
         "graphql_jwt.middleware.JSONWebTokenMiddleware",
     ],
 }
+if DATABASE_REPLICAS:
+    # Before the JWT middleware, which therefore runs first (see api.routing)
+    GRAPHENE["MIDDLEWARE"].insert(0, "api.routing.OperationRoutingMiddleware")
+
+# Under ASGI (config.asgi_urls), serve /graphql with api.views.AsyncGraphQLView
+# (queries on the event loop). WSGI servers always use the sync view.
+GRAPHQL_ASYNC_VIEW = os.environ.get("GRAPHQL_ASYNC_VIEW", "true").lower() in ("1", "true", "yes")
+
+# Parsed and validated documents kept by api.views.CachingGraphQLView
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.environ.get("GRAPHQL_DOCUMENT_CACHE_SIZE", 256))
+
+# Query responses kept in the cache by api.response_cache, invalidated by the
+# per-organization/per-project versions that mutations bump
+GRAPHQL_RESPONSE_CACHE = os.environ.get("GRAPHQL_RESPONSE_CACHE", "true").lower() in ("1", "true", "yes")
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = int(os.environ.get("GRAPHQL_RESPONSE_CACHE_TIMEOUT", 300))
+
+# GET query responses carry an ETag built from the same versions, and
+# If-None-Match is answered with 304 Not Modified before execution
+GRAPHQL_ETAGS = os.environ.get("GRAPHQL_ETAGS", "true").lower() in ("1", "true", "yes")
+
+# Query cost budget (api.cost): estimated objects returned and field nesting depth.
+# Lists without a first/limit argument are assumed to hold GRAPHQL_DEFAULT_LIST_SIZE items.
+GRAPHQL_MAX_QUERY_COST = int(os.environ.get("GRAPHQL_MAX_QUERY_COST", 5000))
+GRAPHQL_MAX_QUERY_DEPTH = int(os.environ.get("GRAPHQL_MAX_QUERY_DEPTH", 10))
+GRAPHQL_DEFAULT_LIST_SIZE = int(os.environ.get("GRAPHQL_DEFAULT_LIST_SIZE", 20))
+
+# Automatic persisted queries (api.persisted). In strict mode only the
+# operations of the manifest file run and clients cannot register new ones.
+GRAPHQL_PERSISTED_QUERIES_STRICT = os.environ.get("GRAPHQL_PERSISTED_QUERIES_STRICT", "false").lower() in ("1", "true", "yes")
+GRAPHQL_PERSISTED_QUERIES_MANIFEST = os.environ.get("GRAPHQL_PERSISTED_QUERIES_MANIFEST") or None
+# Seconds a client-registered query stays in the cache (empty or "none": until evicted)
+GRAPHQL_PERSISTED_QUERIES_TIMEOUT = os.environ.get("GRAPHQL_PERSISTED_QUERIES_TIMEOUT", "86400")
+GRAPHQL_PERSISTED_QUERIES_TIMEOUT = (
+    None if GRAPHQL_PERSISTED_QUERIES_TIMEOUT.lower() in ("", "none") else int(GRAPHQL_PERSISTED_QUERIES_TIMEOUT)
+)
+
+# Activity log writer (projects.activity): 'sync' inserts activities inside
+# the mutation; 'buffered' (opt-in) inserts them in batches from a background
+# thread after the mutation commits.
+ACTIVITY_WRITER = os.environ.get("ACTIVITY_WRITER", "sync")
+ACTIVITY_BATCH_SIZE = int(os.environ.get("ACTIVITY_BATCH_SIZE", 100))
+ACTIVITY_FLUSH_INTERVAL = float(os.environ.get("ACTIVITY_FLUSH_INTERVAL", 1.0))
+# Failed inserts of one batch before it is moved aside instead of retried
+ACTIVITY_FLUSH_ATTEMPTS = int(os.environ.get("ACTIVITY_FLUSH_ATTEMPTS", 5))
+# Append-only spool of buffered activities, replayed after a crash
+ACTIVITY_SPOOL_DIR = os.environ.get("ACTIVITY_SPOOL_DIR", str(BASE_DIR / "var" / "activity-spool"))
+ACTIVITY_SPOOL_FSYNC = os.environ.get("ACTIVITY_SPOOL_FSYNC", "false").lower() in ("1", "true", "yes")
+
+# Activity retention (projects.archive): days kept in the Activity table unless
+# the organization or project overrides it (0: forever). `manage.py
+# archive_activity` moves older rows into gzipped NDJSON files here.
+ACTIVITY_RETENTION_DAYS = int(os.environ.get("ACTIVITY_RETENTION_DAYS", 90))
+ACTIVITY_ARCHIVE_DIR = os.environ.get("ACTIVITY_ARCHIVE_DIR", str(BASE_DIR / "var" / "activity-archive"))
+
+# GraphQL subscriptions (served over WebSockets by config/asgi.py).
+# The in-process broker only fans out within one server process; use
+# api.broker.RedisBroker when running several workers (gunicorn refuses to
+# start more than one with the in-process broker).
+GRAPHQL_SUBSCRIPTION_BROKER = os.environ.get("GRAPHQL_SUBSCRIPTION_BROKER", "api.broker.InProcessBroker")
+GRAPHQL_SUBSCRIPTION_BROKER_URL = os.environ.get("GRAPHQL_SUBSCRIPTION_BROKER_URL", "redis://localhost:6379/0")
+# Messages an in-process subscriber may fall behind by before it is dropped
+GRAPHQL_SUBSCRIPTION_QUEUE_SIZE = int(os.environ.get("GRAPHQL_SUBSCRIPTION_QUEUE_SIZE", 100))
 
 AUTHENTICATION_BACKENDS = [
     "graphql_jwt.backends.JSONWebTokenBackend",
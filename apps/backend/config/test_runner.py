@@ -0,0 +1,22 @@
+"""
+Test runner for ``python manage.py test``.
+
+Adds the test-only ``'replica'`` database alias that
+``api.tests.ReplicaRoutingTests`` route reads to. It is a test mirror of
+``'default'``, so no extra database is created. ``override_settings`` cannot
+add a database alias, as connections are set up from ``DATABASES`` once, so
+it is declared here rather than in ``config.settings``, where production would
+get a second, unused connection (and pool) for the primary.
+"""
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+TEST_REPLICA = 'replica'
+
+
+class TestRunner(DiscoverRunner):
+    def setup_databases(self, **kwargs):
+        settings.DATABASES[TEST_REPLICA] = dict(settings.DATABASES['default'], TEST={'MIRROR': 'default'})
+        connections.settings = connections.configure_settings(settings.DATABASES)
+        return super().setup_databases(**kwargs)
@@ -1,9 +1,15 @@
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
-]
+from api.views import CachingGraphQLView
+
+
+def build_urlpatterns(graphql_view):
+    return [
+        path('admin/', admin.site.urls),
+        path("graphql", csrf_exempt(graphql_view.as_view(graphiql=True))),
+    ]
+
+
+urlpatterns = build_urlpatterns(CachingGraphQLView)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Build the GraphQL schema and URLconf now, so a server that preloads the app
+# (gunicorn --preload) does it once before forking instead of in every worker
+import api.schema  # noqa: E402,F401
+import config.urls  # noqa: E402,F401
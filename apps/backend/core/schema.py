@@ -6,6 +6,9 @@ from django.utils.text import slugify
 import secrets
 
 from organizations.models import Organization, OrganizationMember, Invitation
+from organizations.authz import get_authz
+from api.db import retry_on_lock
+from api.optimizer import optimize
 
 User = get_user_model()
 
@@ -37,14 +40,13 @@ class Query(graphene.ObjectType):
         user = info.context.user
         if user.is_anonymous:
             return []
-        memberships = OrganizationMember.objects.filter(user=user).select_related('organization')
-        return [m.organization for m in memberships]
+        return optimize(Organization.objects.filter(members__user=user).order_by('members__id'), info)
 
     def resolve_my_membership(self, info, organization_id):
         user = info.context.user
         if user.is_anonymous:
             return None
-        return OrganizationMember.objects.filter(user=user, organization_id=organization_id).first()
+        return optimize(OrganizationMember.objects.filter(user=user, organization_id=organization_id), info).first()
 
 
 class RegisterOwner(graphene.Mutation):
@@ -61,6 +63,7 @@ class RegisterOwner(graphene.Mutation):
     organization = graphene.Field('organizations.schema.OrganizationType')
     token = graphene.String()
 
+    @retry_on_lock
     def mutate(self, info, email, password, first_name, last_name, business_name, address=None):
         # Create User
         user = User.objects.create_user(
@@ -111,19 +114,14 @@ class InviteMember(graphene.Mutation):
     success = graphene.Boolean()
     invite_token = graphene.String()
 
+    @retry_on_lock
     def mutate(self, info, email, organization_id):
         user = info.context.user
         if user.is_anonymous:
             raise Exception("Not authenticated")
         
         # Check if user is owner of this org
-        membership = OrganizationMember.objects.filter(
-            user=user, 
-            organization_id=organization_id, 
-            role='OWNER'
-        ).first()
-        
-        if not membership:
+        if not get_authz(info).is_owner(organization_id):
             raise Exception("Only owners can invite members")
         
         # Create invitation
@@ -149,6 +147,7 @@ class AcceptInvite(graphene.Mutation):
     user = graphene.Field(UserType)
     auth_token = graphene.String()
 
+    @retry_on_lock
     def mutate(self, info, token, password, first_name, last_name):
         try:
             invite = Invitation.objects.get(token=token, accepted=False)
@@ -0,0 +1,140 @@
+"""
+Request-scoped authorization context.
+
+The resolvers of one GraphQL request all ask the same question: which role does
+the current user have in an organization? ``get_authz(info)`` loads the user's
+memberships once, as an ``{organization_id: role}`` map, and keeps it on
+``info.context`` so every later check in the request is a dict lookup.
+
+Between requests the map lives in Django's cache under a per-user version.
+Membership changes bump the version (see ``organizations.signals``), so a
+stale map is never read again, even one written by a request that was still
+running when the change happened. Writes that bypass model signals, such as
+``QuerySet.update()`` on roles, must call ``invalidate_user_roles()``.
+
+Revoking a membership has to reach every worker process, so the cache must be
+shared between them (``api.checks`` enforces it). A version is the time it
+was set, in nanoseconds, and never expires. If the cache evicts it anyway,
+the next version is new rather than a restarted counter, so maps cached
+under older versions cannot come back.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from projects.models import Project
+
+from .models import OrganizationMember
+
+
+def _roles_version_key(user_id):
+    return f'authz:roles-version:{user_id}'
+
+
+def _roles_key(user_id):
+    return f'authz:roles:{user_id}'
+
+
+def _project_org_key(project_id):
+    return f'authz:project-org:{project_id}'
+
+
+def invalidate_user_roles(user_id):
+    """Make every cached role map of the user stale"""
+    cache.set(_roles_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def forget_project(project_id):
+    """Drop the cached organization of a project"""
+    cache.delete(_project_org_key(project_id))
+
+
+def load_user_roles(user_id):
+    """The user's ``{organization_id: role}`` map, from the cache when possible"""
+    version_key = _roles_version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, time.time_ns(), timeout=None)
+        version = cache.get(version_key)
+    if version is None:
+        # The cache is not keeping anything (e.g. DummyCache)
+        return dict(OrganizationMember.objects.filter(user_id=user_id).values_list('organization_id', 'role'))
+    roles = cache.get(_roles_key(user_id), version=version)
+    if roles is None:
+        roles = dict(OrganizationMember.objects.filter(user_id=user_id).values_list('organization_id', 'role'))
+        cache.set(_roles_key(user_id), roles, timeout=settings.AUTHZ_ROLE_CACHE_TIMEOUT, version=version)
+    return roles
+
+
+def project_organization_id(project_id):
+    """
+    The organization of a project, or None.
+
+    Saving or deleting a project forgets it (``organizations.signals``); the
+    timeout bounds how long a change that bypassed the signals can go unseen.
+    """
+    key = _project_org_key(project_id)
+    organization_id = cache.get(key)
+    if organization_id is None:
+        organization_id = Project.objects.filter(pk=project_id).values_list('organization_id', flat=True).first()
+        if organization_id is not None:
+            cache.set(key, organization_id, timeout=settings.AUTHZ_ROLE_CACHE_TIMEOUT)
+    return organization_id
+
+
+class AuthorizationContext:
+    """The current user's organization roles, loaded on first use"""
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = None
+        self._project_orgs = {}
+
+    @property
+    def roles(self):
+        if self._roles is None:
+            self._roles = {} if self.user.is_anonymous else load_user_roles(self.user.pk)
+        return self._roles
+
+    @property
+    def organization_ids(self):
+        return list(self.roles)
+
+    def role(self, organization_id):
+        """The user's role in the organization, or None if they are not a member"""
+        return self.roles.get(organization_id)
+
+    def is_member(self, organization_id):
+        return organization_id in self.roles
+
+    def is_owner(self, organization_id):
+        return self.roles.get(organization_id) == 'OWNER'
+
+    def project_role(self, project_id):
+        """The user's role in the project's organization, or None"""
+        if self.user.is_anonymous:
+            return None
+        if project_id not in self._project_orgs:
+            self._project_orgs[project_id] = project_organization_id(project_id)
+        organization_id = self._project_orgs[project_id]
+        return None if organization_id is None else self.role(organization_id)
+
+    def invalidate(self):
+        """Forget the loaded roles, e.g. after a mutation changed the user's memberships"""
+        self._roles = None
+
+
+def get_authz(info):
+    """Return the request's authorization context, creating it on first use"""
+    return request_authz(info.context)
+
+
+def request_authz(context):
+    """``get_authz()`` for code that has the request (GraphQL context) but no ``info``"""
+    authz = getattr(context, '_authz', None)
+    # The JWT middleware may swap in the authenticated user after the context was created
+    if authz is None or authz.user is not context.user:
+        authz = AuthorizationContext(context.user)
+        context._authz = authz
+    return authz
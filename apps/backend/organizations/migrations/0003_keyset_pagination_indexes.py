@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0002_organization_address_organization_business_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='organizationmember',
+            index=models.Index(fields=['organization', 'joined_at', 'id'], name='member_org_joined_idx'),
+        ),
+    ]
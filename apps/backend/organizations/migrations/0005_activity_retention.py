@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0004_member_role_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='activity_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
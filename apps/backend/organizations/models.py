@@ -10,6 +10,9 @@ class Organization(models.Model):
     business_name = models.CharField(max_length=200, blank=True)
     address = models.TextField(blank=True)
     
+    # Days of activity kept in the hot table (None: ACTIVITY_RETENTION_DAYS, 0: forever)
+    activity_retention_days = models.PositiveIntegerField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -37,6 +40,12 @@ class OrganizationMember(models.Model):
 
     class Meta:
         unique_together = ['user', 'organization']
+        indexes = [
+            # Keyset pagination of an organization's members
+            models.Index(fields=['organization', 'joined_at', 'id'], name='member_org_joined_idx'),
+            # Covers the role lookups of authorization checks
+            models.Index(fields=['user', 'organization', 'role'], name='member_user_org_role_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.organization.name} ({self.role})"
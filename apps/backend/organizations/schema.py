@@ -1,7 +1,10 @@
 import graphene
 from graphene_django import DjangoObjectType
 from .models import Organization, OrganizationMember
+from .authz import get_authz
 from core.schema import UserType
+from api.optimizer import optimize
+from api.pagination import connection_args, paginate
 
 
 class OrganizationType(DjangoObjectType):
@@ -18,19 +21,27 @@ class OrganizationMemberType(DjangoObjectType):
         fields = "__all__"
 
 
+class OrganizationMemberConnection(graphene.relay.Connection):
+    class Meta:
+        node = OrganizationMemberType
+
+
 class Query(graphene.ObjectType):
     # Only expose organization data to authenticated users
     my_organizations = graphene.List(OrganizationType)
     organization = graphene.Field(OrganizationType, id=graphene.Int(), slug=graphene.String())
     organization_members = graphene.List(OrganizationMemberType, organization_id=graphene.Int(required=True))
+    organization_members_connection = graphene.Field(
+        OrganizationMemberConnection,
+        **connection_args(organization_id=graphene.Int(required=True))
+    )
 
     def resolve_my_organizations(self, info):
         """Returns only organizations the user belongs to"""
         user = info.context.user
         if user.is_anonymous:
             return []
-        memberships = OrganizationMember.objects.filter(user=user).select_related('organization')
-        return [m.organization for m in memberships]
+        return optimize(Organization.objects.filter(members__user=user).order_by('members__id'), info)
 
     def resolve_organization(self, info, id=None, slug=None):
         """Returns org only if user is a member"""
@@ -40,15 +51,15 @@ class Query(graphene.ObjectType):
         
         org = None
         if id:
-            org = Organization.objects.get(pk=id)
+            org = optimize(Organization.objects.all(), info).get(pk=id)
         elif slug:
-            org = Organization.objects.get(slug=slug)
+            org = optimize(Organization.objects.all(), info).get(slug=slug)
         
         if org is None:
             return None
         
         # Check if user belongs to this org
-        if not OrganizationMember.objects.filter(user=user, organization=org).exists():
+        if not get_authz(info).is_member(org.pk):
             raise Exception("You don't have access to this organization")
         
         return org
@@ -60,10 +71,22 @@ class Query(graphene.ObjectType):
             return []
         
         # Check if user belongs to this org
-        if not OrganizationMember.objects.filter(user=user, organization_id=organization_id).exists():
+        if not get_authz(info).is_member(organization_id):
             raise Exception("You don't have access to this organization")
         
-        return OrganizationMember.objects.filter(organization_id=organization_id).select_related('user')
+        return optimize(OrganizationMember.objects.filter(organization_id=organization_id), info)
+    
+    def resolve_organization_members_connection(self, info, organization_id, first=None, after=None):
+        """Keyset-paginated members, oldest membership first"""
+        user = info.context.user
+        if user.is_anonymous:
+            queryset = OrganizationMember.objects.none()
+        elif not get_authz(info).is_member(organization_id):
+            raise Exception("You don't have access to this organization")
+        else:
+            queryset = OrganizationMember.objects.filter(organization_id=organization_id)
+        queryset = optimize(queryset, info, only=('joined_at',), field='edges.node')
+        return paginate(OrganizationMemberConnection, queryset, first, after, order_field='joined_at')
 
 
 class Mutation(graphene.ObjectType):
@@ -0,0 +1,44 @@
+"""
+Keep the cached authorization data and responses in step with membership changes.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.response_cache import bump_versions
+from projects.models import Project
+
+from .authz import forget_project, invalidate_user_roles
+from .models import OrganizationMember
+
+
+def bump_organization_responses(organization_id):
+    """Make cached responses that read the organization or any of its projects stale"""
+    # Project responses can include the organization and its members
+    project_ids = list(Project.objects.filter(organization_id=organization_id).values_list('pk', flat=True))
+    bump_versions(project_ids, [organization_id])
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def membership_changed(sender, instance, **kwargs):
+    invalidate_user_roles(instance.user_id)
+    # Again once committed, so a request that read the old rows meanwhile cannot keep them cached
+    transaction.on_commit(partial(invalidate_user_roles, instance.user_id))
+    transaction.on_commit(partial(bump_organization_responses, instance.organization_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, **kwargs):
+    # A new user has no memberships, whatever a reused id has cached
+    if created:
+        invalidate_user_roles(instance.pk)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, **kwargs):
+    forget_project(instance.pk)
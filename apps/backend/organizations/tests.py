@@ -1,3 +1,136 @@
+import tempfile
+import unittest.mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from graphene.test import Client
+
+from api.schema import schema
+from organizations.authz import invalidate_user_roles, load_user_roles
+from organizations.models import Invitation, Organization, OrganizationMember
+from projects.models import Project
+from projects.tests import MockContext
+
+User = get_user_model()
+
+
+class OrganizationMembersConnectionTests(TestCase):
+    """Tests for the paginated member list"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        for i in range(3):
+            member = User.objects.create_user(f'member{i}@test.com', f'member{i}@test.com', 'pass')
+            OrganizationMember.objects.create(user=member, organization=self.org, role='MEMBER')
+        self.client = Client(schema)
+    
+    def test_members_page_by_join_order(self):
+        """Members should come back in join order, two per page"""
+        query = '''
+            query ($after: String) {
+                organizationMembersConnection(organizationId: %d, first: 2, after: $after) {
+                    edges { node { user { email } } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }
+        ''' % self.org.id
+        first = self.client.execute(query, context=MockContext(self.owner))['data']['organizationMembersConnection']
+        second = self.client.execute(
+            query,
+            variables={'after': first['pageInfo']['endCursor']},
+            context=MockContext(self.owner),
+        )['data']['organizationMembersConnection']
+        
+        emails = [edge['node']['user']['email'] for edge in first['edges'] + second['edges']]
+        self.assertEqual(emails, ['owner@test.com', 'member0@test.com', 'member1@test.com', 'member2@test.com'])
+        self.assertTrue(first['pageInfo']['hasNextPage'])
+        self.assertFalse(second['pageInfo']['hasNextPage'])
+
 
-# Create your tests here.
+class RoleCacheTests(TestCase):
+    """Tests for the cross-request role cache"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.member = User.objects.create_user('member@test.com', 'member@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        self.membership = OrganizationMember.objects.create(user=self.member, organization=self.org, role='MEMBER')
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.client = Client(schema)
+    
+    def project_name(self, user):
+        query = '{ project(id: %d) { name } }' % self.project.id
+        result = self.client.execute(query, context=MockContext(user))
+        return result.get('data', {}).get('project') and result['data']['project']['name']
+    
+    def test_warm_cache_checks_touch_no_database(self):
+        """Only the project row itself should be read once the roles are cached"""
+        self.project_name(self.member)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.project_name(self.member), 'Test Project')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('organizations_organizationmember', queries[0]['sql'])
+    
+    def test_removed_member_loses_access(self):
+        """Deleting a membership should invalidate the cached roles"""
+        self.assertEqual(self.project_name(self.member), 'Test Project')
+        self.membership.delete()
+        self.assertIsNone(self.project_name(self.member))
+    
+    def test_revocation_reaches_other_workers(self):
+        """Through a shared cache, a membership deleted on one worker should end access on the others"""
+        with tempfile.TemporaryDirectory() as directory:
+            # Each worker process has its own client for the same storage
+            this_worker, other_worker = FileBasedCache(directory, {}), FileBasedCache(directory, {})
+            with unittest.mock.patch('organizations.authz.cache', this_worker):
+                self.assertEqual(self.project_name(self.member), 'Test Project')
+            with unittest.mock.patch('organizations.authz.cache', other_worker):
+                self.membership.delete()
+            with unittest.mock.patch('organizations.authz.cache', this_worker):
+                self.assertIsNone(self.project_name(self.member))
+    
+    def test_evicted_version_does_not_revive_old_roles(self):
+        """Losing the version key should not bring back a role map cached under an earlier version"""
+        self.assertEqual(load_user_roles(self.member.pk), {self.org.pk: 'MEMBER'})
+        OrganizationMember.objects.filter(pk=self.membership.pk).update(role='OWNER')
+        invalidate_user_roles(self.member.pk)
+        self.assertEqual(load_user_roles(self.member.pk), {self.org.pk: 'OWNER'})
+        
+        # The cache drops the version (eviction, restart); the MEMBER map may still be cached
+        cache.delete(f'authz:roles-version:{self.member.pk}')
+        OrganizationMember.objects.filter(pk=self.membership.pk).update(role='MEMBER')
+        self.assertEqual(load_user_roles(self.member.pk), {self.org.pk: 'MEMBER'})
+        cache.delete(f'authz:roles-version:{self.member.pk}')
+        OrganizationMember.objects.filter(pk=self.membership.pk).update(role='OWNER')
+        self.assertEqual(load_user_roles(self.member.pk), {self.org.pk: 'OWNER'})
+    
+    def test_role_change_is_seen(self):
+        """Promoting a member should take effect on the next request"""
+        query = '{ organizationMembers(organizationId: %d) { role } }' % self.org.id
+        mutation = 'mutation { inviteMember(email: "new@test.com", organizationId: %d) { success } }' % self.org.id
+        self.client.execute(query, context=MockContext(self.member))
+        self.assertIn('Only owners', str(self.client.execute(mutation, context=MockContext(self.member))['errors']))
+        
+        self.membership.role = 'OWNER'
+        self.membership.save()
+        result = self.client.execute(mutation, context=MockContext(self.member))
+        self.assertTrue(result['data']['inviteMember']['success'])
+    
+    def test_accepted_invite_grants_access(self):
+        """A user joining through an invitation should see the organization at once"""
+        Invitation.objects.create(email='new@test.com', organization=self.org, invited_by=self.owner, token='tok')
+        mutation = '''
+            mutation {
+                acceptInvite(token: "tok", password: "pass", firstName: "New", lastName: "User") { user { id } }
+            }
+        '''
+        result = self.client.execute(mutation, context=MockContext())
+        self.assertIsNone(result.get('errors'))
+        self.assertEqual(self.project_name(User.objects.get(email='new@test.com')), 'Test Project')
@@ -0,0 +1,416 @@
+"""
+Activity logging for the project feed.
+
+Every write mutation records an ``Activity`` row through ``log_activity``,
+which also notifies ``projectActivity`` subscribers once the row is stored.
+Rows hold an action code and a small JSON payload (the statuses of a move,
+the fields of an update); ``describe_activity`` renders the sentence shown in
+the feed at read time, with the task's current title.
+
+How rows are stored depends on ``settings.ACTIVITY_WRITER``:
+
+- ``'sync'`` inserts the row inside the mutation's transaction and publishes
+  it after commit. This is the default.
+- ``'buffered'`` (opt-in) hands the activity to a ``BufferedActivityWriter`` after the
+  mutation commits, so the audit insert is not part of the request. The
+  writer inserts buffered activities in batches from a background thread,
+  once ``ACTIVITY_BATCH_SIZE`` are pending or every
+  ``ACTIVITY_FLUSH_INTERVAL`` seconds, and once more when the process exits.
+
+Buffered activities are also appended to a per-process spool file in
+``ACTIVITY_SPOOL_DIR`` until they are inserted. A writer starting up inserts
+what a crashed process left in its spool, so activities are written at least
+once: a crash between an insert and the spool truncation replays that batch.
+It renames a spool file before reading it, so of several workers starting at
+once only one replays it. A batch whose insert fails ``ACTIVITY_FLUSH_ATTEMPTS``
+times in a row is moved to a ``failed-activity-*`` file in the spool directory
+for inspection instead of being retried forever.
+
+Buffered activities keep the time they were logged at, not the time of the
+flush.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from api.broker import get_broker
+from api.response_cache import bump_versions
+from .models import Activity, Project, Task
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = 'activity-'
+SPOOL_SUFFIX = '.ndjson'
+# Appended with the replaying process's pid to a spool file it has claimed
+CLAIM_MARK = '.claimed-'
+FAILED_PREFIX = 'failed-activity-'
+
+
+def activity_channel(project_id):
+    """Broker channel carrying new activity ids for one project"""
+    return f'project-activity.{project_id}'
+
+
+# Sentences for each action; ``{task}`` is the quoted task title
+DESCRIPTIONS = {
+    'TASK_CREATED': 'created task {task}',
+    'TASK_UPDATED': 'updated task {task}',
+    'TASK_MOVED': 'moved {task} from {from} to {to}',
+    'TASK_DELETED': 'deleted task {task}',
+    'COMMENT_ADDED': 'commented on {task}',
+    'PROJECT_CREATED': 'created the project',
+}
+
+
+def describe_activity(activity):
+    """The feed sentence for an activity, e.g. ``moved "Fix login" from TODO to DONE``"""
+    payload = activity.payload or {}
+    if 'text' in payload:
+        # Rows whose old description could not be parsed by migration 0010
+        return payload['text']
+    title = activity.task.title if activity.task_id is not None else payload.get('title')
+    values = defaultdict(str, payload, task=f'"{title}"' if title is not None else '(deleted)')
+    return DESCRIPTIONS.get(activity.action, activity.action).format_map(values)
+
+
+def _entry(project, user, action, task=None, payload=None):
+    return {
+        'project_id': project.pk,
+        'user_id': user.pk,
+        'action': action,
+        'task_id': task.pk if task is not None else None,
+        'payload': payload or {},
+        'created_at': timezone.now().isoformat(),
+    }
+
+
+def log_activity(project, user, action, task=None, payload=None):
+    """
+    Record an activity and publish it to subscribers once stored.
+
+    Activities without a task (such as deletions) should carry the task's
+    ``title`` in ``payload``.
+    """
+    if settings.ACTIVITY_WRITER == 'buffered':
+        entry = _entry(project, user, action, task, payload)
+        transaction.on_commit(partial(get_activity_writer().write, [entry]))
+        return None
+
+    activity = Activity.objects.create(
+        project=project,
+        user=user,
+        action=action,
+        task=task,
+        payload=payload or {},
+    )
+    transaction.on_commit(partial(publish_activity, activity))
+    return activity
+
+
+def log_activities(entries):
+    """
+    Record several activities with one insert and publish them once stored.
+
+    ``entries`` are ``(project, user, action, task, payload)`` tuples.
+    """
+    if settings.ACTIVITY_WRITER == 'buffered':
+        batch = [_entry(*entry) for entry in entries]
+        transaction.on_commit(partial(get_activity_writer().write, batch))
+        return []
+
+    activities = Activity.objects.bulk_create([
+        Activity(project=project, user=user, action=action, task=task, payload=payload or {})
+        for project, user, action, task, payload in entries
+    ])
+    for activity in activities:
+        transaction.on_commit(partial(publish_activity, activity))
+    return activities
+
+
+def publish_activity(activity):
+    get_broker().publish(activity_channel(activity.project_id), activity.pk)
+
+
+def insert_activities(entries):
+    """
+    Insert buffered activity entries with one query and return the new rows.
+
+    Entries whose project or user was deleted in the meantime are dropped and
+    deleted tasks are cleared, as the foreign keys would have done.
+    """
+    project_ids = set(Project.objects.filter(
+        pk__in={entry['project_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    user_ids = set(get_user_model().objects.filter(
+        pk__in={entry['user_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    task_ids = set(Task.objects.filter(
+        pk__in={entry['task_id'] for entry in entries if entry['task_id'] is not None}
+    ).values_list('pk', flat=True))
+
+    return Activity.objects.bulk_create([
+        Activity(
+            project_id=entry['project_id'],
+            user_id=entry['user_id'],
+            action=entry['action'],
+            task_id=entry['task_id'] if entry['task_id'] in task_ids else None,
+            payload=entry_payload(entry),
+            created_at=entry_time(entry),
+        )
+        for entry in entries
+        if entry['project_id'] in project_ids and entry['user_id'] in user_ids
+    ])
+
+
+def entry_payload(entry):
+    """The payload of a spooled or archived entry; older ones carry a rendered description"""
+    if 'payload' not in entry and 'description' in entry:
+        return {'text': entry['description']}
+    return entry.get('payload') or {}
+
+
+def entry_time(entry):
+    """When a spooled entry was logged; entries spooled by older versions did not record it"""
+    return datetime.fromisoformat(entry['created_at']) if entry.get('created_at') else timezone.now()
+
+
+def _spool_owner(name):
+    """The pid of the process a spool file belongs to, or None for other files"""
+    base, _, claimer = name.partition(CLAIM_MARK)
+    if not (base.startswith(SPOOL_PREFIX) and base.endswith(SPOOL_SUFFIX)):
+        return None
+    try:
+        return int(claimer or base[len(SPOOL_PREFIX):-len(SPOOL_SUFFIX)])
+    except ValueError:
+        return None
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BufferedActivityWriter:
+    """
+    Batches activity inserts off the request path.
+
+    ``write()`` only appends to the buffer (and the spool file); ``flush()``
+    inserts everything buffered. ``start()`` replays leftover spool files and
+    runs a daemon thread that flushes on the size and time thresholds.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, spool_dir=None, fsync=False, max_attempts=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+        self.spool_path = (
+            os.path.join(spool_dir, f'{SPOOL_PREFIX}{os.getpid()}{SPOOL_SUFFIX}') if spool_dir else None
+        )
+        self._buffer = []
+        self._failed_attempts = 0
+        self._spool = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def write(self, entries):
+        """Buffer activity entries (dicts as built by ``log_activity``)"""
+        if not entries:
+            return
+        with self._lock:
+            self._append_to_spool(entries)
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Insert every buffered entry, publish the new rows and return them"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return []
+            try:
+                activities = insert_activities(batch)
+            except Exception:
+                with self._lock:
+                    self._failed_attempts += 1
+                    if self._failed_attempts < self.max_attempts:
+                        self._buffer[:0] = batch
+                    else:
+                        # Most likely an entry that can never be inserted
+                        self._failed_attempts = 0
+                        self._set_aside(batch)
+                        self._rewrite_spool(self._buffer)
+                raise
+            with self._lock:
+                self._failed_attempts = 0
+                # Keep only what was buffered while the batch was inserted
+                self._rewrite_spool(self._buffer)
+        # Cached feeds were built without these rows
+        bump_versions({activity.project_id for activity in activities})
+        for activity in activities:
+            publish_activity(activity)
+        return activities
+
+    def start(self):
+        """Replay leftover spool files and start the background flush thread"""
+        if self._thread is not None:
+            return
+        try:
+            self.replay_spools()
+        except Exception:
+            logger.exception("Could not replay the activity spool")
+        self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Stop the background thread and flush what is left"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not flush %d buffered activities; they stay in the spool", self.pending())
+        finally:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not flush %d buffered activities", self.pending())
+        connection.close()
+
+    def replay_spools(self):
+        """Insert the entries of spool files left by processes that are gone"""
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+        replayed = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            pid = _spool_owner(name)
+            if pid is None or (pid != os.getpid() and _pid_running(pid)):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            if path == self.spool_path and self._spool is not None:
+                continue
+            # Claim the file first: the rename succeeds in only one of the workers starting now
+            claimed = os.path.join(self.spool_dir, f'{name.partition(CLAIM_MARK)[0]}{CLAIM_MARK}{os.getpid()}')
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            entries = self._read_spool(claimed)
+            activities = insert_activities(entries) if entries else []
+            bump_versions({activity.project_id for activity in activities})
+            for activity in activities:
+                publish_activity(activity)
+            os.remove(claimed)
+            replayed += len(entries)
+        return replayed
+
+    @staticmethod
+    def _read_spool(path):
+        entries = []
+        with open(path, encoding='utf-8') as spool:
+            for line in spool:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by the crash
+                    logger.warning("Skipping a truncated line in %s", path)
+        return entries
+
+    def _append_to_spool(self, entries):
+        if not self.spool_path:
+            return
+        if self._spool is None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        self._spool.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def _set_aside(self, entries):
+        logger.error("Giving up on %d activities after %d failed inserts", len(entries), self.max_attempts)
+        if not self.spool_dir:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f'{FAILED_PREFIX}{os.getpid()}-{time.time_ns()}{SPOOL_SUFFIX}')
+        with open(path, 'w', encoding='utf-8') as failed:
+            failed.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+
+    def _rewrite_spool(self, entries):
+        if self._spool is None:
+            return
+        self._spool.seek(0)
+        self._spool.truncate()
+        self._spool.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_activity_writer():
+    """The process-wide buffered writer, started on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BufferedActivityWriter(
+                batch_size=settings.ACTIVITY_BATCH_SIZE,
+                flush_interval=settings.ACTIVITY_FLUSH_INTERVAL,
+                spool_dir=settings.ACTIVITY_SPOOL_DIR,
+                fsync=settings.ACTIVITY_SPOOL_FSYNC,
+                max_attempts=settings.ACTIVITY_FLUSH_ATTEMPTS,
+            )
+            _writer.start()
+        return _writer
+
+
+def close_activity_writer():
+    """Flush and stop the process-wide writer, if one was started"""
+    with _writer_lock:
+        writer = _writer
+    if writer is not None:
+        writer.close()
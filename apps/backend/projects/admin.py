@@ -1,11 +1,13 @@
 from django.contrib import admin
 from .models import Project, Task, TaskComment
+from .counters import rebuild_task_counters
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('name', 'organization', 'status', 'due_date', 'created_at')
+    list_display = ('name', 'organization', 'status', 'todo_count', 'in_progress_count', 'completed_count', 'due_date', 'created_at')
     list_filter = ('status', 'organization')
     search_fields = ('name', 'description')
+    readonly_fields = ('todo_count', 'in_progress_count', 'completed_count')
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -14,6 +16,12 @@ class TaskAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
     filter_horizontal = ('assignees',)  # Nice widget for ManyToMany
 
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes bypass Task.delete(), so recount the affected projects
+        project_ids = list(queryset.values_list('project_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        rebuild_task_counters(project_ids)
+
 @admin.register(TaskComment)
 class TaskCommentAdmin(admin.ModelAdmin):
     list_display = ('task', 'author', 'timestamp')
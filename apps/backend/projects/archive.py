@@ -0,0 +1,173 @@
+"""
+Activity retention and archival.
+
+Activities older than a project's retention window are moved out of the
+``Activity`` table into gzip-compressed NDJSON files, so the hot table and its
+indexes only hold what the live feed reads. The window is, in order of
+precedence, ``Project.activity_retention_days``,
+``Organization.activity_retention_days`` and ``settings.ACTIVITY_RETENTION_DAYS``;
+0 keeps a project's activity forever.
+
+Files live in ``settings.ACTIVITY_ARCHIVE_DIR``, one directory per project and
+one file per archived chunk, named after the chunk's first and last id::
+
+    project-42/000000001001-000000002000.ndjson.gz
+
+``archive_project_activity()`` works in chunks: it writes a chunk's file and
+syncs it and its directory to disk, then deletes those rows in a short transaction of its own, so no lock is held
+for more than one chunk. A crash between the two steps archives the rows
+again on the next run; readers ignore the duplicates.
+``read_archived_activities()`` reads the history back as unsaved ``Activity``
+instances that ``ActivityType`` can render.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from api.response_cache import bump_versions
+
+from .activity import entry_payload
+from .models import Activity, Project, Task
+
+ARCHIVE_FIELDS = ('id', 'project_id', 'user_id', 'action', 'payload', 'task_id', 'created_at')
+ARCHIVE_SUFFIX = '.ndjson.gz'
+
+
+def retention_days(project):
+    """Days of activity ``project`` keeps in the hot table (0: forever)"""
+    for days in (project.activity_retention_days, project.organization.activity_retention_days):
+        if days is not None:
+            return days
+    return settings.ACTIVITY_RETENTION_DAYS or 0
+
+
+def archive_cutoffs(project_ids=None, now=None):
+    """``{project_id: cutoff}`` for every project with a retention window"""
+    now = now or timezone.now()
+    projects = Project.objects.select_related('organization').only(
+        'activity_retention_days', 'organization__activity_retention_days',
+    )
+    if project_ids:
+        projects = projects.filter(pk__in=project_ids)
+    cutoffs = {}
+    for project in projects:
+        days = retention_days(project)
+        if days:
+            cutoffs[project.pk] = now - timedelta(days=days)
+    return cutoffs
+
+
+def project_archive_dir(project_id, archive_dir=None):
+    return os.path.join(archive_dir or settings.ACTIVITY_ARCHIVE_DIR, f'project-{project_id}')
+
+
+def _write_chunk(directory, rows):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{rows[0]['id']:012d}-{rows[-1]['id']:012d}{ARCHIVE_SUFFIX}")
+    partial = path + '.tmp'
+    with open(partial, 'wb') as raw:
+        with gzip.open(raw, 'wt', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(row, created_at=row['created_at'].isoformat())) + '\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    # The rename is only durable once the directory entry is on disk too
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+    return path
+
+
+def archive_project_activity(project_id, cutoff, batch_size=1000, archive_dir=None, dry_run=False):
+    """
+    Move a project's activities created before ``cutoff`` into archive files.
+
+    Returns the number of rows archived (or that would be, with ``dry_run``).
+    """
+    queryset = Activity.objects.filter(project_id=project_id, created_at__lt=cutoff)
+    if dry_run:
+        return queryset.count()
+
+    directory = project_archive_dir(project_id, archive_dir)
+    archived = 0
+    while True:
+        rows = list(queryset.order_by('id').values(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            return archived
+        _write_chunk(directory, rows)
+        with transaction.atomic():
+            Activity.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        bump_versions([project_id])
+        archived += len(rows)
+
+
+def _archive_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    files = []
+    for name in os.listdir(directory):
+        if not name.endswith(ARCHIVE_SUFFIX):
+            continue
+        first, _, last = name[:-len(ARCHIVE_SUFFIX)].partition('-')
+        try:
+            files.append((int(first), int(last), os.path.join(directory, name)))
+        except ValueError:
+            continue
+    return files
+
+
+def read_archived_activities(project_id, before_id=None, limit=20, archive_dir=None):
+    """
+    Archived activities of a project, newest first.
+
+    ``before_id`` pages backwards: only activities with a smaller id are
+    returned. Users and tasks are loaded in one query each; activities of
+    deleted users are skipped and deleted tasks are cleared.
+    """
+    if limit is not None and limit <= 0:
+        return []
+    rows = {}
+    files = sorted(_archive_files(project_archive_dir(project_id, archive_dir)), reverse=True)
+    for first, last, path in files:
+        if before_id is not None and first >= before_id:
+            continue
+        # Files are newest first, so later files cannot beat what is already collected
+        if limit is not None and len(rows) >= limit and last < min(rows):
+            break
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                row = json.loads(line)
+                if before_id is None or row['id'] < before_id:
+                    rows[row['id']] = row
+
+    selected = [rows[pk] for pk in sorted(rows, reverse=True)]
+    users = get_user_model().objects.in_bulk({row['user_id'] for row in selected})
+    tasks = Task.objects.in_bulk({row['task_id'] for row in selected if row['task_id'] is not None})
+
+    activities = []
+    for row in selected:
+        if row['user_id'] not in users:
+            continue
+        task = tasks.get(row['task_id'])
+        activity = Activity(
+            id=row['id'],
+            project_id=row['project_id'],
+            user=users[row['user_id']],
+            action=row['action'],
+            task=task,
+            payload=entry_payload(row),
+            created_at=datetime.fromisoformat(row['created_at']),
+        )
+        activities.append(activity)
+        if limit is not None and len(activities) == limit:
+            break
+    return activities
@@ -0,0 +1,90 @@
+"""
+Batched task writes for the bulkCreateTasks/bulkUpdateTasks mutations.
+
+``Task.save()`` keeps the project counters and the search index in step one
+row at a time. These helpers write many tasks with ``bulk_create()`` and
+``bulk_update()`` instead, so they apply the same side effects themselves:
+one counter update per (project, status), one assignee insert, one search
+index refresh and one activity insert for the whole batch. Callers run them
+inside a transaction and check permissions first.
+"""
+from collections import Counter
+
+from .activity import log_activities
+from .models import Project, Task
+from .search import index_tasks
+
+Assignment = Task.assignees.through
+
+
+def _apply_counter_deltas(deltas):
+    for (project_id, status), delta in deltas.items():
+        if delta:
+            Project.adjust_task_counter(project_id, status, delta)
+
+
+def create_tasks(project, user, tasks, assignee_ids):
+    """
+    Insert ``tasks`` (unsaved ``Task`` instances of ``project``) in one query.
+
+    ``assignee_ids`` holds one list of user ids per task.
+    """
+    for task in tasks:
+        Task.check_status(task.status)
+    tasks = Task.objects.bulk_create(tasks)
+    Assignment.objects.bulk_create([
+        Assignment(task_id=task.pk, user_id=user_id)
+        for task, user_ids in zip(tasks, assignee_ids)
+        for user_id in dict.fromkeys(user_ids or ())
+    ])
+    _apply_counter_deltas(Counter((project.pk, task.status) for task in tasks))
+    index_tasks([task.pk for task in tasks])
+    log_activities([(project, user, 'TASK_CREATED', task, None) for task in tasks])
+    return tasks
+
+
+def update_tasks(user, changes):
+    """
+    Apply field and assignee changes to already loaded (and locked) tasks.
+
+    ``changes`` is a list of ``(task, fields, assignee_ids)``: ``fields`` maps
+    field names to new values and ``assignee_ids`` is None to keep the
+    current assignees.
+    """
+    deltas = Counter()
+    updated_fields = set()
+    activities = []
+    for _, fields, _ in changes:
+        if 'status' in fields:
+            Task.check_status(fields['status'])
+    for task, fields, user_ids in changes:
+        old_status = task.status
+        for name, value in fields.items():
+            setattr(task, name, value)
+        updated_fields.update(fields)
+        if task.status != old_status:
+            deltas[(task.project_id, old_status)] -= 1
+            deltas[(task.project_id, task.status)] += 1
+            activities.append((task.project, user, 'TASK_MOVED', task, {'from': old_status, 'to': task.status}))
+        else:
+            changed = sorted(fields) + (['assignees'] if user_ids is not None else [])
+            activities.append((task.project, user, 'TASK_UPDATED', task, {'fields': changed}))
+
+    tasks = [task for task, _, _ in changes]
+    if updated_fields:
+        Task.objects.bulk_update(tasks, sorted(updated_fields))
+
+    reassigned = {task.pk: user_ids for task, _, user_ids in changes if user_ids is not None}
+    if reassigned:
+        Assignment.objects.filter(task_id__in=reassigned).delete()
+        Assignment.objects.bulk_create([
+            Assignment(task_id=task_id, user_id=user_id)
+            for task_id, user_ids in reassigned.items()
+            for user_id in dict.fromkeys(user_ids)
+        ])
+
+    _apply_counter_deltas(deltas)
+    if updated_fields & {'title', 'description'}:
+        index_tasks([task.pk for task in tasks])
+    log_activities(activities)
+    return tasks
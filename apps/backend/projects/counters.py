@@ -0,0 +1,74 @@
+"""
+Helpers for the denormalized task counters on ``Project``.
+
+The counters are kept up to date incrementally by ``Task.save()`` and
+``Task.delete()``; these helpers recompute them from the ``Task`` table for
+backfills, bulk operations and drift checks.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count
+
+from api.response_cache import bump_versions
+
+from .models import Project, Task
+
+
+def count_tasks_by_status(project_ids):
+    """Task counts per status for each project, using one grouped query"""
+    counts = {project_id: {status: 0 for status, _ in Task.STATUS_CHOICES} for project_id in project_ids}
+    rows = (
+        Task.objects.filter(project_id__in=project_ids)
+        .values('project_id', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        counts[row['project_id']][row['status']] = row['total']
+    return counts
+
+
+def find_counter_drift(project_ids=None):
+    """
+    Compare stored counters with the Task table.
+    
+    Returns a dict of project id -> {field: (stored, actual)} for every project
+    whose counters are wrong.
+    """
+    projects = Project.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+    stored = {
+        row['id']: row
+        for row in projects.values('id', *Project.TASK_COUNTER_FIELDS.values())
+    }
+    actual = count_tasks_by_status(list(stored))
+    
+    drift = {}
+    for project_id, row in stored.items():
+        fields = {}
+        for status, field in Project.TASK_COUNTER_FIELDS.items():
+            if row[field] != actual[project_id][status]:
+                fields[field] = (row[field], actual[project_id][status])
+        if fields:
+            drift[project_id] = fields
+    return drift
+
+
+def rebuild_task_counters(project_ids=None):
+    """Recompute counters from the Task table. Returns the drift that was fixed."""
+    with transaction.atomic():
+        if project_ids is not None:
+            # Lock the rows so concurrent task writes wait for the rebuild
+            list(Project.objects.select_for_update().filter(pk__in=project_ids).values_list('pk'))
+        drift = find_counter_drift(project_ids)
+        for project_id, fields in drift.items():
+            Project.objects.filter(pk=project_id).update(
+                **{field: actual for field, (_, actual) in fields.items()}
+            )
+        if drift:
+            # Cached responses show the corrected counters from now on
+            organization_ids = set(Project.objects.filter(pk__in=drift).values_list('organization_id', flat=True))
+            transaction.on_commit(partial(bump_versions, list(drift), organization_ids))
+    return drift
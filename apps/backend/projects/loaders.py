@@ -0,0 +1,64 @@
+"""
+Request-scoped batch loaders for the GraphQL resolvers.
+
+Loader instances are attached to ``info.context`` for the lifetime of a
+request, so every resolver in a response shares the same caches. List
+resolvers prime a loader with the keys they are about to return; the first
+field that needs data for any of those keys then fetches all of them at once.
+"""
+from .models import Task
+
+
+class BatchLoader:
+    """
+    Collects keys and resolves every pending key with one batch query on the
+    first miss. Subclasses define ``batch_load(keys)``, which returns a dict
+    mapping every key to its value.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._pending = set()
+
+    def prime(self, keys):
+        for key in keys:
+            if key not in self._cache:
+                self._pending.add(key)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._pending.add(key)
+            keys, self._pending = self._pending, set()
+            self._cache.update(self.batch_load(keys))
+        return self._cache[key]
+
+    def clear(self, key):
+        """Forget a cached value, e.g. after a mutation changed it"""
+        self._cache.pop(key, None)
+
+
+class AssigneeLoader(BatchLoader):
+    """Task id -> list of assigned users, read through the Task.assignees table"""
+
+    def batch_load(self, task_ids):
+        assignees = {task_id: [] for task_id in task_ids}
+        rows = (
+            Task.assignees.through.objects
+            .filter(task_id__in=task_ids)
+            .select_related('user')
+            .order_by('id')
+        )
+        for row in rows:
+            assignees[row.task_id].append(row.user)
+        return assignees
+
+
+def get_loader(info, loader_class):
+    """Return the request's instance of ``loader_class``, creating it on first use"""
+    loaders = getattr(info.context, '_loaders', None)
+    if loaders is None:
+        loaders = {}
+        info.context._loaders = loaders
+    if loader_class not in loaders:
+        loaders[loader_class] = loader_class()
+    return loaders[loader_class]
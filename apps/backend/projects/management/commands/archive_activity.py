@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.archive import archive_cutoffs, archive_project_activity
+
+
+class Command(BaseCommand):
+    help = "Move activity older than each project's retention window into compressed archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project',
+            type=int,
+            action='append',
+            dest='project_ids',
+            help="Limit to a project id (can be repeated)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Rows archived and deleted per transaction (default: 1000)",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help="Seconds to sleep between projects, to spread the load",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many rows would be archived",
+        )
+
+    def handle(self, *args, project_ids=None, batch_size=1000, pause=0, dry_run=False, **options):
+        total = 0
+        for project_id, cutoff in sorted(archive_cutoffs(project_ids).items()):
+            archived = archive_project_activity(project_id, cutoff, batch_size=batch_size, dry_run=dry_run)
+            if archived:
+                self.stdout.write(f"Project {project_id}: {archived} activities before {cutoff:%Y-%m-%d %H:%M}")
+                if pause:
+                    time.sleep(pause)
+            total += archived
+
+        verb = "Would archive" if dry_run else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} activities"))
@@ -0,0 +1,18 @@
+from django.core.management.commands import flush
+from django.db import connections
+
+from projects.models import Task
+from projects.search import get_search_backend
+
+
+class Command(flush.Command):
+    help = flush.Command.help + " The task search index is emptied along with the tasks."
+
+    def handle(self, **options):
+        super().handle(**options)
+        # The index table has no model, so Django's flush leaves it alone
+        database = options['database']
+        backend = get_search_backend(connections[database])
+        if backend is not None and not Task.objects.using(database).exists():
+            with connections[database].cursor() as cursor:
+                backend.clear(cursor)
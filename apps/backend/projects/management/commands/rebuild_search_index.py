@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from projects.search import get_search_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the task full-text search index from the Task and TaskComment tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project',
+            type=int,
+            action='append',
+            dest='project_ids',
+            help="Limit to a project id (can be repeated)",
+        )
+
+    def handle(self, *args, project_ids=None, **options):
+        if get_search_backend() is None:
+            self.stdout.write(self.style.WARNING("This database has no search index; search uses substring matching"))
+            return
+        count = rebuild_search_index(project_ids)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} task(s)"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.counters import find_counter_drift, rebuild_task_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized task counters on Project from the Task table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report drift; exit with an error if any counter is wrong",
+        )
+        parser.add_argument(
+            '--project',
+            type=int,
+            action='append',
+            dest='project_ids',
+            help="Limit to a project id (can be repeated)",
+        )
+
+    def handle(self, *args, check=False, project_ids=None, **options):
+        if check:
+            drift = find_counter_drift(project_ids)
+        else:
+            drift = rebuild_task_counters(project_ids)
+
+        for project_id, fields in sorted(drift.items()):
+            changes = ", ".join(
+                f"{field} {stored} -> {actual}" for field, (stored, actual) in fields.items()
+            )
+            self.stdout.write(f"Project {project_id}: {changes}")
+
+        if check and drift:
+            raise CommandError(f"{len(drift)} project(s) have drifted task counters")
+        if check:
+            self.stdout.write(self.style.SUCCESS("All task counters are correct"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt task counters ({len(drift)} project(s) fixed)"))
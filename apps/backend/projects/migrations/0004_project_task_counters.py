@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+COUNTER_FIELDS = {
+    'TODO': 'todo_count',
+    'IN_PROGRESS': 'in_progress_count',
+    'DONE': 'completed_count',
+}
+
+
+def backfill_task_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('projects', 'Task')
+    db = schema_editor.connection.alias
+    counts = {}
+    rows = Task.objects.using(db).values('project_id', 'status').annotate(total=Count('id')).order_by()
+    for row in rows:
+        field = COUNTER_FIELDS.get(row['status'])
+        if field:
+            counts.setdefault(row['project_id'], {})[field] = row['total']
+    for project_id, fields in counts.items():
+        Project.objects.using(db).filter(pk=project_id).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='todo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
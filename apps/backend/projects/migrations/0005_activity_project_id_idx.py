@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_project_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['project', 'id'], name='activity_project_id_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+from django.db import migrations
+
+# The index schema as of this migration; later changes to projects.search get
+# their own migrations rather than altering what this one creates.
+CREATE_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS projects_task_search USING fts5("
+        "title, description, comments, project_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    ],
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS projects_task_search ("
+        "task_id bigint PRIMARY KEY REFERENCES projects_task (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "project_id bigint NOT NULL, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS projects_task_search_document_idx ON projects_task_search USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS projects_task_search_project_idx ON projects_task_search (project_id)",
+    ],
+}
+
+INSERT_SQL = {
+    'sqlite': (
+        "INSERT INTO projects_task_search (rowid, project_id, title, description, comments) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    ),
+    'postgresql': (
+        "INSERT INTO projects_task_search (task_id, project_id, document) VALUES (%s, %s, "
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'C'))"
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_SQL:
+        return
+    Task = apps.get_model('projects', 'Task')
+    TaskComment = apps.get_model('projects', 'TaskComment')
+    db = schema_editor.connection.alias
+    for sql in CREATE_SQL[vendor]:
+        schema_editor.execute(sql)
+
+    task_ids = list(Task.objects.using(db).order_by('pk').values_list('pk', flat=True))
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, len(task_ids), 500):
+            batch = task_ids[start:start + 500]
+            comments = {}
+            for task_id, content in TaskComment.objects.using(db).filter(task_id__in=batch).order_by('id').values_list('task_id', 'content'):
+                comments.setdefault(task_id, []).append(content)
+            cursor.executemany(INSERT_SQL[vendor], [
+                (pk, project_id, title, description, '\n'.join(comments.get(pk, [])))
+                for pk, project_id, title, description in (
+                    Task.objects.using(db).filter(pk__in=batch).values_list('pk', 'project_id', 'title', 'description')
+                )
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute("DROP TABLE IF EXISTS projects_task_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_task_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+        # The auto-created assignees table only has (task_id, user_id) and single-column
+        # indexes; "tasks assigned to a user" lookups want user_id first and task_id covered
+        migrations.RunSQL(
+            'CREATE INDEX task_assignees_user_task_idx ON projects_task_assignees (user_id, task_id)',
+            'DROP INDEX task_assignees_user_task_idx',
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:23
+
+import re
+
+from django.db import migrations, models
+
+from projects.activity import describe_activity
+
+# Descriptions written by log_activity before the payload column
+PATTERNS = {
+    'TASK_CREATED': re.compile(r'^created task "(?P<title>.*)"$', re.S),
+    'TASK_UPDATED': re.compile(r'^updated task "(?P<title>.*)"$', re.S),
+    'TASK_MOVED': re.compile(r'^moved "(?P<title>.*)" from (?P<from>\w+) to (?P<to>\w+)$', re.S),
+    'TASK_DELETED': re.compile(r'^deleted task "(?P<title>.*)"$', re.S),
+    'COMMENT_ADDED': re.compile(r'^commented on "(?P<title>.*)"$', re.S),
+}
+BATCH_SIZE = 2000
+
+
+def parse_description(action, description, has_task):
+    match = PATTERNS.get(action) and PATTERNS[action].match(description)
+    if not match:
+        return {'text': description}
+    payload = match.groupdict()
+    title = payload.pop('title')
+    if not has_task:
+        # Without the task row the title has nowhere else to come from
+        payload['title'] = title
+    return payload
+
+
+def _batches(queryset):
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_id).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].pk
+
+
+def descriptions_to_payloads(apps, schema_editor):
+    Activity = apps.get_model('projects', 'Activity')
+    db = schema_editor.connection.alias
+    for batch in _batches(Activity.objects.using(db)):
+        for activity in batch:
+            activity.payload = parse_description(activity.action, activity.description, activity.task_id is not None)
+        Activity.objects.using(db).bulk_update(batch, ['payload'])
+
+
+def payloads_to_descriptions(apps, schema_editor):
+    Activity = apps.get_model('projects', 'Activity')
+    db = schema_editor.connection.alias
+    for batch in _batches(Activity.objects.using(db).select_related('task')):
+        for activity in batch:
+            activity.description = describe_activity(activity)
+        Activity.objects.using(db).bulk_update(batch, ['description'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_activity_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(descriptions_to_payloads, payloads_to_descriptions),
+        # Gives the column a default, so unapplying the removal can add it back to existing rows
+        migrations.AlterField(
+            model_name='activity',
+            name='description',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='description',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_activity_payload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
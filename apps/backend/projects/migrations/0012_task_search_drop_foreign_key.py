@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:05
+
+from django.db import migrations
+
+
+def drop_task_foreign_key(apps, schema_editor):
+    # Django truncates its own tables without CASCADE (flush, TransactionTestCase),
+    # which a foreign key from this unmanaged table to projects_task would block.
+    # The post_delete handler in projects.signals removes the rows of deleted tasks.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE projects_task_search DROP CONSTRAINT IF EXISTS projects_task_search_task_id_fkey"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_activity_created_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_task_foreign_key, migrations.RunPython.noop),
+    ]
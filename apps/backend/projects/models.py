@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 
 class Project(models.Model):
     organization = models.ForeignKey('organizations.Organization', on_delete=models.CASCADE)
@@ -14,10 +16,41 @@ class Project(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    
+    # Overrides the organization's activity retention (see projects/archive.py)
+    activity_retention_days = models.PositiveIntegerField(null=True, blank=True)
+    
+    # Denormalized task counters, maintained by Task.save()/Task.delete()
+    todo_count = models.PositiveIntegerField(default=0, editable=False)
+    in_progress_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Task status -> counter field
+    TASK_COUNTER_FIELDS = {
+        'TODO': 'todo_count',
+        'IN_PROGRESS': 'in_progress_count',
+        'DONE': 'completed_count',
+    }
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of an organization's projects
+            models.Index(fields=['organization', 'created_at', 'id'], name='project_org_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def task_count(self):
+        return self.todo_count + self.in_progress_count + self.completed_count
+
+    @classmethod
+    def adjust_task_counter(cls, project_id, status, delta):
+        """Atomically add ``delta`` to the counter for ``status`` on one project"""
+        field = cls.TASK_COUNTER_FIELDS[status]
+        cls.objects.filter(pk=project_id).update(**{field: F(field) + delta})
+
 
 class Task(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
@@ -41,9 +74,80 @@ class Task(models.Model):
     due_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a project's tasks
+            models.Index(fields=['project', 'created_at', 'id'], name='task_project_created_idx'),
+            # Board columns and status filters within a project
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def check_status(cls, status):
+        """Reject a status the project counters do not know, before anything is written"""
+        if status not in dict(cls.STATUS_CHOICES):
+            raise Exception(f"Invalid status {status}")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Read from __dict__ so a deferred status or project is not loaded here
+        key = (instance.__dict__.get('project_id'), instance.__dict__.get('status'))
+        instance._loaded_counter_key = None if None in key else key
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'status', 'project', 'project_id'} & set(update_fields):
+            return super().save(*args, **kwargs)
+        
+        # Status and project unchanged since the row was loaded: no counter
+        # moves, so skip locking the stored row
+        loaded = getattr(self, '_loaded_counter_key', None)
+        if loaded is not None and not self._state.adding and loaded == (self.project_id, self.status):
+            return super().save(*args, **kwargs)
+        
+        with transaction.atomic():
+            previous = self._stored_counter_key()
+            super().save(*args, **kwargs)
+            current = (self.project_id, self.status)
+            if previous != current:
+                if previous is not None:
+                    self._adjust_project_counter(*previous, -1)
+                self._adjust_project_counter(*current, 1)
+        self._loaded_counter_key = current
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = self._stored_counter_key()
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                self._adjust_project_counter(*previous, -1)
+        return result
+
+    def _stored_counter_key(self):
+        """(project_id, status) of the stored row, locked until the transaction ends"""
+        if self.pk is None:
+            return None
+        return (
+            Task.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values_list('project_id', 'status')
+            .first()
+        )
+
+    def _adjust_project_counter(self, project_id, status, delta):
+        Project.adjust_task_counter(project_id, status, delta)
+        # Keep an already loaded project instance in step with the database
+        project = self._state.fields_cache.get('project')
+        if project is not None and project.pk == project_id:
+            field = Project.TASK_COUNTER_FIELDS[status]
+            if field in project.__dict__:
+                setattr(project, field, getattr(project, field) + delta)
+
 
 class TaskComment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
@@ -75,12 +179,20 @@ class Activity(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='activities')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
-    description = models.TextField()
+    # Action details, e.g. {"from": "TODO", "to": "DONE"}; rendered by projects.activity.describe_activity
+    payload = models.JSONField(default=dict, blank=True)
     task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so buffered activities keep the time of their mutation
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Range probes for incremental polling (id > cursor within a project)
+            models.Index(fields=['project', 'id'], name='activity_project_id_idx'),
+            # Keyset pagination of the feed, newest first
+            models.Index(fields=['project', '-created_at', '-id'], name='activity_project_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} by {self.user.email}"
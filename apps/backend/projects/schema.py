@@ -1,8 +1,21 @@
 import graphene
+from asgiref.sync import sync_to_async
 from graphene_django import DjangoObjectType
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from . import bulk
 from .models import Project, Task, TaskComment, Activity
+from .loaders import AssigneeLoader, get_loader
+from .activity import activity_channel, describe_activity, log_activity
+from .archive import read_archived_activities
+from .search import search_tasks
+from organizations.authz import get_authz
 from organizations.models import OrganizationMember
+from api.broker import get_broker
+from api.db import database_sync_to_async, retry_on_lock
+from api.optimizer import optimize
+from api.pagination import build_connection, connection_args, keyset_page, paginate
+from api.response_cache import bump_organization_version, bump_project_version
 
 User = get_user_model()
 
@@ -14,11 +27,20 @@ class UserType(DjangoObjectType):
 
 
 class ActivityType(DjangoObjectType):
+    description = graphene.String()
     user_name = graphene.String()
     
+    optimizer_hints = {
+        'description': ('action', 'payload', 'task__title'),
+        'user_name': ('user__first_name', 'user__last_name', 'user__email'),
+    }
+    
     class Meta:
         model = Activity
-        fields = ['id', 'action', 'description', 'created_at', 'task']
+        fields = ['id', 'action', 'payload', 'created_at', 'task']
+    
+    def resolve_description(self, info):
+        return describe_activity(self)
     
     def resolve_user_name(self, info):
         first = self.user.first_name or ''
@@ -27,6 +49,13 @@ class ActivityType(DjangoObjectType):
         return full_name if full_name else self.user.email
 
 
+class ActivityDeltaType(graphene.ObjectType):
+    """Activities newer than a cursor, for clients that poll"""
+    cursor = graphene.Int(description="Pass as afterId on the next poll")
+    has_more = graphene.Boolean()
+    activities = graphene.List(ActivityType)
+
+
 class ProjectType(DjangoObjectType):
     task_count = graphene.Int()
     completed_count = graphene.Int()
@@ -34,39 +63,57 @@ class ProjectType(DjangoObjectType):
     todo_count = graphene.Int()
     completion_rate = graphene.Float()
     
+    optimizer_hints = {
+        'tasks': ('tasks',),
+        'task_count': ('todo_count', 'in_progress_count', 'completed_count'),
+        'completion_rate': ('todo_count', 'in_progress_count', 'completed_count'),
+    }
+    
     class Meta:
         model = Project
         fields = "__all__"
     
-    def resolve_task_count(self, info):
-        return self.tasks.count()
-    
-    def resolve_completed_count(self, info):
-        return self.tasks.filter(status='DONE').count()
-    
-    def resolve_in_progress_count(self, info):
-        return self.tasks.filter(status='IN_PROGRESS').count()
-    
-    def resolve_todo_count(self, info):
-        return self.tasks.filter(status='TODO').count()
+    def resolve_tasks(self, info):
+        return prime_assignees(info, self.tasks.all())
     
     def resolve_completion_rate(self, info):
-        total = self.tasks.count()
+        total = self.task_count
         if total == 0:
             return 0.0
-        done = self.tasks.filter(status='DONE').count()
-        return round((done / total) * 100, 1)
+        return round((self.completed_count / total) * 100, 1)
+    
+    async def aresolve_completion_rate(self, info):
+        # Only reads the counter columns, so it needs no thread under AsyncGraphQLView
+        return ProjectType.resolve_completion_rate(self, info)
 
 
 class TaskType(DjangoObjectType):
     assignees = graphene.List(UserType)
     
+    # Assignees come from AssigneeLoader, not from the task row
+    optimizer_hints = {'assignees': ()}
+    
     class Meta:
         model = Task
         fields = "__all__"
     
     def resolve_assignees(self, info):
-        return self.assignees.all()
+        return get_loader(info, AssigneeLoader).load(self.pk)
+
+
+class ProjectConnection(graphene.relay.Connection):
+    class Meta:
+        node = ProjectType
+
+
+class TaskConnection(graphene.relay.Connection):
+    class Meta:
+        node = TaskType
+
+
+class ActivityConnection(graphene.relay.Connection):
+    class Meta:
+        node = ActivityType
 
 
 class TaskCommentType(DjangoObjectType):
@@ -75,15 +122,75 @@ class TaskCommentType(DjangoObjectType):
         fields = "__all__"
 
 
-def get_user_role(user, project):
+def get_user_role(info, project_id):
     """Get user's role for the project's organization"""
-    if user.is_anonymous:
+    return get_authz(info).project_role(project_id)
+
+
+def is_assignee(task_id, user):
+    """Whether the user is assigned to the task, probing the unique (task, user) index"""
+    return Task.assignees.through.objects.filter(task_id=task_id, user_id=user.pk).exists()
+
+
+def visible_projects(user):
+    """Projects from the organizations the user belongs to"""
+    user_org_ids = OrganizationMember.objects.filter(user=user).values_list('organization_id', flat=True)
+    return Project.objects.filter(organization_id__in=user_org_ids)
+
+
+def filter_tasks(info, project_id, status=None, assignee_id=None, search=None):
+    """Tasks of a project matching the filters, or None without project access"""
+    # Verify project access
+    if get_user_role(info, project_id) is None:
+        return None
+    
+    queryset = Task.objects.filter(project_id=project_id)
+    
+    # Apply filters
+    if status:
+        queryset = queryset.filter(status=status)
+    if assignee_id:
+        queryset = queryset.filter(assignees__id=assignee_id)
+    if search:
+        queryset = search_tasks(queryset, project_id, search)
+    
+    return queryset.distinct()
+
+
+def project_activities(info, project_id):
+    """Activities of a project, or None without project access"""
+    # Verify project access
+    if get_user_role(info, project_id) is None:
         return None
-    membership = OrganizationMember.objects.filter(
-        user=user,
-        organization=project.organization
-    ).first()
-    return membership.role if membership else None
+    
+    return Activity.objects.filter(project_id=project_id)
+
+
+def activity_delta_queryset(info, project_id, after_id):
+    # Oldest first, so the cursor never skips rows when there are more than `limit`.
+    # The id cursor assumes ids are handed out in commit order. That holds on
+    # SQLite, where inserts hold the write lock until commit. On PostgreSQL an
+    # activity still being committed when a poll runs can get a lower id than
+    # the returned cursor and will not be seen by that client.
+    queryset = Activity.objects.filter(project_id=project_id, id__gt=after_id).order_by('id')
+    return optimize(queryset, info, field='activities')
+
+
+def activity_delta(activities, after_id, limit):
+    """An ActivityDeltaType from up to ``limit + 1`` activities after the cursor"""
+    if not activities:
+        return ActivityDeltaType(cursor=after_id, has_more=False, activities=[])
+    
+    has_more = len(activities) > limit
+    activities = activities[:limit]
+    return ActivityDeltaType(cursor=activities[-1].pk, has_more=has_more, activities=activities)
+
+
+def prime_assignees(info, tasks):
+    """Evaluate a task list and queue its ids for one batched assignee query"""
+    tasks = list(tasks)
+    get_loader(info, AssigneeLoader).prime(task.pk for task in tasks)
+    return tasks
 
 
 class Query(graphene.ObjectType):
@@ -107,6 +214,40 @@ class Query(graphene.ObjectType):
         ActivityType,
         project_id=graphene.Int(required=True),
         limit=graphene.Int(default_value=20),
+        after_id=graphene.Int(),
+    )
+    archived_project_activity = graphene.List(
+        ActivityType,
+        project_id=graphene.Int(required=True),
+        limit=graphene.Int(default_value=20),
+        before_id=graphene.Int(),
+        description="Activity moved out of the live feed by archive_activity, newest first",
+    )
+    project_activity_delta = graphene.Field(
+        ActivityDeltaType,
+        project_id=graphene.Int(required=True),
+        after_id=graphene.Int(default_value=0),
+        limit=graphene.Int(default_value=50),
+    )
+    
+    # Keyset-paginated connections
+    all_projects_connection = graphene.Field(ProjectConnection, **connection_args())
+    organization_projects_connection = graphene.Field(
+        ProjectConnection,
+        **connection_args(organization_id=graphene.Int(required=True))
+    )
+    filtered_tasks_connection = graphene.Field(
+        TaskConnection,
+        **connection_args(
+            project_id=graphene.Int(required=True),
+            status=graphene.String(),
+            assignee_id=graphene.Int(),
+            search=graphene.String(),
+        )
+    )
+    project_activity_connection = graphene.Field(
+        ActivityConnection,
+        **connection_args(project_id=graphene.Int(required=True))
     )
 
 
@@ -115,19 +256,30 @@ class Query(graphene.ObjectType):
         if user.is_anonymous:
             return []
         # Only return projects from orgs the user belongs to
-        user_org_ids = OrganizationMember.objects.filter(user=user).values_list('organization_id', flat=True)
-        return Project.objects.filter(organization_id__in=user_org_ids)
+        return optimize(visible_projects(user), info)
 
     def resolve_project(self, info, id):
         user = info.context.user
         if user.is_anonymous:
             raise Exception("Not authenticated")
         
-        project = Project.objects.get(pk=id)
+        project = optimize(Project.objects.all(), info, only=('organization',)).get(pk=id)
         
         # Check if user belongs to this project's organization
-        membership = OrganizationMember.objects.filter(user=user, organization=project.organization).first()
-        if not membership:
+        if not get_authz(info).is_member(project.organization_id):
+            raise Exception("You don't have access to this project")
+        
+        return project
+    
+    async def aresolve_project(self, info, id):
+        user = info.context.user
+        if user.is_anonymous:
+            raise Exception("Not authenticated")
+        
+        project = await optimize(Project.objects.all(), info, only=('organization',)).aget(pk=id)
+        
+        # Check if user belongs to this project's organization
+        if not await sync_to_async(get_authz(info).is_member)(project.organization_id):
             raise Exception("You don't have access to this project")
         
         return project
@@ -137,22 +289,22 @@ class Query(graphene.ObjectType):
         if user.is_anonymous:
             return []
         # Verify user belongs to this org
-        if not OrganizationMember.objects.filter(user=user, organization_id=organization_id).exists():
+        if not get_authz(info).is_member(organization_id):
             return []
-        return Project.objects.filter(organization_id=organization_id)
+        return optimize(Project.objects.filter(organization_id=organization_id), info)
 
     def resolve_task(self, info, id):
         user = info.context.user
         if user.is_anonymous:
             raise Exception("Not authenticated")
         
-        task = Task.objects.prefetch_related('comments', 'assignees').get(pk=id)
+        task = optimize(Task.objects.all(), info, only=('project',)).get(pk=id)
         
         # Check if user belongs to the task's project's organization
-        role = get_user_role(user, task.project)
+        role = get_user_role(info, task.project_id)
         if role is None:
             raise Exception("You don't have access to this task")
-        if role == 'MEMBER' and user not in task.assignees.all():
+        if role == 'MEMBER' and not is_assignee(task.pk, user):
             raise Exception("You don't have access to this task")
         
         return task
@@ -161,49 +313,107 @@ class Query(graphene.ObjectType):
         user = info.context.user
         if user.is_anonymous:
             return []
-        return Task.objects.filter(project_id=project_id, assignees=user)
+        return prime_assignees(info, optimize(Task.objects.filter(project_id=project_id, assignees=user), info))
     
     def resolve_filtered_tasks(self, info, project_id, status=None, assignee_id=None, search=None):
         user = info.context.user
         if user.is_anonymous:
             return []
         
-        # Verify project access
-        try:
-            project = Project.objects.get(pk=project_id)
-        except Project.DoesNotExist:
+        queryset = filter_tasks(info, project_id, status, assignee_id, search)
+        if queryset is None:
             return []
-        
-        if not OrganizationMember.objects.filter(user=user, organization=project.organization).exists():
+        return prime_assignees(info, optimize(queryset, info))
+    
+    def resolve_project_activity(self, info, project_id, limit=20, after_id=None):
+        user = info.context.user
+        if user.is_anonymous:
             return []
         
-        queryset = Task.objects.filter(project_id=project_id)
-        
-        # Apply filters
-        if status:
-            queryset = queryset.filter(status=status)
-        if assignee_id:
-            queryset = queryset.filter(assignees__id=assignee_id)
-        if search:
-            queryset = queryset.filter(title__icontains=search)
+        queryset = project_activities(info, project_id)
+        if queryset is None:
+            return []
+        if after_id is not None:
+            queryset = queryset.filter(id__gt=after_id)
+        return optimize(queryset, info)[:limit]
+    
+    async def aresolve_project_activity(self, info, project_id, limit=20, after_id=None):
+        user = info.context.user
+        if user.is_anonymous:
+            return []
         
-        return queryset.distinct()
+        queryset = await sync_to_async(project_activities)(info, project_id)
+        if queryset is None:
+            return []
+        if after_id is not None:
+            queryset = queryset.filter(id__gt=after_id)
+        return [activity async for activity in optimize(queryset, info)[:limit]]
     
-    def resolve_project_activity(self, info, project_id, limit=20):
+    def resolve_archived_project_activity(self, info, project_id, limit=20, before_id=None):
         user = info.context.user
         if user.is_anonymous:
             return []
         
         # Verify project access
-        try:
-            project = Project.objects.get(pk=project_id)
-        except Project.DoesNotExist:
+        if get_user_role(info, project_id) is None:
             return []
+        return read_archived_activities(project_id, before_id=before_id, limit=min(max(limit, 0), 100))
+    
+    def resolve_project_activity_delta(self, info, project_id, after_id=0, limit=50):
+        user = info.context.user
+        if user.is_anonymous:
+            return None
         
-        if not OrganizationMember.objects.filter(user=user, organization=project.organization).exists():
-            return []
+        # Verify project access
+        if get_user_role(info, project_id) is None:
+            return None
         
-        return Activity.objects.filter(project_id=project_id).select_related('user', 'task')[:limit]
+        queryset = activity_delta_queryset(info, project_id, after_id)
+        return activity_delta(list(queryset[:limit + 1]), after_id, limit)
+    
+    async def aresolve_project_activity_delta(self, info, project_id, after_id=0, limit=50):
+        user = info.context.user
+        if user.is_anonymous:
+            return None
+        
+        # Verify project access
+        if await sync_to_async(get_user_role)(info, project_id) is None:
+            return None
+        
+        queryset = activity_delta_queryset(info, project_id, after_id)
+        return activity_delta([activity async for activity in queryset[:limit + 1]], after_id, limit)
+    
+    def resolve_all_projects_connection(self, info, first=None, after=None):
+        user = info.context.user
+        queryset = Project.objects.none() if user.is_anonymous else visible_projects(user)
+        queryset = optimize(queryset, info, only=('created_at',), field='edges.node')
+        return paginate(ProjectConnection, queryset, first, after)
+    
+    def resolve_organization_projects_connection(self, info, organization_id, first=None, after=None):
+        queryset = Project.objects.none()
+        if get_authz(info).is_member(organization_id):
+            queryset = Project.objects.filter(organization_id=organization_id)
+        queryset = optimize(queryset, info, only=('created_at',), field='edges.node')
+        return paginate(ProjectConnection, queryset, first, after)
+    
+    def resolve_filtered_tasks_connection(self, info, project_id, first=None, after=None, **filters):
+        user = info.context.user
+        queryset = None if user.is_anonymous else filter_tasks(info, project_id, **filters)
+        if queryset is None:
+            queryset = Task.objects.none()
+        queryset = optimize(queryset, info, only=('created_at',), field='edges.node')
+        rows, has_next_page = keyset_page(queryset, first, after)
+        prime_assignees(info, rows)
+        return build_connection(TaskConnection, rows, has_next_page, after)
+    
+    def resolve_project_activity_connection(self, info, project_id, first=None, after=None):
+        user = info.context.user
+        queryset = None if user.is_anonymous else project_activities(info, project_id)
+        if queryset is None:
+            queryset = Activity.objects.none()
+        # Newest first, like the activity feed
+        queryset = optimize(queryset, info, only=('created_at',), field='edges.node')
+        return paginate(ActivityConnection, queryset, first, after, descending=True)
 
 
 class CreateProject(graphene.Mutation):
@@ -216,17 +426,15 @@ class CreateProject(graphene.Mutation):
 
     project = graphene.Field(ProjectType)
 
+    @retry_on_lock
     def mutate(self, info, organization_id, name, **kwargs):
-        user = info.context.user
         # Check if user is owner
-        membership = OrganizationMember.objects.filter(
-            user=user, organization_id=organization_id, role='OWNER'
-        ).first()
-        if not membership:
+        if not get_authz(info).is_owner(organization_id):
             raise Exception("Only owners can create projects")
         
         project = Project(organization_id=organization_id, name=name, **kwargs)
         project.save()
+        bump_organization_version(organization_id)
         return CreateProject(project=project)
 
 
@@ -239,13 +447,13 @@ class CreateTask(graphene.Mutation):
 
     task = graphene.Field(TaskType)
 
+    @retry_on_lock
     def mutate(self, info, project_id, title, description=None, assignee_ids=None):
         user = info.context.user
         project = Project.objects.get(pk=project_id)
         
         # Check if user is owner
-        role = get_user_role(user, project)
-        if role != 'OWNER':
+        if not get_authz(info).is_owner(project.organization_id):
             raise Exception("Only owners can create tasks")
         
         task = Task(project=project, title=title, description=description or "")
@@ -257,13 +465,8 @@ class CreateTask(graphene.Mutation):
             task.assignees.set(assignees)
         
         # Log activity
-        Activity.objects.create(
-            project=project,
-            user=user,
-            action='TASK_CREATED',
-            description=f'created task "{title}"',
-            task=task
-        )
+        log_activity(project, user, 'TASK_CREATED', task)
+        bump_project_version(project)
         
         return CreateTask(task=task)
 
@@ -278,15 +481,17 @@ class UpdateTask(graphene.Mutation):
 
     task = graphene.Field(TaskType)
 
+    @retry_on_lock
     def mutate(self, info, id, assignee_ids=None, **kwargs):
         user = info.context.user
         task = Task.objects.get(pk=id)
         old_status = task.status
         
         # Check if user is owner
-        role = get_user_role(user, task.project)
-        if role != 'OWNER':
+        if get_user_role(info, task.project_id) != 'OWNER':
             raise Exception("Only owners can edit tasks")
+        if kwargs.get('status') is not None:
+            Task.check_status(kwargs['status'])
         
         # Update fields
         for key, value in kwargs.items():
@@ -298,24 +503,17 @@ class UpdateTask(graphene.Mutation):
         if assignee_ids is not None:
             assignees = User.objects.filter(id__in=assignee_ids)
             task.assignees.set(assignees)
+            get_loader(info, AssigneeLoader).clear(task.pk)
         
         # Log activity
         if 'status' in kwargs and kwargs['status'] != old_status:
-            Activity.objects.create(
-                project=task.project,
-                user=user,
-                action='TASK_MOVED',
-                description=f'moved "{task.title}" from {old_status} to {kwargs["status"]}',
-                task=task
-            )
+            log_activity(task.project, user, 'TASK_MOVED', task, {'from': old_status, 'to': kwargs['status']})
         else:
-            Activity.objects.create(
-                project=task.project,
-                user=user,
-                action='TASK_UPDATED',
-                description=f'updated task "{task.title}"',
-                task=task
-            )
+            fields = sorted(key for key, value in kwargs.items() if value is not None)
+            if assignee_ids is not None:
+                fields.append('assignees')
+            log_activity(task.project, user, 'TASK_UPDATED', task, {'fields': fields})
+        bump_project_version(task.project)
         
         return UpdateTask(task=task)
 
@@ -326,16 +524,21 @@ class DeleteTask(graphene.Mutation):
 
     success = graphene.Boolean()
 
+    @retry_on_lock
     def mutate(self, info, id):
         user = info.context.user
         task = Task.objects.get(pk=id)
         
         # Check if user is owner
-        role = get_user_role(user, task.project)
-        if role != 'OWNER':
+        if get_user_role(info, task.project_id) != 'OWNER':
             raise Exception("Only owners can delete tasks")
         
+        project, title = task.project, task.title
         task.delete()
+        
+        # Log activity
+        log_activity(project, user, 'TASK_DELETED', payload={'title': title})
+        bump_project_version(project)
         return DeleteTask(success=True)
 
 
@@ -346,6 +549,7 @@ class CreateComment(graphene.Mutation):
 
     comment = graphene.Field(TaskCommentType)
 
+    @retry_on_lock
     def mutate(self, info, task_id, content):
         user = info.context.user
         if user.is_anonymous:
@@ -354,18 +558,206 @@ class CreateComment(graphene.Mutation):
         task = Task.objects.get(pk=task_id)
         
         # Check if user can access this task
-        role = get_user_role(user, task.project)
-        if role == 'MEMBER' and user not in task.assignees.all():
+        role = get_user_role(info, task.project_id)
+        if role is None or (role == 'MEMBER' and not is_assignee(task.pk, user)):
             raise Exception("You don't have access to this task")
         
         comment = TaskComment(task=task, content=content, author=user)
         comment.save()
+        
+        # Log activity
+        log_activity(task.project, user, 'COMMENT_ADDED', task)
+        bump_project_version(task.project)
         return CreateComment(comment=comment)
 
 
+# Largest batch accepted by the bulk task mutations
+MAX_BULK_TASKS = 100
+
+
+class BulkTaskCreateInput(graphene.InputObjectType):
+    title = graphene.String(required=True)
+    description = graphene.String()
+    status = graphene.String()
+    assignee_ids = graphene.List(graphene.Int)
+
+
+class BulkTaskUpdateInput(graphene.InputObjectType):
+    id = graphene.Int(required=True)
+    title = graphene.String()
+    description = graphene.String()
+    status = graphene.String()
+    assignee_ids = graphene.List(graphene.Int)
+
+
+class BulkTaskError(graphene.ObjectType):
+    """An input item that was not applied; ``index`` is its position in the input list"""
+    index = graphene.Int()
+    id = graphene.Int()
+    message = graphene.String()
+
+
+def task_input_error(item, known_user_ids):
+    """Validation message for one bulk input item, or None"""
+    if 'title' in item and item.title is not None:
+        if not item.title.strip():
+            return "Title is required"
+        if len(item.title) > Task._meta.get_field('title').max_length:
+            return "Title is too long"
+    if item.get('status') is not None:
+        try:
+            Task.check_status(item.status)
+        except Exception as error:
+            return str(error)
+    unknown = sorted(set(item.get('assignee_ids') or ()) - known_user_ids)
+    if unknown:
+        return "Unknown assignee ids: " + ", ".join(map(str, unknown))
+    return None
+
+
+def known_users(items):
+    """Ids of existing users among all assignees of a batch, with one query"""
+    ids = {user_id for item in items for user_id in item.get('assignee_ids') or ()}
+    return set(User.objects.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+
+
+def check_batch_size(items):
+    if len(items) > MAX_BULK_TASKS:
+        raise Exception(f"At most {MAX_BULK_TASKS} tasks can be changed at once")
+
+
+class BulkCreateTasks(graphene.Mutation):
+    """Create many tasks in one project with a handful of queries"""
+    class Arguments:
+        project_id = graphene.Int(required=True)
+        tasks = graphene.List(graphene.NonNull(BulkTaskCreateInput), required=True)
+
+    tasks = graphene.List(TaskType)
+    errors = graphene.List(BulkTaskError)
+
+    @retry_on_lock
+    def mutate(self, info, project_id, tasks):
+        user = info.context.user
+        check_batch_size(tasks)
+        project = Project.objects.get(pk=project_id)
+        
+        # Check if user is owner
+        if not get_authz(info).is_owner(project.organization_id):
+            raise Exception("Only owners can create tasks")
+        
+        user_ids = known_users(tasks)
+        new_tasks, assignee_ids, errors = [], [], []
+        for index, item in enumerate(tasks):
+            message = task_input_error(item, user_ids)
+            if message:
+                errors.append(BulkTaskError(index=index, message=message))
+                continue
+            new_tasks.append(Task(
+                project=project,
+                title=item.title,
+                description=item.get('description') or "",
+                status=item.get('status') or 'TODO',
+            ))
+            assignee_ids.append(item.get('assignee_ids'))
+        
+        with transaction.atomic():
+            created = bulk.create_tasks(project, user, new_tasks, assignee_ids) if new_tasks else []
+            if created:
+                bump_project_version(project)
+        
+        return BulkCreateTasks(tasks=prime_assignees(info, created), errors=errors)
+
+
+class BulkUpdateTasks(graphene.Mutation):
+    """Edit or move many tasks at once, e.g. a multi-card move on the board"""
+    class Arguments:
+        tasks = graphene.List(graphene.NonNull(BulkTaskUpdateInput), required=True)
+
+    tasks = graphene.List(TaskType)
+    errors = graphene.List(BulkTaskError)
+
+    @retry_on_lock
+    def mutate(self, info, tasks):
+        user = info.context.user
+        check_batch_size(tasks)
+        authz = get_authz(info)
+        user_ids = known_users(tasks)
+        
+        with transaction.atomic():
+            # Lock the rows so concurrent moves cannot skew the project counters
+            stored = (
+                Task.objects.select_for_update()
+                .select_related('project')
+                .in_bulk([item.id for item in tasks])
+            )
+            changes, errors, seen = [], [], set()
+            for index, item in enumerate(tasks):
+                task = stored.get(item.id)
+                if task is None:
+                    message = "Task not found"
+                elif not authz.is_owner(task.project.organization_id):
+                    message = "Only owners can edit tasks"
+                elif item.id in seen:
+                    message = "Task appears more than once"
+                else:
+                    message = task_input_error(item, user_ids)
+                if message:
+                    errors.append(BulkTaskError(index=index, id=item.id, message=message))
+                    continue
+                seen.add(item.id)
+                fields = {
+                    name: item[name] for name in ('title', 'description', 'status')
+                    if item.get(name) is not None
+                }
+                changes.append((task, fields, item.get('assignee_ids')))
+            
+            updated = bulk.update_tasks(user, changes) if changes else []
+            for project in {task.project_id: task.project for task, _, _ in changes}.values():
+                bump_project_version(project)
+        
+        loader = get_loader(info, AssigneeLoader)
+        for task, _, assignee_ids in changes:
+            if assignee_ids is not None:
+                loader.clear(task.pk)
+        return BulkUpdateTasks(tasks=prime_assignees(info, updated), errors=errors)
+
+
 class Mutation(graphene.ObjectType):
     create_project = CreateProject.Field()
     create_task = CreateTask.Field()
     create_comment = CreateComment.Field()
     update_task = UpdateTask.Field()
     delete_task = DeleteTask.Field()
+    bulk_create_tasks = BulkCreateTasks.Field()
+    bulk_update_tasks = BulkUpdateTasks.Field()
+
+
+class Subscription(graphene.ObjectType):
+    # Pushes each new activity on a project as it is committed
+    project_activity = graphene.Field(ActivityType, project_id=graphene.Int(required=True))
+
+    async def subscribe_project_activity(root, info, project_id):
+        user = info.context.user
+        if user.is_anonymous:
+            raise Exception("Not authenticated")
+        
+        role = await database_sync_to_async(get_user_role)(info, project_id)
+        if role is None:
+            raise Exception("You don't have access to this project")
+        
+        # Subscribe before returning so no event between now and the first read is lost
+        events = await get_broker().subscribe(activity_channel(project_id))
+        return activity_stream(info, project_id, events)
+
+
+async def activity_stream(info, project_id, events):
+    """Turn broker messages (activity ids) into planned Activity instances"""
+    queryset = optimize(Activity.objects.filter(project_id=project_id), info)
+    load = database_sync_to_async(lambda pk: queryset.filter(pk=pk).first())
+    try:
+        async for activity_id in events:
+            activity = await load(activity_id)
+            if activity is not None:
+                yield activity
+    finally:
+        await events.close()
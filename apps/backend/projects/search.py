@@ -0,0 +1,200 @@
+"""
+Full-text search over tasks.
+
+Each task has one row in the ``projects_task_search`` table holding its title,
+description and the text of its comments. On SQLite this is an FTS5 virtual
+table; on PostgreSQL a weighted ``tsvector`` with a GIN index. Search text is
+split into words and every word is matched as a prefix, so ``"log cra"`` finds
+"Login crashes". Results are ranked with title matches above description
+matches above comment matches.
+
+The table is created by the ``0007_task_search_index`` migration and kept in
+step by the signal handlers in ``projects.signals``. Writes that skip model
+signals (``QuerySet.update()``, ``bulk_create()``) must call ``index_tasks()``
+themselves; ``python manage.py rebuild_search_index`` rebuilds everything from
+the task tables.
+"""
+import re
+
+from django.db import connections, router, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Task, TaskComment
+
+SEARCH_TABLE = 'projects_task_search'
+
+# Best matches considered for one search
+MAX_SEARCH_RESULTS = 1000
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Lower-cased words of ``text``; punctuation and query syntax are dropped"""
+    return _WORD_RE.findall((text or '').lower())
+
+
+class SQLiteSearchBackend:
+    """FTS5 virtual table keyed by task id (the rowid)"""
+
+    # bm25() column weights: title, description, comments
+    weights = (10.0, 3.0, 1.0)
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    def remove(self, cursor, task_ids):
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(pk,) for pk in task_ids])
+
+    def store(self, cursor, documents):
+        self.remove(cursor, [document[0] for document in documents])
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, project_id, title, description, comments) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            documents,
+        )
+
+    def match(self, cursor, project_id, words, limit):
+        query = ' '.join('"%s"*' % word for word in words)
+        rank = 'bm25(%s, %s)' % (SEARCH_TABLE, ', '.join(str(weight) for weight in self.weights))
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND project_id = %s ORDER BY {rank} LIMIT %s",
+            [query, project_id, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgreSQLSearchBackend:
+    """Weighted tsvector per task with a GIN index"""
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+
+    def remove(self, cursor, task_ids):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE task_id = ANY(%s)", [list(task_ids)])
+
+    def store(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (task_id, project_id, document) VALUES (%s, %s, "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C')) "
+            "ON CONFLICT (task_id) DO UPDATE SET project_id = EXCLUDED.project_id, document = EXCLUDED.document",
+            documents,
+        )
+
+    def match(self, cursor, project_id, words, limit):
+        query = ' & '.join('%s:*' % word for word in words)
+        cursor.execute(
+            f"SELECT task_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+            "WHERE project_id = %s AND document @@ query "
+            "ORDER BY ts_rank(document, query) DESC, task_id LIMIT %s",
+            [query, project_id, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    """The index backend for a connection (the primary's by default), or None where only substring search is available"""
+    backend_class = BACKENDS.get((using or connections[router.db_for_write(Task)]).vendor)
+    return backend_class() if backend_class else None
+
+
+def build_documents(task_ids, task_model=Task, comment_model=TaskComment, using=None):
+    """``(task_id, project_id, title, description, comments)`` rows for the index"""
+    comments = {}
+    for task_id, content in comment_model.objects.using(using).filter(task_id__in=task_ids).order_by('id').values_list('task_id', 'content'):
+        comments.setdefault(task_id, []).append(content)
+    return [
+        (pk, project_id, title, description, '\n'.join(comments.get(pk, [])))
+        for pk, project_id, title, description in (
+            task_model.objects.using(using).filter(pk__in=task_ids).values_list('pk', 'project_id', 'title', 'description')
+        )
+    ]
+
+
+def index_tasks(task_ids):
+    """Write the current title, description and comments of the tasks to the index"""
+    db = router.db_for_write(Task)
+    backend = get_search_backend(connections[db])
+    task_ids = list(task_ids)
+    if backend is None or not task_ids:
+        return
+    documents = build_documents(task_ids, using=db)
+    with connections[db].cursor() as cursor:
+        found = {document[0] for document in documents}
+        backend.remove(cursor, [pk for pk in task_ids if pk not in found])
+        if documents:
+            backend.store(cursor, documents)
+
+
+def unindex_tasks(task_ids):
+    db = router.db_for_write(Task)
+    backend = get_search_backend(connections[db])
+    if backend is not None:
+        with connections[db].cursor() as cursor:
+            backend.remove(cursor, list(task_ids))
+
+
+def rebuild_search_index(project_ids=None, batch_size=500):
+    """Re-index every task (or the tasks of some projects); returns the number indexed"""
+    db = router.db_for_write(Task)
+    backend = get_search_backend(connections[db])
+    if backend is None:
+        return 0
+    tasks = Task.objects.using(db).order_by('pk')
+    if project_ids:
+        tasks = tasks.filter(project_id__in=project_ids)
+
+    with transaction.atomic(using=db):
+        with connections[db].cursor() as cursor:
+            if project_ids:
+                cursor.execute(
+                    f"DELETE FROM {SEARCH_TABLE} WHERE project_id IN (%s)" % ', '.join(['%s'] * len(project_ids)),
+                    list(project_ids),
+                )
+            else:
+                backend.clear(cursor)
+
+        task_ids = list(tasks.values_list('pk', flat=True))
+        for start in range(0, len(task_ids), batch_size):
+            index_tasks(task_ids[start:start + batch_size])
+    return len(task_ids)
+
+
+def search_tasks(queryset, project_id, text):
+    """
+    Narrow a project's task queryset to tasks matching ``text``, best match first.
+
+    Falls back to substring matching on databases without a search index.
+    """
+    words = tokenize(text)
+    if not words:
+        return queryset.none()
+
+    # The index table is replicated with the task rows, so it is read where the tasks are
+    read_connection = connections[router.db_for_read(Task)]
+    backend = get_search_backend(read_connection)
+    if backend is None:
+        for word in words:
+            queryset = queryset.filter(
+                Q(title__icontains=word) | Q(description__icontains=word) | Q(comments__content__icontains=word)
+            )
+        return queryset
+
+    with read_connection.cursor() as cursor:
+        task_ids = backend.match(cursor, project_id, words, MAX_SEARCH_RESULTS)
+    if not task_ids:
+        return queryset.none()
+    rank = Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(task_ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=task_ids).annotate(search_rank=rank).order_by('search_rank')
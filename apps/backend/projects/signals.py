@@ -0,0 +1,42 @@
+"""
+Keep the task search index in step with task and comment writes.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Task, TaskComment
+from .search import index_tasks, unindex_tasks
+
+SEARCHED_FIELDS = {'title', 'description', 'project', 'project_id'}
+
+
+def _searched_values(task):
+    # Read from __dict__ so deferred fields are not loaded just to compare them
+    return tuple(task.__dict__.get(field) for field in ('title', 'description', 'project_id'))
+
+
+@receiver(post_init, sender=Task)
+def task_loaded(sender, instance, **kwargs):
+    instance._searched_values = _searched_values(instance)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Re-index only when the title, description or project actually changed"""
+    if update_fields is not None and not SEARCHED_FIELDS & set(update_fields):
+        return
+    values = _searched_values(instance)
+    if created or values != instance._searched_values:
+        index_tasks([instance.pk])
+    instance._searched_values = values
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    unindex_tasks([instance.pk])
+
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def comment_changed(sender, instance, **kwargs):
+    index_tasks([instance.task_id])
@@ -2,12 +2,31 @@
 Comprehensive tests for the project management GraphQL API.
 Tests cover authentication, authorization, CRUD operations, and data isolation.
 """
-from django.test import TestCase, RequestFactory
+import asyncio
+import os
+import tempfile
+import time
+import unittest.mock
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import OperationalError, connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from graphene.test import Client
+from api.db import is_lock_error
 from api.schema import schema
 from organizations.models import Organization, OrganizationMember
-from projects.models import Project, Task, TaskComment
+from projects.models import Project, Task, TaskComment, Activity
+from projects import activity, bulk
+from projects.activity import BufferedActivityWriter, describe_activity
+from projects.archive import archive_cutoffs
+from projects.search import SEARCH_TABLE, search_tasks
 
 User = get_user_model()
 
@@ -189,6 +208,74 @@ class TaskAssignmentTests(TestCase):
         self.assertIsNotNone(result.get('errors'))
 
 
+class AssigneeBatchingTests(TestCase):
+    """Tests for batched assignee loading"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.member = User.objects.create_user('member@test.com', 'member@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        OrganizationMember.objects.create(user=self.member, organization=self.org, role='MEMBER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.client = Client(schema)
+    
+    def add_tasks(self, count):
+        for i in range(count):
+            task = Task.objects.create(title=f'Task {i}', project=self.project)
+            task.assignees.add(self.owner, self.member)
+    
+    def count_queries(self, query):
+        # Warm the role cache so only the cost of the response itself is counted
+        self.client.execute(query, context=MockContext(self.owner))
+        with CaptureQueriesContext(connection) as captured:
+            result = self.client.execute(query, context=MockContext(self.owner))
+        self.assertIsNone(result.get('errors'))
+        return len(captured), result
+    
+    def test_project_tasks_assignees_query_count_is_constant(self):
+        """Loading assignees for a whole board should not cost a query per task"""
+        query = '''
+            query {
+                project(id: %d) {
+                    tasks {
+                        title
+                        assignees { email }
+                    }
+                }
+            }
+        ''' % self.project.id
+        self.add_tasks(2)
+        few, _ = self.count_queries(query)
+        self.add_tasks(8)
+        many, result = self.count_queries(query)
+        
+        self.assertEqual(few, many)
+        tasks = result['data']['project']['tasks']
+        self.assertEqual(len(tasks), 10)
+        self.assertEqual(
+            [a['email'] for a in tasks[0]['assignees']],
+            ['owner@test.com', 'member@test.com'],
+        )
+    
+    def test_filtered_tasks_assignees_query_count_is_constant(self):
+        """filteredTasks should batch assignees the same way"""
+        query = '''
+            query {
+                filteredTasks(projectId: %d) {
+                    assignees { email }
+                }
+            }
+        ''' % self.project.id
+        self.add_tasks(2)
+        few, _ = self.count_queries(query)
+        self.add_tasks(8)
+        many, _ = self.count_queries(query)
+        
+        self.assertEqual(few, many)
+
+
 class FilteringTests(TestCase):
     """Tests for complex filtering functionality"""
     
@@ -235,3 +322,978 @@ class FilteringTests(TestCase):
         
         self.assertEqual(len(result['data']['filteredTasks']), 1)
         self.assertEqual(result['data']['filteredTasks'][0]['title'], 'In Progress')
+
+
+class ProjectStatsTests(TestCase):
+    """Tests for the denormalized project statistics"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        for i in range(3):
+            project = Project.objects.create(name=f'Project {i}', organization=self.org)
+            Task.objects.create(title='Todo', project=project, status='TODO')
+            Task.objects.create(title='Done', project=project, status='DONE')
+            for _ in range(i):
+                Task.objects.create(title='In Progress', project=project, status='IN_PROGRESS')
+        
+        self.client = Client(schema)
+    
+    def test_all_project_stats_need_no_extra_queries(self):
+        """All five stats fields should be read from the project row itself"""
+        query = '''
+            query {
+                allProjects {
+                    name
+                    taskCount
+                    completedCount
+                    inProgressCount
+                    todoCount
+                    completionRate
+                }
+            }
+        '''
+        with self.assertNumQueries(1):
+            result = self.client.execute(query, context=MockContext(self.owner))
+        
+        self.assertIsNone(result.get('errors'))
+        projects = {p['name']: p for p in result['data']['allProjects']}
+        self.assertEqual(projects['Project 2']['taskCount'], 4)
+        self.assertEqual(projects['Project 2']['inProgressCount'], 2)
+        self.assertEqual(projects['Project 2']['todoCount'], 1)
+        self.assertEqual(projects['Project 2']['completedCount'], 1)
+        self.assertEqual(projects['Project 2']['completionRate'], 25.0)
+        self.assertEqual(projects['Project 0']['completionRate'], 50.0)
+    
+    def test_counters_follow_task_mutations(self):
+        """Create, move and delete should keep the counters in step"""
+        project = Project.objects.get(name='Project 0')
+        context = MockContext(self.owner)
+        
+        result = self.client.execute(
+            'mutation { createTask(projectId: %d, title: "New") { task { id } } }' % project.id,
+            context=context,
+        )
+        task_id = int(result['data']['createTask']['task']['id'])
+        project.refresh_from_db()
+        self.assertEqual((project.todo_count, project.in_progress_count, project.completed_count), (2, 0, 1))
+        
+        self.client.execute(
+            'mutation { updateTask(id: %d, status: "IN_PROGRESS") { task { id } } }' % task_id,
+            context=context,
+        )
+        project.refresh_from_db()
+        self.assertEqual((project.todo_count, project.in_progress_count, project.completed_count), (1, 1, 1))
+        
+        self.client.execute('mutation { deleteTask(id: %d) { success } }' % task_id, context=context)
+        project.refresh_from_db()
+        self.assertEqual((project.todo_count, project.in_progress_count, project.completed_count), (1, 0, 1))
+    
+    def test_invalid_status_leaves_counters_unchanged(self):
+        """A status outside the choices should be a field error, not a counter KeyError"""
+        project = Project.objects.get(name='Project 0')
+        task = project.tasks.get(status='TODO')
+        
+        result = self.client.execute(
+            'mutation { updateTask(id: %d, status: "ARCHIVED") { task { id } } }' % task.id,
+            context=MockContext(self.owner),
+        )
+        self.assertEqual(result['errors'][0]['message'], 'Invalid status ARCHIVED')
+        self.assertEqual(result['errors'][0]['path'], ['updateTask'])
+        task.refresh_from_db()
+        project.refresh_from_db()
+        self.assertEqual(task.status, 'TODO')
+        self.assertEqual((project.todo_count, project.in_progress_count, project.completed_count), (1, 0, 1))
+        
+        with self.assertRaisesMessage(Exception, 'Invalid status ARCHIVED'):
+            bulk.update_tasks(self.owner, [(task, {'status': 'ARCHIVED'}, None)])
+        project.refresh_from_db()
+        self.assertEqual((project.todo_count, project.in_progress_count, project.completed_count), (1, 0, 1))
+    
+    def test_saves_that_keep_status_and_project_skip_the_row_lock(self):
+        """Only a save that can move a counter should re-read (and lock) the stored row"""
+        project = Project.objects.get(name='Project 0')
+        task = project.tasks.get(status='TODO')
+        
+        task.due_date = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['UPDATE'])
+        
+        task.status = 'DONE'
+        task.save()
+        task.status = 'IN_PROGRESS'
+        task.save()
+        project.refresh_from_db()
+        self.assertEqual((project.todo_count, project.in_progress_count, project.completed_count), (0, 1, 1))
+    
+    def test_rebuild_command_finds_and_fixes_drift(self):
+        """rebuild_task_counters --check should fail on drift and the rebuild should fix it"""
+        project = Project.objects.get(name='Project 1')
+        Project.objects.filter(pk=project.pk).update(todo_count=7)
+        
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_counters', '--check', stdout=StringIO())
+        
+        call_command('rebuild_task_counters', stdout=StringIO())
+        project.refresh_from_db()
+        self.assertEqual(project.todo_count, 1)
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+
+class QueryOptimizerTests(TestCase):
+    """Tests for selection-set driven query planning"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass', first_name='Olive')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org, description='Long text')
+        for i in range(3):
+            task = Task.objects.create(title=f'Task {i}', project=self.project, description='Long text')
+            TaskComment.objects.create(task=task, content='Comment', author=self.owner)
+        
+        self.client = Client(schema)
+    
+    def execute(self, query):
+        # Warm the role cache so only the cost of the response itself is counted
+        self.client.execute(query, context=MockContext(self.owner))
+        with CaptureQueriesContext(connection) as captured:
+            result = self.client.execute(query, context=MockContext(self.owner))
+        self.assertIsNone(result.get('errors'))
+        return result, [q['sql'] for q in captured.captured_queries]
+    
+    def test_description_only_loaded_when_selected(self):
+        """Wide description columns should stay out of the SELECT unless asked for"""
+        _, queries = self.execute('{ allProjects { id name taskCount } }')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('description', queries[0])
+        
+        result, queries = self.execute('{ allProjects { name description } }')
+        self.assertIn('description', queries[0])
+        self.assertEqual(result['data']['allProjects'][0]['description'], 'Long text')
+    
+    def test_nested_relations_are_prefetched(self):
+        """Comments and their authors should load with one query, however many tasks there are"""
+        query = '''
+            query {
+                project(id: %d) {
+                    tasks {
+                        ...TaskFields
+                    }
+                }
+            }
+            fragment TaskFields on TaskType {
+                title
+                comments { content author { email } }
+            }
+        ''' % self.project.id
+        _, few = self.execute(query)
+        for i in range(5):
+            task = Task.objects.create(title=f'More {i}', project=self.project)
+            TaskComment.objects.create(task=task, content='Comment', author=self.owner)
+        result, many = self.execute(query)
+        
+        self.assertEqual(len(few), len(many))
+        tasks = result['data']['project']['tasks']
+        self.assertEqual(len(tasks), 8)
+        self.assertEqual(tasks[0]['comments'][0]['author']['email'], 'owner@test.com')
+    
+    def test_activity_user_name_is_joined(self):
+        """userName should come from a joined user row, not one query per activity"""
+        for i in range(3):
+            Activity.objects.create(project=self.project, user=self.owner, action='TASK_CREATED', payload={'title': 'Card'})
+        result, queries = self.execute('{ projectActivity(projectId: %d) { userName } }' % self.project.id)
+        
+        self.assertEqual([a['userName'] for a in result['data']['projectActivity']], ['Olive'] * 3)
+        self.assertEqual(sum('projects_activity' in sql for sql in queries), 1)
+        self.assertEqual(sum('core_user' in sql for sql in queries), 1)
+
+
+class ActivitySubscriptionTests(TestCase):
+    """Tests for the projectActivity subscription"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.outsider = User.objects.create_user('outsider@test.com', 'outsider@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.client = Client(schema)
+    
+    def run_mutation(self, mutation):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.client.execute(mutation, context=MockContext(self.owner))
+        self.assertIsNone(result.get('errors'))
+    
+    async def test_mutations_are_pushed_to_subscribers(self):
+        """Creating a task should push its activity to subscribers"""
+        stream = await schema.subscribe(
+            'subscription { projectActivity(projectId: %d) { action description userName } }' % self.project.id,
+            context_value=MockContext(self.owner),
+        )
+        await sync_to_async(self.run_mutation)(
+            'mutation { createTask(projectId: %d, title: "Live") { task { id } } }' % self.project.id
+        )
+        
+        created = await asyncio.wait_for(stream.__anext__(), timeout=5)
+        self.assertIsNone(created.errors)
+        self.assertEqual(created.data['projectActivity']['action'], 'TASK_CREATED')
+        self.assertEqual(created.data['projectActivity']['userName'], 'owner@test.com')
+        await stream.aclose()
+    
+    async def test_outsider_cannot_subscribe(self):
+        """Users outside the project's organization should get an error"""
+        result = await schema.subscribe(
+            'subscription { projectActivity(projectId: %d) { id } }' % self.project.id,
+            context_value=MockContext(self.outsider),
+        )
+        self.assertIn("You don't have access to this project", str(result.errors))
+
+
+class ActivityDeltaTests(TestCase):
+    """Tests for cursor-based activity polling"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.outsider = User.objects.create_user('outsider@test.com', 'outsider@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.activities = [
+            Activity.objects.create(project=self.project, user=self.owner, action='TASK_CREATED', payload={'title': f'Card {i}'})
+            for i in range(3)
+        ]
+        self.client = Client(schema)
+    
+    def poll(self, after_id, limit=50, user=None):
+        query = '''
+            query {
+                projectActivityDelta(projectId: %d, afterId: %d, limit: %d) {
+                    cursor
+                    hasMore
+                    activities { id description }
+                }
+            }
+        ''' % (self.project.id, after_id, limit)
+        result = self.client.execute(query, context=MockContext(user or self.owner))
+        self.assertIsNone(result.get('errors'))
+        return result['data']['projectActivityDelta']
+    
+    def test_returns_only_newer_rows_and_advances_cursor(self):
+        """Only activities after the cursor should come back, oldest first"""
+        delta = self.poll(self.activities[0].id)
+        self.assertEqual([a['description'] for a in delta['activities']], ['created task "Card 1"', 'created task "Card 2"'])
+        self.assertEqual(delta['cursor'], self.activities[2].id)
+        self.assertFalse(delta['hasMore'])
+    
+    def test_limit_pages_forward(self):
+        """A limited poll should report more rows and not skip any"""
+        delta = self.poll(0, limit=2)
+        self.assertTrue(delta['hasMore'])
+        self.assertEqual(delta['cursor'], self.activities[1].id)
+        
+        delta = self.poll(delta['cursor'], limit=2)
+        self.assertEqual([a['description'] for a in delta['activities']], ['created task "Card 2"'])
+    
+    def test_nothing_changed_is_cheap(self):
+        """An up-to-date poll should cost one range probe once the roles are cached"""
+        self.poll(self.activities[2].id)
+        with self.assertNumQueries(1):
+            delta = self.poll(self.activities[2].id)
+        self.assertEqual(delta, {'cursor': self.activities[2].id, 'hasMore': False, 'activities': []})
+    
+    def test_outsider_gets_nothing(self):
+        """Users outside the organization should get no delta"""
+        query = '{ projectActivityDelta(projectId: %d) { cursor } }' % self.project.id
+        result = self.client.execute(query, context=MockContext(self.outsider))
+        self.assertIsNone(result['data']['projectActivityDelta'])
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests for cursor-paginated connection fields"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        for i in range(5):
+            Task.objects.create(title=f'Task {i}', project=self.project)
+            Activity.objects.create(project=self.project, user=self.owner, action='TASK_CREATED', payload={'title': f'Card {i}'})
+        # Identical timestamps must still page deterministically by id
+        Task.objects.filter(title__in=['Task 1', 'Task 2', 'Task 3']).update(
+            created_at=Task.objects.get(title='Task 1').created_at
+        )
+        activities = Activity.objects.filter(project=self.project).order_by('id')
+        Activity.objects.filter(pk__in=[activity.pk for activity in activities[1:4]]).update(
+            created_at=activities[1].created_at
+        )
+        
+        self.client = Client(schema)
+    
+    def fetch_all(self, field, args, node_field):
+        seen, after, pages = [], None, 0
+        while True:
+            cursor_arg = ', after: "%s"' % after if after else ''
+            query = '{ %s(%s, first: 2%s) { edges { cursor node { %s } } pageInfo { hasNextPage endCursor } } }' % (
+                field, args, cursor_arg, node_field
+            )
+            result = self.client.execute(query, context=MockContext(self.owner))
+            self.assertIsNone(result.get('errors'))
+            connection = result['data'][field]
+            seen += [edge['node'][node_field] for edge in connection['edges']]
+            pages += 1
+            if not connection['pageInfo']['hasNextPage']:
+                return seen, pages
+            after = connection['pageInfo']['endCursor']
+    
+    def test_tasks_page_in_creation_order(self):
+        """Every task should appear exactly once across pages, oldest first"""
+        titles, pages = self.fetch_all('filteredTasksConnection', 'projectId: %d' % self.project.id, 'title')
+        self.assertEqual(titles, [f'Task {i}' for i in range(5)])
+        self.assertEqual(pages, 3)
+    
+    def test_activity_pages_newest_first(self):
+        """The activity connection should page from the newest activity"""
+        descriptions, _ = self.fetch_all('projectActivityConnection', 'projectId: %d' % self.project.id, 'description')
+        self.assertEqual(descriptions, [f'created task "Card {i}"' for i in reversed(range(5))])
+    
+    def test_invalid_cursor_is_rejected(self):
+        """A malformed cursor should produce an error, not a full scan"""
+        query = '{ allProjectsConnection(after: "garbage") { edges { node { id } } } }'
+        result = self.client.execute(query, context=MockContext(self.owner))
+        self.assertIn('Invalid cursor', str(result['errors']))
+
+
+class AuthorizationContextTests(TestCase):
+    """Tests for the request-scoped membership lookups"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.outsider = User.objects.create_user('outsider@test.com', 'outsider@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.task = Task.objects.create(title='Task', project=self.project, status='TODO')
+        
+        self.client = Client(schema)
+    
+    def test_membership_is_checked_once_per_request(self):
+        """Several fields on the same project should share one membership probe"""
+        query = '''
+            query {
+                todo: filteredTasks(projectId: %d, status: "TODO") { id }
+                done: filteredTasks(projectId: %d, status: "DONE") { id }
+                projectActivity(projectId: %d) { id }
+                projectActivityDelta(projectId: %d) { cursor }
+            }
+        ''' % ((self.project.id,) * 4)
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.execute(query, context=MockContext(self.owner))
+        self.assertIsNone(result.get('errors'))
+        membership_queries = [q for q in queries if 'organizations_organizationmember' in q['sql']]
+        self.assertEqual(len(membership_queries), 1)
+    
+    def test_outsider_cannot_comment(self):
+        """Users outside the organization should not be able to comment"""
+        mutation = '''
+            mutation {
+                createComment(taskId: %d, content: "Hello") { comment { id } }
+            }
+        ''' % self.task.id
+        result = self.client.execute(mutation, context=MockContext(self.outsider))
+        self.assertIn("You don't have access to this task", str(result['errors']))
+        self.assertFalse(TaskComment.objects.exists())
+
+
+class TaskSearchTests(TestCase):
+    """Tests for the full-text task search"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.other_project = Project.objects.create(name='Other Project', organization=self.org)
+        self.login = Task.objects.create(title='Login crashes', project=self.project, description='Seen on Safari')
+        self.docs = Task.objects.create(title='Write docs', project=self.project, description='Explain the login flow')
+        self.deploy = Task.objects.create(title='Deploy', project=self.project)
+        TaskComment.objects.create(task=self.deploy, content='Blocked by the Safari fix', author=self.owner)
+        Task.objects.create(title='Login page', project=self.other_project)
+        
+        self.client = Client(schema)
+    
+    def search(self, text):
+        query = '{ filteredTasks(projectId: %d, search: "%s") { title } }' % (self.project.id, text)
+        result = self.client.execute(query, context=MockContext(self.owner))
+        self.assertIsNone(result.get('errors'))
+        return [task['title'] for task in result['data']['filteredTasks']]
+    
+    def test_prefix_words_match_title_description_and_comments(self):
+        """Every word should match as a prefix of any indexed text"""
+        self.assertEqual(self.search('log cra'), ['Login crashes'])
+        self.assertEqual(self.search('safar'), ['Login crashes', 'Deploy'])
+    
+    def test_title_matches_rank_first(self):
+        """A title match should outrank a description match"""
+        self.assertEqual(self.search('login'), ['Login crashes', 'Write docs'])
+    
+    def test_query_syntax_is_not_interpreted(self):
+        """Operators and quotes in the search text should be treated as plain words"""
+        self.assertEqual(self.search('login AND \\"'), [])
+        self.assertEqual(self.search('***'), [])
+    
+    def test_index_follows_writes(self):
+        """Edits, new comments and deletes should be searchable at once"""
+        self.docs.title = 'Write handbook'
+        self.docs.save()
+        self.assertEqual(self.search('handbook'), ['Write handbook'])
+        
+        TaskComment.objects.create(task=self.deploy, content='Needs a handbook entry', author=self.owner)
+        self.assertEqual(self.search('handbook'), ['Write handbook', 'Deploy'])
+        
+        self.docs.delete()
+        self.assertEqual(self.search('handbook'), ['Deploy'])
+
+    def test_saves_without_text_changes_skip_the_index(self):
+        """Saving a task whose searched text did not change should not touch the index"""
+        task = Task.objects.get(pk=self.login.pk)
+        task.status = 'DONE'
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        self.assertFalse([query for query in queries if 'projects_task_search' in query['sql']])
+
+        task.description = 'Seen on Firefox'
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        self.assertTrue([query for query in queries if 'projects_task_search' in query['sql']])
+        self.assertEqual(self.search('firefox'), ['Login crashes'])
+
+    def test_rebuild_command_restores_index(self):
+        """rebuild_search_index should pick up rows written without signals"""
+        Task.objects.filter(pk=self.deploy.pk).update(title='Release')
+        self.assertEqual(self.search('release'), [])
+        
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 4 task(s)', out.getvalue())
+        self.assertEqual(self.search('release'), ['Release'])
+
+
+class SearchIndexFlushTests(TransactionTestCase):
+    """Tests for emptying the search index with the tables"""
+    
+    def test_flush_empties_the_index(self):
+        """manage.py flush (and so every TransactionTestCase) should not leave index rows behind"""
+        org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        project = Project.objects.create(name='Test Project', organization=org)
+        Task.objects.create(title='Indexed', project=project)
+        
+        call_command('flush', interactive=False, verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class BulkTaskMutationTests(TestCase):
+    """Tests for bulkCreateTasks and bulkUpdateTasks"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.member = User.objects.create_user('member@test.com', 'member@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        OrganizationMember.objects.create(user=self.member, organization=self.org, role='MEMBER')
+        
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.client = Client(schema)
+    
+    def bulk_create(self, tasks, user=None):
+        mutation = '''
+            mutation ($projectId: Int!, $tasks: [BulkTaskCreateInput!]!) {
+                bulkCreateTasks(projectId: $projectId, tasks: $tasks) {
+                    tasks { id title status assignees { email } }
+                    errors { index message }
+                }
+            }
+        '''
+        return self.client.execute(
+            mutation,
+            variables={'projectId': self.project.id, 'tasks': tasks},
+            context=MockContext(user or self.owner),
+        )
+    
+    def bulk_update(self, tasks, user=None):
+        mutation = '''
+            mutation ($tasks: [BulkTaskUpdateInput!]!) {
+                bulkUpdateTasks(tasks: $tasks) {
+                    tasks { id title status }
+                    errors { index id message }
+                }
+            }
+        '''
+        return self.client.execute(mutation, variables={'tasks': tasks}, context=MockContext(user or self.owner))
+    
+    def seed(self, count):
+        tasks = [{'title': f'Task {i}', 'assigneeIds': [self.member.id]} for i in range(count)]
+        with CaptureQueriesContext(connection) as queries:
+            result = self.bulk_create(tasks)
+        self.assertIsNone(result.get('errors'))
+        return result['data']['bulkCreateTasks'], len(queries)
+    
+    def test_bulk_create_query_count_does_not_grow(self):
+        """Seeding 50 tasks should cost the same few queries as seeding 5"""
+        self.seed(5)
+        data, queries = self.seed(50)
+        _, few_queries = self.seed(5)
+        
+        self.assertEqual(queries, few_queries)
+        self.assertLessEqual(queries, 15)
+        self.assertEqual(len(data['tasks']), 50)
+        self.assertEqual(data['tasks'][0]['assignees'], [{'email': 'member@test.com'}])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.todo_count, 60)
+        self.assertEqual(Activity.objects.filter(action='TASK_CREATED').count(), 60)
+    
+    def test_bulk_create_reports_invalid_items(self):
+        """Bad items should be reported by position while the rest are created"""
+        result = self.bulk_create([
+            {'title': 'Good'},
+            {'title': '  '},
+            {'title': 'Bad status', 'status': 'LATER'},
+            {'title': 'Bad assignee', 'assigneeIds': [self.member.id, 9999]},
+            {'title': 'Also good', 'status': 'DONE'},
+        ])
+        data = result['data']['bulkCreateTasks']
+        self.assertEqual([task['title'] for task in data['tasks']], ['Good', 'Also good'])
+        self.assertEqual(data['errors'], [
+            {'index': 1, 'message': 'Title is required'},
+            {'index': 2, 'message': 'Invalid status LATER'},
+            {'index': 3, 'message': 'Unknown assignee ids: 9999'},
+        ])
+    
+    def test_members_cannot_bulk_create(self):
+        result = self.bulk_create([{'title': 'Sneaky'}], user=self.member)
+        self.assertIn('Only owners can create tasks', str(result['errors']))
+        self.assertFalse(Task.objects.exists())
+    
+    def test_bulk_move_updates_counters_and_activity(self):
+        """Moving many cards should keep counters, search and the feed in step"""
+        data, _ = self.seed(20)
+        moves = [{'id': int(task['id']), 'status': 'DONE'} for task in data['tasks'][:12]]
+        moves.append({'id': int(data['tasks'][12]['id']), 'title': 'Renamed card'})
+        
+        with CaptureQueriesContext(connection) as queries:
+            result = self.bulk_update(moves)
+        self.assertIsNone(result.get('errors'))
+        self.assertEqual(result['data']['bulkUpdateTasks']['errors'], [])
+        self.assertLessEqual(len(queries), 15)
+        
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.todo_count, self.project.completed_count), (8, 12))
+        self.assertEqual(Activity.objects.filter(action='TASK_MOVED').count(), 12)
+        renamed_activity = Activity.objects.get(action='TASK_UPDATED')
+        self.assertEqual(renamed_activity.payload, {'fields': ['title']})
+        self.assertEqual(describe_activity(renamed_activity), 'updated task "Renamed card"')
+        renamed = search_tasks(Task.objects.all(), self.project.id, 'renamed')
+        self.assertEqual(list(renamed.values_list('title', flat=True)), ['Renamed card'])
+    
+    def test_bulk_update_reports_invalid_items(self):
+        """Missing, duplicated and forbidden tasks should be reported per item"""
+        data, _ = self.seed(2)
+        first, second = (int(task['id']) for task in data['tasks'])
+        other_org = Organization.objects.create(name='Other', slug='other', contact_email='other@test.com')
+        foreign = Task.objects.create(title='Foreign', project=Project.objects.create(name='P', organization=other_org))
+        
+        result = self.bulk_update([
+            {'id': first, 'status': 'IN_PROGRESS'},
+            {'id': 9999, 'status': 'DONE'},
+            {'id': first, 'status': 'DONE'},
+            {'id': foreign.id, 'status': 'DONE'},
+            {'id': second, 'assigneeIds': []},
+        ])
+        data = result['data']['bulkUpdateTasks']
+        self.assertEqual([task['id'] for task in data['tasks']], [str(first), str(second)])
+        self.assertEqual([(error['index'], error['message']) for error in data['errors']], [
+            (1, 'Task not found'),
+            (2, 'Task appears more than once'),
+            (3, 'Only owners can edit tasks'),
+        ])
+        self.assertEqual(Task.objects.get(pk=first).status, 'IN_PROGRESS')
+        self.assertEqual(Task.objects.get(pk=foreign.pk).status, 'TODO')
+        self.assertFalse(Task.objects.get(pk=second).assignees.exists())
+
+
+class BufferedActivityWriterTests(TestCase):
+    """Tests for batched activity inserts and the crash spool"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.task = Task.objects.create(title='Task', project=self.project)
+        
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.spool_dir = spool_dir.name
+    
+    def entry(self, title, task=None):
+        return {
+            'project_id': self.project.id, 'user_id': self.owner.id, 'action': 'TASK_UPDATED',
+            'task_id': task.id if task else None, 'payload': {'title': title},
+        }
+    
+    def spooled_lines(self, writer):
+        with open(writer.spool_path) as spool:
+            return spool.readlines()
+    
+    def test_writes_are_inserted_in_one_batch_on_flush(self):
+        """Buffered entries should be inserted together and cleared from the spool"""
+        writer = BufferedActivityWriter(spool_dir=self.spool_dir)
+        writer.write([self.entry('first', self.task)])
+        writer.write([self.entry('second')])
+        self.assertEqual(Activity.objects.count(), 0)
+        self.assertEqual(len(self.spooled_lines(writer)), 2)
+        
+        with self.assertNumQueries(4):
+            inserted = writer.flush()
+        self.assertEqual([a.payload['title'] for a in inserted], ['first', 'second'])
+        self.assertEqual(Activity.objects.get(payload__title='first').task_id, self.task.id)
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(self.spooled_lines(writer), [])
+    
+    def test_deleted_rows_are_handled_like_foreign_keys(self):
+        """Entries of deleted projects are dropped and deleted tasks are cleared"""
+        writer = BufferedActivityWriter()
+        other = Project.objects.create(name='Other', organization=self.org)
+        gone = {'project_id': other.id, 'user_id': self.owner.id, 'action': 'TASK_CREATED',
+                'task_id': None, 'payload': {'title': 'gone'}}
+        writer.write([self.entry('kept', self.task), gone])
+        self.task.delete()
+        other.delete()
+        
+        writer.flush()
+        self.assertEqual(list(Activity.objects.values_list('payload__title', 'task_id')), [('kept', None)])
+    
+    def test_spool_left_by_a_crash_is_replayed(self):
+        """A new writer should insert what a crashed process left in its spool"""
+        crashed = BufferedActivityWriter(spool_dir=self.spool_dir)
+        crashed.write([self.entry('lost 1'), self.entry('lost 2')])
+        with open(crashed.spool_path, 'a') as spool:
+            spool.write('{"project_id": ')
+        
+        restarted = BufferedActivityWriter(spool_dir=self.spool_dir)
+        with self.assertLogs('projects.activity', 'WARNING'):
+            self.assertEqual(restarted.replay_spools(), 2)
+        self.assertEqual(
+            sorted(Activity.objects.values_list('payload__title', flat=True)), ['lost 1', 'lost 2']
+        )
+        self.assertFalse(os.path.exists(crashed.spool_path))
+    
+    def test_spool_is_replayed_by_one_worker_only(self):
+        """Workers starting together should not both replay a crashed process's spool"""
+        crashed = BufferedActivityWriter(spool_dir=self.spool_dir)
+        crashed.write([self.entry('lost 1'), self.entry('lost 2')])
+        first, second = BufferedActivityWriter(spool_dir=self.spool_dir), BufferedActivityWriter(spool_dir=self.spool_dir)
+        
+        # The second worker listed the directory before the first one claimed the file
+        names = os.listdir(self.spool_dir)
+        self.assertEqual(first.replay_spools(), 2)
+        with unittest.mock.patch('projects.activity.os.listdir', return_value=names):
+            self.assertEqual(second.replay_spools(), 0)
+        self.assertEqual(Activity.objects.count(), 2)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+    
+    def test_buffered_rows_keep_the_time_they_were_logged(self):
+        """The flush should not stamp rows with its own time"""
+        logged_at = timezone.now() - timedelta(minutes=5)
+        writer = BufferedActivityWriter()
+        writer.write([dict(self.entry('late'), created_at=logged_at.isoformat())])
+        writer.flush()
+        self.assertEqual(Activity.objects.get().created_at, logged_at)
+    
+    def test_batch_that_keeps_failing_is_set_aside(self):
+        """After max_attempts failed inserts a batch should leave the buffer and the spool"""
+        writer = BufferedActivityWriter(spool_dir=self.spool_dir, max_attempts=2)
+        writer.write([self.entry('poison')])
+        with unittest.mock.patch('projects.activity.insert_activities', side_effect=ValueError('bad row')):
+            with self.assertRaises(ValueError):
+                writer.flush()
+            self.assertEqual(writer.pending(), 1)
+            with self.assertLogs('projects.activity', 'ERROR'), self.assertRaises(ValueError):
+                writer.flush()
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(self.spooled_lines(writer), [])
+        failed = [name for name in os.listdir(self.spool_dir) if name.startswith('failed-activity-')]
+        self.assertEqual(len(failed), 1)
+        
+        writer.write([self.entry('fine')])
+        writer.flush()
+        self.assertEqual(list(Activity.objects.values_list('payload__title', flat=True)), ['fine'])
+    
+    def test_buffered_mode_writes_after_commit(self):
+        """In buffered mode a mutation should only enqueue its activity"""
+        writer = BufferedActivityWriter()
+        self.addCleanup(setattr, activity, '_writer', activity._writer)
+        activity._writer = writer
+        
+        with override_settings(ACTIVITY_WRITER='buffered'):
+            with self.captureOnCommitCallbacks(execute=True):
+                result = Client(schema).execute(
+                    'mutation { createTask(projectId: %d, title: "Queued") { task { id } } }' % self.project.id,
+                    context=MockContext(self.owner),
+                )
+        self.assertIsNone(result.get('errors'))
+        self.assertEqual(Activity.objects.count(), 0)
+        self.assertEqual(writer.pending(), 1)
+        
+        writer.flush()
+        self.assertEqual(describe_activity(Activity.objects.get()), 'created task "Queued"')
+
+
+class BufferedActivityThreadTests(TransactionTestCase):
+    """Tests for the background flush thread"""
+    
+    def test_batch_size_triggers_a_background_flush(self):
+        """Reaching the batch size should flush without waiting for the interval"""
+        org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        project = Project.objects.create(name='Test Project', organization=org)
+        writer = BufferedActivityWriter(batch_size=2, flush_interval=60)
+        writer.start()
+        self.addCleanup(writer.close)
+        
+        entry = {'project_id': project.id, 'user_id': owner.id, 'action': 'TASK_CREATED',
+                 'description': 'threaded', 'task_id': None}
+        writer.write([entry, dict(entry)])
+        deadline = time.monotonic() + 5
+        while Activity.objects.count() < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(Activity.objects.count(), 2)
+
+
+@override_settings(ACTIVITY_WRITER='buffered', ACTIVITY_FLUSH_INTERVAL=0.05)
+class BufferedActivitySettingTests(TransactionTestCase):
+    """Tests for ACTIVITY_WRITER='buffered' through the process-wide writer"""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        settings = override_settings(ACTIVITY_SPOOL_DIR=spool_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.spool_dir = spool_dir.name
+
+        self.addCleanup(setattr, activity, '_writer', activity._writer)
+        activity._writer = None
+        self.addCleanup(activity.close_activity_writer)
+
+    def wait_for_activities(self, count):
+        # The in-memory test database reports "table is locked" while the
+        # writer thread inserts; poll again instead of failing
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                found = Activity.objects.count()
+            except OperationalError as error:
+                if not is_lock_error(error):
+                    raise
+            else:
+                if found >= count:
+                    return found
+            time.sleep(0.05)
+        return Activity.objects.count()
+
+    def test_mutation_activity_is_flushed_in_the_background(self):
+        """A mutation should return before its activity is inserted by the writer thread"""
+        result = Client(schema).execute(
+            'mutation { createTask(projectId: %d, title: "Queued") { task { id } } }' % self.project.id,
+            context=MockContext(self.owner),
+        )
+        self.assertIsNone(result.get('errors'))
+        writer = activity.get_activity_writer()
+        self.assertEqual(writer.spool_dir, self.spool_dir)
+
+        self.assertEqual(self.wait_for_activities(1), 1)
+        self.assertEqual(describe_activity(Activity.objects.get()), 'created task "Queued"')
+        self.assertEqual(writer.pending(), 0)
+        with open(writer.spool_path) as spool:
+            self.assertEqual(spool.read(), '')
+
+    def test_spool_of_a_crashed_process_is_replayed_on_start(self):
+        """Starting the process-wide writer should insert what a crashed writer left behind"""
+        crashed = BufferedActivityWriter(spool_dir=self.spool_dir)
+        crashed.write([{
+            'project_id': self.project.id, 'user_id': self.owner.id, 'action': 'TASK_UPDATED',
+            'task_id': None, 'payload': {'title': 'lost'},
+        }])
+        self.assertEqual(Activity.objects.count(), 0)
+
+        activity.get_activity_writer()
+        self.assertEqual(list(Activity.objects.values_list('payload__title', flat=True)), ['lost'])
+        self.assertFalse(os.path.exists(crashed.spool_path))
+
+
+class ActivityArchiveTests(TestCase):
+    """Tests for activity retention and the archive_activity command"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        self.outsider = User.objects.create_user('outsider@test.com', 'outsider@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.task = Task.objects.create(title='Task', project=self.project)
+        
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings = override_settings(ACTIVITY_ARCHIVE_DIR=archive_dir.name, ACTIVITY_RETENTION_DAYS=30)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.archive_dir = archive_dir.name
+        
+        self.old = [self.log(f'old {i}', days_ago=50 - i) for i in range(5)]
+        self.recent = self.log('recent', days_ago=1)
+        self.client = Client(schema)
+    
+    def log(self, title, days_ago):
+        activity = Activity.objects.create(
+            project=self.project, user=self.owner, action='TASK_UPDATED', task=self.task, payload={'title': title},
+        )
+        Activity.objects.filter(pk=activity.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return activity
+    
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_activity', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_retention_precedence(self):
+        """Project settings override the organization, which overrides the default"""
+        other = Project.objects.create(name='Forever', organization=self.org, activity_retention_days=0)
+        now = timezone.now()
+        self.assertEqual(archive_cutoffs(now=now), {self.project.id: now - timedelta(days=30)})
+        
+        Organization.objects.filter(pk=self.org.pk).update(activity_retention_days=7)
+        Project.objects.filter(pk=other.pk).update(activity_retention_days=365)
+        self.assertEqual(archive_cutoffs(now=now), {
+            self.project.id: now - timedelta(days=7),
+            other.id: now - timedelta(days=365),
+        })
+    
+    def test_command_moves_old_rows_in_chunks(self):
+        """Old activity should be written to compressed chunks and removed from the table"""
+        self.assertIn('Would archive 5 activities', self.archive('--dry-run'))
+        self.assertEqual(Activity.objects.count(), 6)
+        
+        output = self.archive('--batch-size', '2')
+        self.assertIn('Archived 5 activities', output)
+        self.assertEqual(list(Activity.objects.values_list('payload__title', flat=True)), ['recent'])
+        files = sorted(os.listdir(os.path.join(self.archive_dir, f'project-{self.project.id}')))
+        self.assertEqual(len(files), 3)
+        self.assertTrue(all(name.endswith('.ndjson.gz') for name in files))
+        self.assertIn('Archived 0 activities', self.archive())
+    
+    def test_archived_history_can_be_queried(self):
+        """archivedProjectActivity should page through archived rows, newest id first"""
+        self.archive('--batch-size', '2')
+        self.task.delete()
+        query = '''
+            query ($projectId: Int!, $beforeId: Int) {
+                archivedProjectActivity(projectId: $projectId, limit: 3, beforeId: $beforeId) {
+                    id description userName task { id }
+                }
+            }
+        '''
+        variables = {'projectId': self.project.id}
+        page = self.client.execute(query, variables=variables, context=MockContext(self.owner))
+        rows = page['data']['archivedProjectActivity']
+        self.assertEqual([row['description'] for row in rows], [f'updated task "old {i}"' for i in (4, 3, 2)])
+        self.assertEqual(rows[0]['userName'], 'owner@test.com')
+        self.assertIsNone(rows[0]['task'])
+        
+        variables['beforeId'] = int(rows[-1]['id'])
+        page = self.client.execute(query, variables=variables, context=MockContext(self.owner))
+        self.assertEqual(
+            [row['description'] for row in page['data']['archivedProjectActivity']],
+            ['updated task "old 1"', 'updated task "old 0"'],
+        )
+        
+        denied = self.client.execute(query, variables={'projectId': self.project.id}, context=MockContext(self.outsider))
+        self.assertEqual(denied['data']['archivedProjectActivity'], [])
+        
+        empty = self.client.execute(query.replace('limit: 3', 'limit: 0'), variables=variables, context=MockContext(self.owner))
+        self.assertIsNone(empty.get('errors'))
+        self.assertEqual(empty['data']['archivedProjectActivity'], [])
+
+
+class ActivityDescriptionTests(TestCase):
+    """Tests for activity payloads and read-time descriptions"""
+    
+    def setUp(self):
+        self.org = Organization.objects.create(name='Test Org', slug='test-org', contact_email='test@test.com')
+        self.owner = User.objects.create_user('owner@test.com', 'owner@test.com', 'pass')
+        OrganizationMember.objects.create(user=self.owner, organization=self.org, role='OWNER')
+        self.project = Project.objects.create(name='Test Project', organization=self.org)
+        self.client = Client(schema)
+    
+    def execute(self, query):
+        result = self.client.execute(query, context=MockContext(self.owner))
+        self.assertIsNone(result.get('errors'))
+        return result['data']
+    
+    def feed(self):
+        data = self.execute(
+            '{ projectActivityDelta(projectId: %d) { activities { action description payload } } }' % self.project.id
+        )
+        return [(a['action'], a['description'], a['payload']) for a in data['projectActivityDelta']['activities']]
+    
+    def test_mutations_store_payloads_and_render_current_titles(self):
+        """Descriptions should follow renames; payloads only hold what the task row does not"""
+        task_id = self.execute(
+            'mutation { createTask(projectId: %d, title: "Draft") { task { id } } }' % self.project.id
+        )['createTask']['task']['id']
+        self.execute('mutation { updateTask(id: %s, status: "DONE") { task { id } } }' % task_id)
+        self.execute('mutation { updateTask(id: %s, title: "Final") { task { id } } }' % task_id)
+        self.execute('mutation { deleteTask(id: %s) { success } }' % task_id)
+        
+        self.assertEqual(self.feed(), [
+            ('TASK_CREATED', 'created task (deleted)', '{}'),
+            ('TASK_MOVED', 'moved (deleted) from TODO to DONE', '{"from": "TODO", "to": "DONE"}'),
+            ('TASK_UPDATED', 'updated task (deleted)', '{"fields": ["title"]}'),
+            ('TASK_DELETED', 'deleted task "Final"', '{"title": "Final"}'),
+        ])
+    
+    def test_description_joins_the_task(self):
+        """Rendering descriptions should not cost one task query per activity"""
+        for i in range(3):
+            task = Task.objects.create(title=f'Card {i}', project=self.project)
+            Activity.objects.create(project=self.project, user=self.owner, action='TASK_CREATED', task=task)
+        self.execute('{ projectActivity(projectId: %d) { id } }' % self.project.id)
+        
+        with CaptureQueriesContext(connection) as queries:
+            data = self.execute('{ projectActivity(projectId: %d) { description } }' % self.project.id)
+        self.assertEqual([a['description'] for a in data['projectActivity']][-1], 'created task "Card 0"')
+        self.assertEqual(len(queries), 1)
+    
+    def test_migration_parses_old_descriptions(self):
+        """Migration 0010 should turn stored sentences into payloads"""
+        parse = import_module('projects.migrations.0010_activity_payload').parse_description
+        self.assertEqual(parse('TASK_MOVED', 'moved "A" from TODO to DONE', True), {'from': 'TODO', 'to': 'DONE'})
+        self.assertEqual(parse('TASK_DELETED', 'deleted task "Say "hi""', False), {'title': 'Say "hi"'})
+        self.assertEqual(parse('TASK_UPDATED', 'renamed things', True), {'text': 'renamed things'})
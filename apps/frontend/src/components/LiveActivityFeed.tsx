@@ -53,6 +53,8 @@ export const LiveActivityFeed = ({ projectId }: LiveActivityFeedProps) => {
         variables: { projectId, limit: 10 },
         pollInterval: 3000,
         fetchPolicy: 'network-only',
+        // GET lets the browser revalidate with the response's ETag; unchanged polls get an empty 304
+        context: { fetchOptions: { method: 'GET' } },
     });
 
     // Handle drag
@@ -176,7 +176,9 @@ export default function ProjectDetails() {
     );
 
     const { loading, error, data, refetch } = useQuery(GET_PROJECT, {
-        variables: { id: numericProjectId }
+        variables: { id: numericProjectId },
+        // GET lets the browser revalidate with the response's ETag; unchanged refetches get an empty 304
+        context: { fetchOptions: { method: 'GET' } },
     });
 
     const [updateStatus] = useMutation(UPDATE_TASK_STATUS, {